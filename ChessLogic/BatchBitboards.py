@@ -0,0 +1,252 @@
+"""Batches of positions as NumPy arrays: (N, 12, 64) piece planes, (N, 12) uint64 bitboards
+and vectorized shift-and-mask attack computation. Square index is y * 8 + x, so a1 = 0 and h8 = 63"""
+
+import numpy as np
+
+from .ChessPosition import ChessPosition
+from .Colors import Color
+
+
+PLANE_CHARS = 'PNBRQKpnbrqk'  # Planes 0-5 are white pieces, 6-11 are black pieces
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+CASTLING_CHARS = 'KQkq'
+CASTLINGS = ('white_king_side', 'white_queen_side', 'black_king_side', 'black_queen_side')
+
+NOT_A_FILE = np.uint64(0xFEFEFEFEFEFEFEFE)
+NOT_H_FILE = np.uint64(0x7F7F7F7F7F7F7F7F)
+NOT_AB_FILES = np.uint64(0xFCFCFCFCFCFCFCFC)
+NOT_GH_FILES = np.uint64(0x3F3F3F3F3F3F3F3F)
+RANKS = [np.uint64(0xFF << 8 * rank) for rank in range(8)]
+
+SHIFTS = {n: np.uint64(n) for n in (1, 2, 7, 8, 9, 16, 32)}  # NumPy refuses to shift uint64 by Python int
+
+# FEN board field goes from a8 to h1, square index of every FEN cell
+FEN_ORDER = np.array([index ^ 56 for index in range(64)])
+
+# FEN char code -> plane, 12 is empty cell
+CHAR_PLANES = np.full(256, 12, dtype=np.uint8)
+for plane, char in enumerate(PLANE_CHARS):
+    CHAR_PLANES[ord(char)] = plane
+
+PLANE_INDICES = np.arange(12, dtype=np.uint8)
+
+BYTE_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def encode_fens(fens):
+    """Returns (N, 12, 64) uint8 planes and (N,) bool white to move array of FEN or EPD strings"""
+
+    fields = [fen.strip().partition(' ') for fen in fens]
+
+    # Digit expansion of the whole batch at once is much faster than per FEN, "1" becomes empty cell marker
+    boards = ''.join([board for board, _, _ in fields]).replace('/', '')
+    for digit in range(8, 1, -1):
+        boards = boards.replace(str(digit), '1' * digit)
+
+    if len(boards) != 64 * len(fields):
+        raise ValueError('Every FEN board must have 64 cells')
+
+    cells = np.frombuffer(boards.encode('ascii'), dtype=np.uint8).reshape(len(fields), 64)[:, FEN_ORDER]
+    white_to_move = np.array([not rest.startswith('b') for _, _, rest in fields], dtype=bool)
+
+    return cells_to_planes(CHAR_PLANES[cells]), white_to_move
+
+
+def encode_positions(chess_positions):
+    """Returns (N, 12, 64) uint8 planes and (N,) bool white to move array of ChessPosition or CompactPosition"""
+
+    cells = np.full((len(chess_positions), 64), 12, dtype=np.uint8)
+    white_to_move = np.empty(len(chess_positions), dtype=bool)
+
+    for row, chess_position in enumerate(chess_positions):
+        # ChessPosition.get_pieces returns dicts, so its piece objects are read directly
+        pieces = chess_position.pieces if isinstance(chess_position, ChessPosition) else chess_position.get_pieces()
+
+        for piece in pieces:
+            cells[row, piece.y * 8 + piece.x] = PLANE_CHARS.index(piece.char_repr)
+
+        white_to_move[row] = chess_position.move_color == Color.WHITE
+
+    return cells_to_planes(cells), white_to_move
+
+
+def encode_fen_rights(fens):
+    """Returns (N, 4) bool castling rights in KQkq order and (N,) int8 en passant cells, -1 if there is none"""
+
+    castling = np.zeros((len(fens), 4), dtype=bool)
+    en_passant = np.full(len(fens), -1, dtype=np.int8)
+
+    for row, fen in enumerate(fens):
+        fields = fen.split()
+        castling[row] = [char in fields[2] for char in CASTLING_CHARS] if len(fields) > 2 else False
+
+        if len(fields) > 3 and fields[3] != '-':
+            en_passant[row] = (int(fields[3][1]) - 1) * 8 + ord(fields[3][0]) - ord('a')
+
+    return castling, en_passant
+
+
+def encode_position_rights(chess_positions):
+    """Same as encode_fen_rights for ChessPosition or CompactPosition"""
+
+    castling = np.zeros((len(chess_positions), 4), dtype=bool)
+    en_passant = np.full(len(chess_positions), -1, dtype=np.int8)
+
+    for row, chess_position in enumerate(chess_positions):
+        if isinstance(chess_position, ChessPosition):
+            castling[row] = [getattr(chess_position.castling_state, name) for name in CASTLINGS]
+
+            if chess_position.en_passant:
+                x, y = chess_position.en_passant
+                en_passant[row] = y * 8 + x
+
+        else:  # CompactPosition keeps castling as bits and en passant as cell index
+            castling[row] = [chess_position.castling >> bit & 1 for bit in range(4)]
+            en_passant[row] = chess_position.en_passant
+
+    return castling, en_passant
+
+
+def cells_to_planes(cells):
+    """One-hot encodes (N, 64) uint8 plane indices, 12 meaning empty cell"""
+
+    planes = np.empty((len(cells), 12, 64), dtype=bool)  # Broadcast result would not be C-contiguous
+    np.equal(cells[:, None, :], PLANE_INDICES[None, :, None], out=planes)
+
+    return planes.view(np.uint8)
+
+
+def planes_to_bitboards(planes):
+    """Packs (N, 12, 64) planes into (N, 12) uint64 bitboards"""
+
+    packed = np.packbits(np.ascontiguousarray(planes, dtype=np.uint8), axis=2, bitorder='little')
+    return np.ascontiguousarray(packed).view('<u8')[..., 0].astype(np.uint64)
+
+
+def bitboards_to_planes(bitboards):
+    packed = np.ascontiguousarray(bitboards.astype('<u8')).view(np.uint8).reshape(bitboards.shape + (8,))
+    return np.unpackbits(packed, axis=-1, bitorder='little')
+
+
+def popcount(bitboards):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bitboards).astype(np.int32)
+
+    as_bytes = np.ascontiguousarray(bitboards.astype('<u8')).view(np.uint8).reshape(bitboards.shape + (8,))
+    return BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int32)
+
+
+# Shifts by one cell in every direction, cells that leave the board are dropped
+
+def north(bitboards):
+    return bitboards << SHIFTS[8]
+
+
+def south(bitboards):
+    return bitboards >> SHIFTS[8]
+
+
+def east(bitboards):
+    return (bitboards << SHIFTS[1]) & NOT_A_FILE
+
+
+def west(bitboards):
+    return (bitboards >> SHIFTS[1]) & NOT_H_FILE
+
+
+def north_east(bitboards):
+    return (bitboards << SHIFTS[9]) & NOT_A_FILE
+
+
+def north_west(bitboards):
+    return (bitboards << SHIFTS[7]) & NOT_H_FILE
+
+
+def south_east(bitboards):
+    return (bitboards >> SHIFTS[7]) & NOT_A_FILE
+
+
+def south_west(bitboards):
+    return (bitboards >> SHIFTS[9]) & NOT_H_FILE
+
+
+def north_fill(bitboards):
+    """Every cell of a set cell and all cells above it"""
+
+    bitboards = bitboards | bitboards << SHIFTS[8]
+    bitboards = bitboards | bitboards << SHIFTS[16]
+    return bitboards | bitboards << SHIFTS[32]
+
+
+def south_fill(bitboards):
+    bitboards = bitboards | bitboards >> SHIFTS[8]
+    bitboards = bitboards | bitboards >> SHIFTS[16]
+    return bitboards | bitboards >> SHIFTS[32]
+
+
+DIRECTIONS = [north, south, east, west, north_east, north_west, south_east, south_west]
+ROOK_DIRECTIONS = DIRECTIONS[:4]
+BISHOP_DIRECTIONS = DIRECTIONS[4:]
+
+
+def knight_attacks(knights):
+    left_1, right_1 = (knights >> SHIFTS[1]) & NOT_H_FILE, (knights << SHIFTS[1]) & NOT_A_FILE
+    left_2, right_2 = (knights >> SHIFTS[2]) & NOT_GH_FILES, (knights << SHIFTS[2]) & NOT_AB_FILES
+    one_file, two_files = left_1 | right_1, left_2 | right_2
+
+    return (one_file << SHIFTS[16]) | (one_file >> SHIFTS[16]) | (two_files << SHIFTS[8]) | (two_files >> SHIFTS[8])
+
+
+def king_attacks(kings):
+    row = kings | east(kings) | west(kings)
+    return (row | north(row) | south(row)) & ~kings
+
+
+def pawn_attacks(pawns, color):
+    if color == Color.WHITE:
+        return north_east(pawns) | north_west(pawns)
+
+    return south_east(pawns) | south_west(pawns)
+
+
+def sliding_attacks(sliders, empty, directions):
+    """Attacks of all sliders together, every ray stops at the first occupied cell, which is attacked"""
+
+    attacks = np.zeros(np.broadcast(sliders, empty).shape, dtype=np.uint64)
+
+    for direction in directions:
+        ray = direction(sliders)
+        attacks |= ray
+
+        for _ in range(6):
+            ray = direction(ray & empty)
+            attacks |= ray
+
+    return attacks
+
+
+def rook_attacks(rooks, empty):
+    return sliding_attacks(rooks, empty, ROOK_DIRECTIONS)
+
+
+def bishop_attacks(bishops, empty):
+    return sliding_attacks(bishops, empty, BISHOP_DIRECTIONS)
+
+
+def attacked_cells(bitboards, color, empty=None):
+    """Cells attacked by all pieces of the color, for (N, 12) bitboards. Sliders stop at cells that are not empty"""
+
+    offset = 0 if color == Color.WHITE else 6
+    if empty is None:
+        empty = ~np.bitwise_or.reduce(bitboards, axis=1)
+    pieces = bitboards[:, offset:offset + 6]
+
+    return pawn_attacks(pieces[:, PAWN], color) | knight_attacks(pieces[:, KNIGHT]) | king_attacks(pieces[:, KING]) \
+        | rook_attacks(pieces[:, ROOK] | pieces[:, QUEEN], empty) \
+        | bishop_attacks(pieces[:, BISHOP] | pieces[:, QUEEN], empty)
+
+
+__all__ = ['PLANE_CHARS', 'RANKS', 'encode_fens', 'encode_positions', 'encode_fen_rights', 'encode_position_rights',
+           'planes_to_bitboards', 'bitboards_to_planes', 'popcount', 'north', 'south', 'east', 'west', 'north_fill',
+           'south_fill', 'knight_attacks', 'king_attacks', 'pawn_attacks', 'rook_attacks', 'bishop_attacks',
+           'attacked_cells']
@@ -0,0 +1,154 @@
+"""Vectorized static evaluation of many positions at once: material, piece-square tables, mobility and pawn structure
+are computed with NumPy for the whole (N, 12, 64) piece plane batch, without Python loops over positions
+
+Usage: python -m ChessLogic.BatchEvaluation positions.epd.gz --output scores.txt --batch-size 65536
+"""
+
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from .BatchBitboards import *
+from .BatchBitboards import PAWN, KNIGHT, BISHOP, ROOK, QUEEN
+from .BatchProcessing import split_batches, open_text
+from .Colors import Color
+from .Engine import PIECE_VALUES, PIECE_SQUARE_VALUES
+from .Pieces import *
+
+
+PLANE_PIECES = [(piece_class, color) for color in Color for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)]
+
+# Material and positional part of Engine piece-square value of every plane and cell from white side.
+# Kings have no material, so it does not count their 20000 which cancel anyway
+CELL_VALUES = np.array([[((PIECE_VALUES[piece_class] if piece_class is not King else 0) * sign,
+                          (PIECE_SQUARE_VALUES[piece_class, color][square // 8][square % 8]
+                           - PIECE_VALUES[piece_class]) * sign)
+                         for square in range(64)]
+                        for piece_class, color, sign in ((piece_class, color, 1 if color == Color.WHITE else -1)
+                                                         for piece_class, color in PLANE_PIECES)],
+                       dtype=np.float32).reshape(12 * 64, 2).T.copy()
+
+MOBILITY_WEIGHTS = {KNIGHT: 4, BISHOP: 5, ROOK: 2, QUEEN: 1}  # Centipawns per reachable cell
+DOUBLED_PAWN = -10  # For every pawn behind another one on the same file
+ISOLATED_PAWN = -15
+PASSED_PAWN = [0, 5, 10, 20, 35, 60, 100, 0]  # By rank from pawn side
+
+TERMS = ('material', 'piece_square', 'mobility', 'pawn_structure')
+
+
+def mobility(bitboards, color):
+    """Cells reachable by knights, bishops, rooks and queens of the color that are neither occupied
+    by own pieces nor attacked by enemy pawns. Pieces of one type are counted together, so it is an estimate"""
+
+    own, enemy = (0, 6) if color == Color.WHITE else (6, 0)
+    empty = ~np.bitwise_or.reduce(bitboards, axis=1)
+    area = ~np.bitwise_or.reduce(bitboards[:, own:own + 6], axis=1) \
+        & ~pawn_attacks(bitboards[:, enemy + PAWN], Color.WHITE if color == Color.BLACK else Color.BLACK)
+
+    reachable = {KNIGHT: knight_attacks(bitboards[:, own + KNIGHT]),
+                 BISHOP: bishop_attacks(bitboards[:, own + BISHOP], empty),
+                 ROOK: rook_attacks(bitboards[:, own + ROOK], empty),
+                 QUEEN: rook_attacks(bitboards[:, own + QUEEN], empty)
+                 | bishop_attacks(bitboards[:, own + QUEEN], empty)}
+
+    return sum(MOBILITY_WEIGHTS[piece_type] * popcount(cells & area) for piece_type, cells in reachable.items())
+
+
+def pawn_structure(bitboards, color):
+    """Doubled, isolated and passed pawns of the color, computed with file fills of pawn bitboards"""
+
+    own, enemy = (bitboards[:, PAWN], bitboards[:, 6 + PAWN]) if color == Color.WHITE \
+        else (bitboards[:, 6 + PAWN], bitboards[:, PAWN])
+    files = south_fill(north_fill(own))
+
+    doubled = popcount(own) - popcount(files & RANKS[0])
+    isolated = popcount(own & ~(east(files) | west(files)))
+
+    # Cells in front of enemy pawns from their side, widened to adjacent files
+    enemy_span = south_fill(south(enemy)) if color == Color.WHITE else north_fill(north(enemy))
+    passed = own & ~(enemy_span | east(enemy_span) | west(enemy_span))
+
+    passed_bonus = sum(PASSED_PAWN[rank if color == Color.WHITE else 7 - rank] * popcount(passed & RANKS[rank])
+                       for rank in range(1, 7))
+
+    return DOUBLED_PAWN * doubled + ISOLATED_PAWN * isolated + passed_bonus
+
+
+def evaluate_terms(planes):
+    """Returns {term: (N,) int32 scores from white side} for (N, 12, 64) planes.
+    Material and piece-square terms together equal Engine.evaluate from white side"""
+
+    # Sums of integers below 2 ** 24 are exact in float32, and float matrix product is much faster than integer one
+    flat = planes.reshape(len(planes), 12 * 64).astype(np.float32)
+    material, piece_square = (np.rint(flat @ values).astype(np.int32) for values in CELL_VALUES)
+    bitboards = planes_to_bitboards(planes)
+
+    return {
+        'material': material,
+        'piece_square': piece_square,
+        'mobility': (mobility(bitboards, Color.WHITE) - mobility(bitboards, Color.BLACK)).astype(np.int32),
+        'pawn_structure': (pawn_structure(bitboards, Color.WHITE)
+                           - pawn_structure(bitboards, Color.BLACK)).astype(np.int32),
+    }
+
+
+def evaluate_planes(planes, white_to_move):
+    """Static evaluation in centipawns from side to move for (N, 12, 64) planes and (N,) white to move flags"""
+
+    score = sum(evaluate_terms(planes).values())
+    return np.where(white_to_move, score, -score).astype(np.int32)
+
+
+def evaluate_batch(positions, batch_size=1 << 16):
+    """Evaluates FEN strings or positions, they are encoded by batch_size at once to limit memory"""
+
+    scores = []
+
+    for batch in split_batches(positions, batch_size):
+        planes, white_to_move = encode_fens(batch) if isinstance(batch[0], str) else encode_positions(batch)
+        scores.append(evaluate_planes(planes, white_to_move))
+
+    return np.concatenate(scores) if scores else np.zeros(0, dtype=np.int32)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate many positions with vectorized evaluation')
+    parser.add_argument('input', help='file with a FEN or EPD per line, "-" for stdin, .gz is supported')
+    parser.add_argument('--output', default=None, help='write "<fen>;<score>" lines, "-" for stdout')
+    parser.add_argument('--batch-size', type=int, default=1 << 16, help='positions evaluated at once')
+    args = parser.parse_args(argv)
+
+    seconds = 0
+    encoding_seconds = 0
+    positions = 0
+
+    # Input is read and output is written one batch at a time, so memory does not depend on input size
+    with open_text(args.input) as input_file, \
+            open_text(args.output, 'w') if args.output else nullcontext() as output_file:
+
+        for batch in split_batches((line.strip() for line in input_file if line.strip()), args.batch_size):
+            start = time.perf_counter()
+            planes, white_to_move = encode_fens(batch)
+            encoding_seconds += time.perf_counter() - start
+
+            scores = evaluate_planes(planes, white_to_move)
+            seconds += time.perf_counter() - start
+            positions += len(batch)
+
+            if output_file:
+                output_file.writelines(f'{fen};{score}\n' for fen, score in zip(batch, scores))
+
+    print(f'Positions: {positions}, {seconds:.3f} s ({encoding_seconds:.3f} s encoding), '
+          f'{positions / max(seconds, 1e-9):.0f} positions/s', file=sys.stderr)
+
+    return 0
+
+
+__all__ = ['evaluate_terms', 'evaluate_planes', 'evaluate_batch', 'TERMS']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Vectorized move generation for batches of positions: for every position and cell it returns bitboard of cells
+the piece on that cell can move to, both pseudo-legal and legal, the same as moves of ChessPosition pieces.
+Positions with black to move are mirrored, so moves are generated for white only
+
+Usage: python -m ChessLogic.BatchMoveGeneration positions.epd.gz --batch-size 16384 --check
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from .BatchBitboards import *
+from .BatchBitboards import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, SHIFTS, DIRECTIONS, sliding_attacks
+from .BatchProcessing import split_batches, open_text
+from .ChessPosition import ChessPosition
+from .Colors import Color
+
+
+CELL_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+MIRRORED_CELLS = np.arange(64) ^ 56
+SWAPPED_COLORS = list(range(6, 12)) + list(range(6))  # Planes of the other side
+SWAPPED_CASTLINGS = [2, 3, 0, 1]
+
+WHITE_KING_START = np.uint64(1 << 4)
+
+# (castling index, cells that must be empty, cells that must not be attacked, king target cell)
+CASTLING_MOVES = [(0, np.uint64(0b01100000), np.uint64(0b01100000), np.uint64(1 << 6)),
+                  (1, np.uint64(0b00001110), np.uint64(0b00001100), np.uint64(1 << 2))]
+
+
+def orient_to_white(bitboards, white_to_move, castling, en_passant):
+    """Mirrors ranks and swaps colors of positions with black to move, so white is always to move"""
+
+    black_to_move = ~white_to_move
+    bitboards = np.where(white_to_move[:, None], bitboards, bitboards[:, SWAPPED_COLORS].byteswap())
+    castling = np.where(white_to_move[:, None], castling, castling[:, SWAPPED_CASTLINGS])
+    en_passant = np.where(black_to_move & (en_passant >= 0), en_passant ^ 56, en_passant)
+
+    return bitboards, castling, en_passant
+
+
+def orient_back(targets, white_to_move):
+    """Mirrors (N, 64) move targets of positions with black to move back, in place"""
+
+    black_rows = np.flatnonzero(~white_to_move)
+    targets[black_rows] = targets[black_rows][:, MIRRORED_CELLS].byteswap()
+
+    return targets
+
+
+def ray(origins, empty, direction):
+    """Cells in one direction from every origin up to and including the first occupied cell"""
+
+    return sliding_attacks(origins, empty, [direction])
+
+
+def piece_moves(piece_type, pieces, own, empty, enemy):
+    """Pseudo-legal moves of single-bit piece bitboards of one type, except castling and en passant"""
+
+    if piece_type == PAWN:
+        pushes = north(pieces) & empty
+        pushes |= north(pushes & RANKS[2]) & empty
+        return pushes | (pawn_attacks(pieces, Color.WHITE) & enemy)
+
+    if piece_type == KNIGHT:
+        attacks = knight_attacks(pieces)
+    elif piece_type == BISHOP:
+        attacks = bishop_attacks(pieces, empty)
+    elif piece_type == ROOK:
+        attacks = rook_attacks(pieces, empty)
+    elif piece_type == QUEEN:
+        attacks = bishop_attacks(pieces, empty) | rook_attacks(pieces, empty)
+    else:
+        attacks = king_attacks(pieces)
+
+    return attacks & ~own
+
+
+def white_move_targets(bitboards, castling, en_passant):
+    """Returns (pseudo-legal, legal) (N, 64) targets of the cells for positions with white to move"""
+
+    own = np.bitwise_or.reduce(bitboards[:, :6], axis=1)
+    enemy = np.bitwise_or.reduce(bitboards[:, 6:], axis=1)
+    empty = ~(own | enemy)
+    king = bitboards[:, KING]
+    en_passant_cell = np.where(en_passant >= 0, np.uint64(1) << en_passant.clip(0).astype(np.uint64), np.uint64(0))
+
+    enemy_attacks = attacked_cells(bitboards, Color.BLACK, empty | king)  # King does not hide cells behind it
+    checkers = (knight_attacks(king) & bitboards[:, 6 + KNIGHT]) \
+        | (pawn_attacks(king, Color.WHITE) & bitboards[:, 6 + PAWN]) \
+        | (bishop_attacks(king, empty) & (bitboards[:, 6 + BISHOP] | bitboards[:, 6 + QUEEN])) \
+        | (rook_attacks(king, empty) & (bitboards[:, 6 + ROOK] | bitboards[:, 6 + QUEEN]))
+    checker_count = popcount(checkers)
+
+    # Single check is answered by capturing the checker or blocking its ray, double check only by king moves.
+    # Own piece between king and enemy slider may only move along the ray between them
+    check_mask = checkers.copy()
+    pinned = np.zeros_like(own)
+    pin_rays = []
+
+    for index, direction in enumerate(DIRECTIONS):
+        sliders = bitboards[:, 6 + QUEEN] | bitboards[:, 6 + (ROOK if index < 4 else BISHOP)]
+        king_ray = ray(king, empty, direction)
+        check_mask |= np.where((king_ray & checkers & sliders) != 0, king_ray, np.uint64(0))
+
+        blocker = king_ray & own
+        beyond = ray(blocker, empty, direction)
+        pinned_here = np.where((beyond & sliders) != 0, blocker, np.uint64(0))
+        pinned |= pinned_here
+        pin_rays.append((pinned_here, king_ray | beyond))
+
+    check_mask = np.where(checker_count == 0, ~np.uint64(0), np.where(checker_count == 1, check_mask, np.uint64(0)))
+
+    pseudo_legal = np.zeros((len(bitboards), 64), dtype=np.uint64)
+    legal = np.zeros_like(pseudo_legal)
+
+    # Pieces are gathered into flat arrays, so the work depends on number of pieces, not of cells
+    for piece_type in range(6):
+        rows, cells = np.nonzero(bitboards[:, piece_type, None] & CELL_BITS)
+        pieces = CELL_BITS[cells]
+        moves = piece_moves(piece_type, pieces, own[rows], empty[rows], enemy[rows])
+        pseudo_legal[rows, cells] = moves
+
+        if piece_type == KING:
+            legal[rows, cells] = moves & ~enemy_attacks[rows]
+            continue
+
+        allowed = check_mask[rows]
+        for pinned_here, pin_ray in pin_rays:
+            allowed &= np.where((pinned_here[rows] & pieces) != 0, pin_ray[rows], ~np.uint64(0))
+
+        legal[rows, cells] = moves & allowed
+
+        if piece_type == PAWN:
+            en_passant_moves = pawn_attacks(pieces, Color.WHITE) & en_passant_cell[rows]
+            pseudo_legal[rows, cells] |= en_passant_moves
+            legal[rows, cells] |= legal_en_passant(bitboards[rows], pieces, en_passant_moves, own[rows] | enemy[rows])
+
+    # Castling: king on its start cell, right is kept and cells between king and rook are empty
+    for castling_index, path, safe_cells, target in CASTLING_MOVES:
+        possible = castling[:, castling_index] & (king == WHITE_KING_START) & ((path & empty) == path)
+        pseudo_legal[:, 4] |= np.where(possible, target, np.uint64(0))
+        legal[:, 4] |= np.where(possible & (checker_count == 0) & ((safe_cells & enemy_attacks) == 0),
+                                target, np.uint64(0))
+
+    return pseudo_legal, legal
+
+
+def legal_en_passant(bitboards, pawns, en_passant_moves, occupied):
+    """En passant removes two pieces from one rank, so it is checked by looking for attacks on king after the move"""
+
+    result = np.zeros_like(en_passant_moves)
+    rows = np.flatnonzero(en_passant_moves)
+
+    if not len(rows):
+        return result
+
+    bitboards, moves = bitboards[rows], en_passant_moves[rows]
+    captured = moves >> SHIFTS[8]
+    empty = ~((occupied[rows] & ~pawns[rows] & ~captured) | moves)
+    king = bitboards[:, KING]
+
+    attacked = (knight_attacks(king) & bitboards[:, 6 + KNIGHT]) \
+        | (pawn_attacks(king, Color.WHITE) & bitboards[:, 6 + PAWN] & ~captured) \
+        | (bishop_attacks(king, empty) & (bitboards[:, 6 + BISHOP] | bitboards[:, 6 + QUEEN])) \
+        | (rook_attacks(king, empty) & (bitboards[:, 6 + ROOK] | bitboards[:, 6 + QUEEN]))
+
+    result[rows] = np.where(attacked == 0, moves, np.uint64(0))
+    return result
+
+
+def generate_move_targets(bitboards, white_to_move, castling, en_passant):
+    """Returns (pseudo-legal, legal) (N, 64) uint64 arrays: cells that piece on the cell can move to.
+    Arguments are (N, 12) bitboards, (N,) white to move flags, (N, 4) KQkq castling rights and (N,) en passant cells"""
+
+    bitboards, castling, en_passant = orient_to_white(bitboards, white_to_move, castling, en_passant)
+    pseudo_legal, legal = white_move_targets(bitboards, castling, en_passant)
+
+    return orient_back(pseudo_legal, white_to_move), orient_back(legal, white_to_move)
+
+
+def move_masks(targets):
+    """Expands (N, 64) targets to (N, 64, 64) uint8 from-to move masks"""
+
+    return bitboards_to_planes(targets)
+
+
+def generate_batch_moves(positions):
+    """Returns (pseudo-legal, legal) targets of FEN strings or positions"""
+
+    if isinstance(positions[0], str):
+        planes, white_to_move = encode_fens(positions)
+        castling, en_passant = encode_fen_rights(positions)
+    else:
+        planes, white_to_move = encode_positions(positions)
+        castling, en_passant = encode_position_rights(positions)
+
+    return generate_move_targets(planes_to_bitboards(planes), white_to_move, castling, en_passant)
+
+
+def check_targets(fen, targets):
+    """Returns cells whose targets differ from moves of ChessPosition pieces"""
+
+    chess_position = ChessPosition.generate_from_fen(fen)
+    chess_position.calculate_possible_moves()
+    expected = np.zeros(64, dtype=np.uint64)
+
+    for piece in chess_position.pieces:
+        if piece.color == chess_position.move_color:
+            for new_x, new_y in piece.moves:
+                expected[piece.y * 8 + piece.x] |= CELL_BITS[new_y * 8 + new_x]
+
+    return [cell for cell in range(64) if expected[cell] != targets[cell]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate legal moves of many positions at once')
+    parser.add_argument('input', help='file with a FEN or EPD per line, "-" for stdin, .gz is supported')
+    parser.add_argument('--batch-size', type=int, default=1 << 14, help='positions processed at once')
+    parser.add_argument('--check', action='store_true', help='compare every position with ChessPosition moves')
+    args = parser.parse_args(argv)
+
+    seconds = 0
+    positions = 0
+    moves = 0
+    mismatches = 0
+
+    # Input is read one batch at a time, so memory does not depend on input size
+    with open_text(args.input) as file:
+        for batch in split_batches((line.strip() for line in file if line.strip()), args.batch_size):
+            start = time.perf_counter()
+            _, legal = generate_batch_moves(batch)
+            seconds += time.perf_counter() - start
+            positions += len(batch)
+            moves += int(popcount(legal).sum())
+
+            if args.check:
+                for fen, targets in zip(batch, legal):
+                    cells = check_targets(fen, targets)
+
+                    if cells:
+                        mismatches += 1
+                        print(f'Mismatch at {fen}: cells {cells}')
+
+    print(f'Positions: {positions}, from-to moves: {moves}, {seconds:.3f} s, '
+          f'{positions / max(seconds, 1e-9):.0f} positions/s')
+
+    return 1 if mismatches else 0
+
+
+__all__ = ['generate_move_targets', 'generate_batch_moves', 'move_masks']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def split_batches(items, batch_size):
+    """Lazily groups items into lists of batch_size"""
+
+    items = iter(items)
+
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def map_batches(function, batches, jobs=None):
+    """Applies function to every batch in worker processes and yields results in input order.
+    At most 2 * jobs batches are in flight, so memory does not depend on input size"""
+
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1:
+        for batch in batches:
+            yield function(batch)
+        return
+
+    with ProcessPoolExecutor(jobs) as executor:
+        pending = deque()
+
+        for batch in batches:
+            pending.append(executor.submit(function, batch))
+
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def open_text(path, mode='r'):
+    """Opens text file, "-" means standard input or output and .gz files are decompressed on the fly"""
+
+    if path == '-':
+        return os.fdopen(os.dup(0 if 'r' in mode else 1), mode, encoding='utf-8')
+
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, mode + 't', encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+__all__ = ['split_batches', 'map_batches', 'open_text']
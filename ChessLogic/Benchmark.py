@@ -0,0 +1,318 @@
+"""Microbenchmarks of core ChessLogic operations on a fixed position corpus, with JSON results and
+comparison against a baseline run. Move cache is disabled and garbage collection is paused while timing.
+Benchmarks are measured in interleaved rounds, so slow periods of the machine affect all of them alike and
+results do not depend on which benchmarks are selected. With the default 30 rounds, consecutive runs differ
+by less than 10%, the default regression threshold
+
+Usage: python -m ChessLogic.Benchmark --output baseline.json
+       python -m ChessLogic.Benchmark --baseline baseline.json --threshold 0.1 --filter make_move
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+
+from .BatchProcessing import open_text
+from .ChessGame import ChessGame
+from .ChessPosition import ChessPosition
+from .Perft import REFERENCE_POSITIONS
+
+
+# Perft reference positions and positions where the game is over
+CORPUS = [fen for _, fen, _ in REFERENCE_POSITIONS] + [
+    'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3',  # Checkmate
+    '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1',  # Stalemate
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1',  # Back rank mate in one
+]
+
+GAME_PLIES = 80
+
+
+class Benchmark:
+    """Class that describes benchmark: setup(corpus) is not timed, run(state) is timed and returns operation count"""
+
+    def __init__(self, **kwargs):
+        self.name = None
+        self.setup = lambda corpus: corpus
+        self.run = None
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+
+def create_positions(corpus):
+    return [ChessPosition.generate_from_fen(fen) for fen in corpus]
+
+
+def create_positions_with_moves(corpus):
+    positions = create_positions(corpus)
+    return [(chess_position, chess_position.generate_legal_moves()) for chess_position in positions]
+
+
+def run_generate_from_fen(corpus):
+    for fen in corpus:
+        ChessPosition.generate_from_fen(fen)
+    return len(corpus)
+
+
+def run_generate_fen(positions):
+    for chess_position in positions:
+        chess_position.generate_fen()
+    return len(positions)
+
+
+def run_copy(positions):
+    for chess_position in positions:
+        chess_position.copy()
+    return len(positions)
+
+
+def run_make_move(positions_with_moves):
+    """Every move is unmade, so the position stays the same for the next one"""
+
+    count = 0
+
+    for chess_position, moves in positions_with_moves:
+        for move in moves:
+            chess_position.make_move(*move)
+            chess_position.unmake_move()
+        count += len(moves)
+
+    return count
+
+
+def run_get_state(positions):
+    for chess_position in positions:
+        chess_position.get_state()
+    return len(positions)
+
+
+def run_calculate_possible_moves(positions):
+    for chess_position in positions:
+        chess_position.calculate_possible_moves()
+    return len(positions)
+
+
+def run_game_status(positions):
+    for chess_position in positions:
+        chess_position.is_checkmate()
+        chess_position.is_stalemate()
+    return len(positions)
+
+
+game_moves = []
+
+
+def get_game_moves():
+    """Fixed game: every ply plays legal move chosen by ply number, so it is the same in every run"""
+
+    if not game_moves:
+        chess_position = ChessPosition.generate_from_fen(ChessGame.initial_chess_position)
+
+        for ply in range(GAME_PLIES):
+            moves = sorted(chess_position.generate_legal_moves(), key=lambda move: (move[:4], move[4] or ''))
+            if not moves:
+                break
+
+            game_moves.append(moves[ply * 7 % len(moves)])
+            chess_position.make_move(*game_moves[-1])
+
+    return game_moves
+
+
+def run_game_make_move(moves):
+    chess_game = ChessGame.create_at_starting_position()
+
+    for move in moves:
+        chess_game.make_move(*move)
+
+    return len(moves)
+
+
+def create_played_game(corpus):
+    chess_game = ChessGame.create_at_starting_position()
+
+    for move in get_game_moves():
+        chess_game.make_move(*move)
+
+    return chess_game
+
+
+def run_game_navigation(chess_game):
+    """Goes through the whole history forward and backward, looking at the position of every ply"""
+
+    chess_game.rewind()
+    steps = 0
+
+    for _ in range(len(chess_game.moves)):
+        chess_game.skip()
+        chess_game.current_chess_position.generate_fen()
+        steps += 1
+
+    for _ in range(len(chess_game.moves)):
+        chess_game.skip_backward()
+        chess_game.current_chess_position.generate_fen()
+        steps += 1
+
+    chess_game.fast_forward()
+    chess_game.current_chess_position.generate_fen()
+    return steps + 1
+
+
+BENCHMARKS = [
+    Benchmark(name='ChessPosition.generate_from_fen', run=run_generate_from_fen),
+    Benchmark(name='ChessPosition.generate_fen', setup=create_positions, run=run_generate_fen),
+    Benchmark(name='ChessPosition.copy', setup=create_positions, run=run_copy),
+    Benchmark(name='ChessPosition.make_move+unmake_move', setup=create_positions_with_moves, run=run_make_move),
+    Benchmark(name='ChessPosition.get_state', setup=create_positions, run=run_get_state),
+    Benchmark(name='ChessPosition.calculate_possible_moves', setup=create_positions, run=run_calculate_possible_moves),
+    Benchmark(name='ChessPosition.is_checkmate+is_stalemate', setup=create_positions, run=run_game_status),
+    Benchmark(name='ChessGame.make_move', setup=lambda corpus: get_game_moves(), run=run_game_make_move),
+    Benchmark(name='ChessGame navigation', setup=create_played_game, run=run_game_navigation),
+]
+
+
+def measure_once(benchmark, corpus, number=10):
+    """Returns microseconds per operation of number timed runs"""
+
+    seconds, operations = 0.0, 0
+    gc_was_enabled = gc.isenabled()
+
+    try:
+        for _ in range(number):
+            state = benchmark.setup(corpus)
+            gc.disable()
+            start = time.perf_counter()
+            operations += benchmark.run(state)
+            seconds += time.perf_counter() - start
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return seconds / operations * 1e6
+
+
+def measure(benchmarks, corpus, repeat=30, number=10, warmup=1):
+    """Returns {name: microseconds per operation of every round}, every round measures every benchmark once"""
+
+    for benchmark in benchmarks:
+        for _ in range(warmup):
+            benchmark.run(benchmark.setup(corpus))
+
+    runs = {benchmark.name: [] for benchmark in benchmarks}
+
+    for _ in range(repeat):
+        for benchmark in benchmarks:
+            runs[benchmark.name].append(measure_once(benchmark, corpus, number))
+
+    return runs
+
+
+def run_benchmarks(names=None, repeat=30, number=10, warmup=1, output=None):
+    """Runs benchmarks whose names contain any of names, returns JSON-ready results"""
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS
+                  if not names or any(name in benchmark.name for name in names)]
+
+    max_size = ChessPosition.move_cache.max_size
+    ChessPosition.move_cache.clear()
+    ChessPosition.move_cache.resize(0)
+
+    try:
+        runs = measure(benchmarks, CORPUS, repeat, number, warmup)
+    finally:
+        ChessPosition.move_cache.resize(max_size)
+
+    results = {}
+
+    for name, benchmark_runs in runs.items():
+        results[name] = {'median_us': round(statistics.median(benchmark_runs), 3),
+                         'min_us': round(min(benchmark_runs), 3),
+                         'runs_us': [round(run, 3) for run in benchmark_runs]}
+
+        if output:
+            output(f'{name:<44} median {results[name]["median_us"]:10.2f} us/op  '
+                   f'min {results[name]["min_us"]:10.2f} us/op')
+
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'corpus_size': len(CORPUS),
+            'settings': {'repeat': repeat, 'number': number, 'warmup': warmup},
+            'benchmarks': results}
+
+
+def compare(results, baseline, threshold=0.1, statistic='min_us', output=print):
+    """Compares statistic with baseline results, returns names of benchmarks slower by more than threshold.
+    Minimum is the default, as it is the least affected by other processes"""
+
+    regressions = []
+    output(f'{"Benchmark":<44} {"baseline":>10} {"current":>10} {"change":>8}')
+
+    for name, result in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            output(f'{name:<44} {"-":>10} {result[statistic]:10.2f}      new')
+            continue
+
+        old, new = baseline['benchmarks'][name][statistic], result[statistic]
+        change = new / old - 1 if old else 0.0
+        is_regression = change > threshold
+
+        if is_regression:
+            regressions.append(name)
+
+        output(f'{name:<44} {old:10.2f} {new:10.2f} {change:+8.1%}' + ('  REGRESSION' if is_regression else ''))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark core ChessLogic operations')
+    parser.add_argument('--output', default=None, help='write JSON results to the file, "-" for stdout')
+    parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown reported as regression, 0.1 is 10%%')
+    parser.add_argument('--statistic', choices=('min', 'median'), default='min', help='value compared with baseline')
+    parser.add_argument('--filter', nargs='*', default=None, help='run benchmarks whose names contain these')
+    parser.add_argument('--repeat', type=int, default=30,
+                        help='rounds measuring every benchmark once, median and minimum are reported')
+    parser.add_argument('--number', type=int, default=10, help='runs over the corpus in every measurement')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs before measuring')
+    parser.add_argument('--list', action='store_true', help='show benchmark names and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for benchmark in BENCHMARKS:
+            print(benchmark.name)
+        return 0
+
+    log = (lambda line: print(line, file=sys.stderr)) if args.output == '-' else print
+    results = run_benchmarks(args.filter, args.repeat, args.number, args.warmup, log)
+
+    if args.output:
+        with open_text(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+
+    if args.baseline:
+        with open_text(args.baseline) as file:
+            baseline = json.load(file)
+
+        log('')
+        regressions = compare(results, baseline, args.threshold, f'{args.statistic}_us', log)
+
+        if regressions:
+            log(f'Regressions: {", ".join(regressions)}')
+            return 1
+
+    return 0
+
+
+__all__ = ['Benchmark', 'BENCHMARKS', 'CORPUS', 'measure', 'measure_once', 'run_benchmarks', 'compare']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,8 @@ class Bishop(ChessPiece):
     text = '♝♗'
     char = 'B'
 
+    __slots__ = ()
+
     diagonals = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
 
     def get_possible_moves(self):
@@ -31,5 +33,24 @@ class Bishop(ChessPiece):
 
         return possible_moves
 
+    def get_attack_moves(self):
+        """Bishop attacks cells up to the first piece on every diagonal, even if the piece is of the same color"""
+
+        attack_moves = []
+
+        for dx, dy in self.diagonals:
+            for i in range(1, 8):
+                new_x, new_y = self.x + i * dx, self.y + i * dy
+
+                if not self.is_inside_board(new_x, new_y):  # New position must be inside chess board
+                    break
+
+                attack_moves.append((new_x, new_y))
+
+                if not self.board.is_empty_at(new_x, new_y):  # Ray is blocked by any piece
+                    break
+
+        return attack_moves
+
 
 __all__ = ['Bishop']
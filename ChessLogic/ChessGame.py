@@ -1,5 +1,32 @@
+from collections import Counter
+
 from .Colors import Color
 from .ChessPosition import *
+from .CompactPosition import CompactPosition
+
+
+def get_game_result(chess_position, repetition_count=1):
+    """Returns (result, reason) of the position, result is "1-0", "0-1", "1/2-1/2" or "*" if the game goes on.
+    Checkmate is checked first, as it wins even on the move that completes fifty moves or a repetition"""
+
+    status = chess_position.get_status()
+
+    if status.is_checkmate:
+        return ('0-1' if status.move_color == Color.WHITE else '1-0'), 'checkmate'
+
+    if status.is_stalemate:
+        return '1/2-1/2', 'stalemate'
+
+    if chess_position.is_insufficient_material():
+        return '1/2-1/2', 'insufficient material'
+
+    if repetition_count >= 3:
+        return '1/2-1/2', 'threefold repetition'
+
+    if chess_position.is_fifty_moves():
+        return '1/2-1/2', 'fifty-move rule'
+
+    return '*', None
 
 
 class ChessGame:
@@ -7,22 +34,44 @@ class ChessGame:
 
     initial_chess_position = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
 
+    # Every keyframe_interval plies full position is stored, other plies are stored as moves
+    keyframe_interval = 16
+
     def __init__(self, fen):
         self.initial_position = fen
-        self.history = []
+        self.moves = []  # (x, y, new_x, new_y, promotion) for every ply
+        self.keyframes = []  # CompactPosition for plies 0, keyframe_interval, 2 * keyframe_interval, ...
         self.index = 0
 
+        # Repetition key of every ply, how many times it occurred up to that ply, and counts of all keys
+        self.position_keys = []
+        self.repetitions = []
+        self.key_counts = Counter()
+
+        # Only the watched position is kept as full ChessPosition, its undo records lead back through history
+        self.expanded_position = None
+        self.expanded_index = None
+
         self.restart_game()
 
     def restart_game(self, fen=None):
         if fen:
             self.initial_position = fen
 
-        self.history = []
+        chess_position = ChessPosition.generate_from_fen(self.initial_position)
+
+        self.moves = []
+        self.keyframes = [CompactPosition.from_position(chess_position)]
         self.index = 0
+        self.expanded_position, self.expanded_index = chess_position, 0
+
+        self.position_keys, self.repetitions, self.key_counts = [], [], Counter()
+        self.add_position_key(chess_position.get_repetition_key())
 
-        self.history.append(ChessPosition.generate_from_fen(self.initial_position))
-        self.history[-1].calculate_possible_moves()
+    def add_position_key(self, key):
+        self.key_counts[key] += 1
+        self.position_keys.append(key)
+        self.repetitions.append(self.key_counts[key])
 
     def restart_game_with_starting_position(self):
         self.restart_game(self.initial_chess_position)
@@ -31,17 +80,62 @@ class ChessGame:
     def create_at_starting_position(cls):
         return cls(cls.initial_chess_position)
 
+    @property
+    def history_length(self):
+        return len(self.moves) + 1
+
     @property
     def current_chess_position(self):
-        return self.history[self.index]
+        if self.expanded_index != self.index:
+            self.expanded_position = self.reconstruct_position(self.index)
+            self.expanded_index = self.index
+
+        return self.expanded_position
+
+    def reconstruct_position(self, index):
+        """Gets position at index from the expanded position if it is close, or from the nearest keyframe"""
+
+        steps_back = self.expanded_index - index
+        if 0 < steps_back <= min(self.keyframe_interval, len(self.expanded_position.move_records)):
+            for _ in range(steps_back):
+                self.expanded_position.unmake_move()
+            return self.expanded_position
+
+        keyframe_index = index // self.keyframe_interval * self.keyframe_interval
+
+        if self.expanded_index < index and keyframe_index <= self.expanded_index:
+            chess_position, start = self.expanded_position, self.expanded_index
+        else:
+            chess_position = self.keyframes[index // self.keyframe_interval].to_position()
+            start = keyframe_index
+
+        for move in self.moves[start:index]:
+            chess_position.make_move(*move)
+
+        return chess_position
 
     def make_move(self, x, y, new_x, new_y, promotion=None):
-        self.history = self.history[: self.index + 1]
-        new_chess_position = self.history[-1].copy()
-        move_result = new_chess_position.make_move(x, y, new_x, new_y, promotion)
-        new_chess_position.calculate_possible_moves()
-        self.history.append(new_chess_position)
+        chess_position = self.current_chess_position
+
+        # New move after going back in history discards the following plies
+        if self.index < len(self.moves):
+            del self.moves[self.index:]
+            del self.keyframes[self.index // self.keyframe_interval + 1:]
+
+            for key in self.position_keys[self.index + 1:]:
+                self.key_counts[key] -= 1
+            del self.position_keys[self.index + 1:]
+            del self.repetitions[self.index + 1:]
+
+        move_result = chess_position.make_move(x, y, new_x, new_y, promotion)
+        self.moves.append((x, y, new_x, new_y, promotion))
         self.index += 1
+        self.expanded_index = self.index
+
+        if self.index % self.keyframe_interval == 0:
+            self.keyframes.append(CompactPosition.from_position(chess_position))
+
+        self.add_position_key(chess_position.get_repetition_key())
 
         return move_result
 
@@ -52,10 +146,10 @@ class ChessGame:
         self.index = max(0, self.index - 1)
 
     def skip(self):
-        self.index = min(len(self.history) - 1, self.index + 1)
+        self.index = min(self.history_length - 1, self.index + 1)
 
     def fast_forward(self):
-        self.index = len(self.history) - 1
+        self.index = self.history_length - 1
 
     def restart(self):
         self.restart_game()
@@ -63,26 +157,47 @@ class ChessGame:
     def get_possible_moves(self):
         return self.current_chess_position.get_possible_moves()
 
+    def get_pieces(self):
+        return self.current_chess_position.get_pieces()
+
+    def get_piece_moves(self, x, y):
+        return self.current_chess_position.get_piece_moves(x, y)
+
+    def get_repetition_count(self, index=None):
+        """How many times position at index (current by default) occurred in the game up to it, in O(1)"""
+
+        return self.repetitions[self.index if index is None else index]
+
+    def get_result(self):
+        """Returns (result, reason) of the current position, see get_game_result"""
+
+        return get_game_result(self.current_chess_position, self.get_repetition_count())
+
+    def is_game_over(self):
+        return self.get_result()[0] != '*'
+
     def get_title(self):
+        status = self.current_chess_position.get_status()
+        result, reason = self.get_result()
+
         title = 'Chess'
-        title += ' | Move Turn: ' + ('White' if self.current_chess_position.move_color == Color.WHITE else 'Black')
+        title += ' | Move Turn: ' + ('White' if status.move_color == Color.WHITE else 'Black')
 
-        if self.current_chess_position.is_stalemate():
-            title += ' | Draw by stalemate'
+        if result == '1/2-1/2':
+            title += f' | Draw by {reason}'
             return title
 
-        if self.current_chess_position.is_checkmate():
-            title += f' | {"Black" if self.current_chess_position.move_color == Color.WHITE else "White"} won'
+        if status.is_checkmate:
+            title += f' | {"Black" if status.move_color == Color.WHITE else "White"} won'
             return title
 
-        game_state = self.current_chess_position.get_state()
-        if game_state.white_king_under_attack or game_state.black_king_under_attack:
+        if status.king_under_attack_cell:
             title += ' | King under attack!'
 
-        if self.index != len(self.history) - 1:
-            title += f' | Watching game history {self.index + 1}/{len(self.history)}'
+        if self.index != self.history_length - 1:
+            title += f' | Watching game history {self.index + 1}/{self.history_length}'
 
         return title
 
 
-__all__ = ['ChessGame']
+__all__ = ['ChessGame', 'get_game_result']
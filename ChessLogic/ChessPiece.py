@@ -7,6 +7,8 @@ class ChessPiece:
     text = '??'
     char = '?'
 
+    __slots__ = ('x', 'y', 'color', 'board', 'moves')
+
     def __init__(self, x, y, color, board):
         self.x, self.y = x, y
         self.color = color
@@ -35,21 +37,14 @@ class ChessPiece:
         self.moves.clear()
         self.moves.extend(moves)
 
-    def calculate_valid_moves(self):
-        moves = self.get_possible_moves()
-        valid_moves = []
-
-        for new_x, new_y in moves:
-            position_after_move = self.board.generate_position_after_move(self.x, self.y, new_x, new_y)
-            state_after_move = position_after_move.get_state()
-
-            if self.color == Color.WHITE and state_after_move.white_king_under_attack:
-                continue
+    def calculate_valid_moves(self, legality=None):
+        """Keeps only legal moves, legality describes checks and pins of the piece color"""
 
-            if self.color == Color.BLACK and state_after_move.black_king_under_attack:
-                continue
+        if legality is None:
+            legality = self.board.get_legality_state(self.color)
 
-            valid_moves.append((new_x, new_y))
+        valid_moves = [(new_x, new_y) for new_x, new_y in self.get_possible_moves()
+                       if legality.is_move_legal(self, new_x, new_y)]
 
         self.set_moves(valid_moves)
 
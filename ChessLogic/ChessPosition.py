@@ -1,5 +1,11 @@
 from .Pieces import *
 from .Colors import Color
+from .Zobrist import zobrist_keys
+from .MoveCache import MoveCache
+
+
+class FENError(ValueError):
+    """Raised when FEN cannot be parsed or describes an illegal position"""
 
 
 class ChessState:
@@ -16,6 +22,21 @@ class ChessState:
             self.__setattr__(k, v)
 
 
+class PositionStatus:
+    """Class that describes position status, it is computed once and kept until the position changes"""
+
+    def __init__(self, **kwargs):
+        self.move_color = Color.WHITE
+        self.is_check = False
+        self.is_checkmate = False
+        self.is_stalemate = False
+        self.king_under_attack_cell = None
+        self.state = ChessState()
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+
 class CastlingState:
     """Class that describes which castling are available"""
 
@@ -44,6 +65,61 @@ class CastlingState:
         return result
 
 
+class MoveRecord:
+    """Class that stores everything needed to undo a move"""
+
+    def __init__(self, **kwargs):
+        self.x, self.y = None, None
+        self.new_x, self.new_y = None, None
+        self.moved_piece = None
+        self.captured_piece = None
+        self.captured_index = None
+        self.promoted_piece = None
+        self.rook_move = None
+        self.castling_state = None
+        self.en_passant = None
+        self.halfmove_clock = None
+        self.zobrist_key = None
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+
+class LegalityState:
+    """Class that describes checks and pins of one side, so moves are validated without making them"""
+
+    def __init__(self, **kwargs):
+        self.position = None
+        self.king = None
+        self.checkers = []
+        self.check_block_cells = set()  # Cells where a piece resolves single check by capture or block
+        self.xray_cells = set()  # Cells behind king on checking slider rays
+        self.pinned = {}  # Pinned piece -> cells of its pin ray
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+    def is_move_legal(self, piece, new_x, new_y):
+        if piece is self.king:
+            return not self.position.is_attacked_by(new_x, new_y, piece.color.opposite()) \
+                   and (new_x, new_y) not in self.xray_cells
+
+        # En passant removes two pieces from one line, so its discovered checks are checked by making the move
+        if isinstance(piece, Pawn) and (new_x, new_y) == self.position.en_passant:
+            return not self.position.is_king_attacked_after_move(piece.x, piece.y, new_x, new_y)
+
+        if len(self.checkers) > 1:  # Only king can escape double check
+            return False
+
+        if piece in self.pinned and (new_x, new_y) not in self.pinned[piece]:
+            return False
+
+        if self.checkers and (new_x, new_y) not in self.check_block_cells:
+            return False
+
+        return True
+
+
 def cell_to_coords(cell):  # "e7" -> 4, 6
     return ord(cell[0]) - 97, int(cell[1]) - 1
 
@@ -60,26 +136,252 @@ class ChessPosition:
                   'bishop': Bishop,
                   'queen': Queen}
 
+    # King move -> rook move while castling
+    castling_rook_moves = {(4, 0, 6, 0): (7, 0, 5, 0),  # White king side castling
+                           (4, 0, 2, 0): (0, 0, 3, 0),  # White queen side castling
+                           (4, 7, 6, 7): (7, 7, 5, 7),  # Black king side castling
+                           (4, 7, 2, 7): (0, 7, 3, 7)}  # Black queen side castling
+
+    # Legal moves of positions shared by all games, positions are identified by Zobrist key
+    move_cache = MoveCache()
+
+    pin_directions = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
     def __init__(self,
                  move_color: Color,
                  castling_state: CastlingState,
-                 en_passant=None):
+                 en_passant=None,
+                 halfmove_clock=0,
+                 fullmove_number=1):
 
         self.pieces = []
         self.move_color = move_color
         self.castling_state = castling_state
         self.en_passant = en_passant
+        self.halfmove_clock = halfmove_clock  # Plies since the last capture or pawn move
+        self.fullmove_number = fullmove_number  # Starts at 1 and grows after every black move
 
         self.board = [[None for _ in range(8)] for _ in range(8)]
+        self.move_records = []
+        self.kings = {}
+        self.zobrist_key = zobrist_keys.move_color_key(move_color) \
+            ^ zobrist_keys.castling_key(castling_state) \
+            ^ zobrist_keys.en_passant_key(en_passant)
+
+        # Legal moves and status are computed on first request and kept until the position changes
+        self.possible_moves_ready = False
+        self.status = None
+
+        # Attack maps are built on first use and then updated by make_move and unmake_move
+        self.attack_maps_ready = False
+        self.attack_counts = {}  # Color -> number of pieces attacking every cell
+        self.piece_attacks = {}  # Piece -> cells attacked by it
 
     def add_piece(self, piece):
         self.pieces.append(piece)
         self.board[piece.y][piece.x] = piece
+        self.attack_maps_ready = False
+        self.possible_moves_ready = False
+        self.status = None
+        self.zobrist_key ^= zobrist_keys.piece_key(piece)
+
+        if isinstance(piece, King):
+            self.kings[piece.color] = piece
 
     def calculate_possible_moves(self):
+        self.possible_moves_ready = True
+        cached = self.move_cache.get(self.zobrist_key)
+
+        if cached is not None:
+            piece_moves, _ = cached
+            moves_by_cell = {(x, y): moves for x, y, moves in piece_moves}
+
+            for piece in self.pieces:
+                if piece.color == self.move_color:
+                    piece.set_moves(moves_by_cell.get(piece.position, ()))
+
+            return
+
+        legality = self.get_legality_state(self.move_color)
+
         for piece in self.pieces:
             if piece.color == self.move_color:
-                piece.calculate_valid_moves()
+                piece.calculate_valid_moves(legality)
+
+        # Checking en passant legality makes and unmakes the move, which resets the flag
+        self.possible_moves_ready = True
+
+        self.move_cache.put(self.zobrist_key,
+                            tuple((piece.x, piece.y, tuple(piece.moves))
+                                  for piece in self.pieces if piece.color == self.move_color and piece.moves),
+                            bool(legality.checkers))
+
+    def generate_legal_moves(self):
+        """Returns legal moves of side to move as (x, y, new_x, new_y, promotion)"""
+
+        self.ensure_possible_moves()
+        legal_moves = []
+
+        for piece in self.pieces:
+            if piece.color != self.move_color:
+                continue
+
+            for new_x, new_y in piece.moves:
+                if isinstance(piece, Pawn) and new_y in (0, 7):  # Every promotion is a separate move
+                    legal_moves.extend((piece.x, piece.y, new_x, new_y, promotion) for promotion in 'QRBN')
+                else:
+                    legal_moves.append((piece.x, piece.y, new_x, new_y, None))
+
+        return legal_moves
+
+    def calculate_zobrist_key(self):
+        """Calculates Zobrist key from scratch, make_move keeps zobrist_key updated incrementally"""
+
+        key = zobrist_keys.move_color_key(self.move_color) \
+            ^ zobrist_keys.castling_key(self.castling_state) \
+            ^ zobrist_keys.en_passant_key(self.en_passant)
+
+        for piece in self.pieces:
+            key ^= zobrist_keys.piece_key(piece)
+
+        return key
+
+    def get_king(self, color):
+        return self.kings.get(color)
+
+    def add_piece_attacks(self, piece):
+        attack_counts = self.attack_counts[piece.color]
+        attack_cells = {(x, y) for x, y in piece.get_attack_moves() if 0 <= x < 8 and 0 <= y < 8}
+
+        for x, y in attack_cells:
+            attack_counts[y][x] += 1
+
+        self.piece_attacks[piece] = attack_cells
+
+    def remove_piece_attacks(self, piece):
+        attack_counts = self.attack_counts[piece.color]
+
+        for x, y in self.piece_attacks.pop(piece):
+            attack_counts[y][x] -= 1
+
+    def build_attack_maps(self):
+        self.attack_counts = {color: [[0] * 8 for _ in range(8)] for color in Color}
+        self.piece_attacks = {}
+
+        for piece in self.pieces:
+            self.add_piece_attacks(piece)
+
+        self.attack_maps_ready = True
+
+    def update_attack_maps(self, changed_cells, removed_pieces, added_pieces):
+        """Updates attacks of pieces that moved, and of sliders whose rays pass through changed cells"""
+
+        if not self.attack_maps_ready:
+            return
+
+        for piece in removed_pieces:
+            self.remove_piece_attacks(piece)
+
+        # Knight, king and pawn attacks do not depend on other pieces, slider ray ends at the first piece
+        for piece in self.pieces:
+            if isinstance(piece, (Bishop, Rook, Queen)) and piece in self.piece_attacks \
+                    and not self.piece_attacks[piece].isdisjoint(changed_cells):
+                self.remove_piece_attacks(piece)
+                self.add_piece_attacks(piece)
+
+        for piece in added_pieces:
+            self.add_piece_attacks(piece)
+
+    def is_attacked_by(self, x, y, color):
+        if not self.attack_maps_ready:
+            self.build_attack_maps()
+
+        return self.attack_counts[color][y][x] > 0
+
+    def get_attackers(self, x, y, color):
+        if not self.attack_maps_ready:
+            self.build_attack_maps()
+
+        return [piece for piece, attack_cells in self.piece_attacks.items()
+                if piece.color == color and (x, y) in attack_cells]
+
+    def get_legality_state(self, color):
+        """Finds checkers and pinned pieces once, so every move of the color is validated in O(1)"""
+
+        king = self.get_king(color)
+        legality = LegalityState(position=self, king=king)
+
+        legality.checkers = self.get_attackers(king.x, king.y, color.opposite())
+
+        for checker in legality.checkers:
+            legality.check_block_cells.add(checker.position)
+
+            if isinstance(checker, (Bishop, Rook, Queen)):
+                dx = (king.x > checker.x) - (king.x < checker.x)
+                dy = (king.y > checker.y) - (king.y < checker.y)
+
+                # Cells between checker and king
+                x, y = checker.x + dx, checker.y + dy
+                while (x, y) != king.position:
+                    legality.check_block_cells.add((x, y))
+                    x, y = x + dx, y + dy
+
+                # King cannot step back along the checking ray
+                legality.xray_cells.add((king.x + dx, king.y + dy))
+
+        for dx, dy in self.pin_directions:
+            pin_sliders = (Rook, Queen) if dx == 0 or dy == 0 else (Bishop, Queen)
+            ray = []
+            pinned_piece = None
+
+            for i in range(1, 8):
+                x, y = king.x + i * dx, king.y + i * dy
+                piece = self.get_piece_at(x, y)
+
+                if not (0 <= x < 8 and 0 <= y < 8):
+                    break
+
+                ray.append((x, y))
+
+                if piece is None:
+                    continue
+
+                if piece.color == color:
+                    if pinned_piece:  # Two own pieces on the ray, so nothing is pinned
+                        break
+                    pinned_piece = piece
+
+                else:
+                    if pinned_piece and isinstance(piece, pin_sliders):
+                        legality.pinned[pinned_piece] = set(ray)
+                    break
+
+        return legality
+
+    def ensure_possible_moves(self):
+        if not self.possible_moves_ready:
+            self.calculate_possible_moves()
+
+    def get_piece_moves(self, x, y):
+        piece = self.get_piece_at(x, y)
+
+        if piece is None or piece.color != self.move_color:
+            return []
+
+        self.ensure_possible_moves()
+        return piece.moves[:]
+
+    def is_king_attacked_after_move(self, x, y, new_x, new_y):
+        color = self.get_piece_at(x, y).color
+
+        self.make_move(x, y, new_x, new_y)
+        state = self.get_state()
+        self.unmake_move()
+
+        if color == Color.WHITE:
+            return state.white_king_under_attack
+
+        return state.black_king_under_attack
 
     def get_piece_at(self, x, y):
         if 0 <= x < 8 and 0 <= y < 8:
@@ -91,30 +393,17 @@ class ChessPosition:
         return self.get_piece_at(x, y) is None
 
     def get_state(self):
-        white_attack_cells, black_attack_cells = set(), set()
-        white_king, black_king = None, None
-        state = ChessState(move_color=self.move_color)
-
-        for piece in self.pieces:
-            if isinstance(piece, King):
-                if piece.color == Color.WHITE:
-                    white_king = piece
-                else:
-                    black_king = piece
+        if not self.attack_maps_ready:
+            self.build_attack_maps()
 
-            if piece.color == Color.WHITE:
-                white_attack_cells.update(piece.get_attack_moves())
-            else:
-                black_attack_cells.update(piece.get_attack_moves())
-
-        if white_king.position in black_attack_cells:
-            state.white_king_under_attack = True
+        state = ChessState(move_color=self.move_color)
 
-        if black_king.position in white_attack_cells:
-            state.black_king_under_attack = True
+        state.white_attack = {(x, y) for y in range(8) for x in range(8) if self.attack_counts[Color.WHITE][y][x]}
+        state.black_attack = {(x, y) for y in range(8) for x in range(8) if self.attack_counts[Color.BLACK][y][x]}
 
-        state.white_attack = white_attack_cells
-        state.black_attack = black_attack_cells
+        white_king, black_king = self.kings[Color.WHITE], self.kings[Color.BLACK]
+        state.white_king_under_attack = self.is_attacked_by(white_king.x, white_king.y, Color.BLACK)
+        state.black_king_under_attack = self.is_attacked_by(black_king.x, black_king.y, Color.WHITE)
 
         return state
 
@@ -127,8 +416,17 @@ class ChessPosition:
         moved_piece = self.get_piece_at(x, y)
         captured_piece = self.get_piece_at(new_x, new_y)
 
+        record = MoveRecord(x=x, y=y, new_x=new_x, new_y=new_y,
+                            moved_piece=moved_piece,
+                            castling_state=self.castling_state.copy(),
+                            en_passant=self.en_passant,
+                            halfmove_clock=self.halfmove_clock,
+                            zobrist_key=self.zobrist_key)
+
         if captured_piece:
-            self.pieces.remove(captured_piece)
+            record.captured_piece = captured_piece
+            record.captured_index = self.pieces.index(captured_piece)
+            del self.pieces[record.captured_index]
 
         # En passant capturing
         if isinstance(moved_piece, Pawn):
@@ -139,7 +437,9 @@ class ChessPosition:
                     captured_en_passant = self.get_piece_at(new_x, 4)
 
                 self.board[captured_en_passant.y][captured_en_passant.x] = None
-                self.pieces.remove(captured_en_passant)
+                record.captured_piece = captured_en_passant
+                record.captured_index = self.pieces.index(captured_en_passant)
+                del self.pieces[record.captured_index]
 
         # En passant
         self.en_passant = None
@@ -151,9 +451,10 @@ class ChessPosition:
                 ((self.move_color == Color.WHITE and new_y == 7) or (self.move_color == Color.BLACK and new_y == 0)):
 
             promotion_class = {'Q': Queen, 'B': Bishop, 'N': Knight, 'R': Rook}[promotion]
-            self.pieces.remove(moved_piece)
-            moved_piece = moved_piece.copy(promotion_class, self)
-            self.pieces.append(moved_piece)
+            promoted_piece = moved_piece.copy(promotion_class, self)
+            self.pieces[self.pieces.index(moved_piece)] = promoted_piece
+            record.promoted_piece = promoted_piece
+            moved_piece = promoted_piece
 
         moved_piece.set_position(new_x, new_y)
 
@@ -170,29 +471,13 @@ class ChessPosition:
                 self.castling_state.black_king_side = False
                 self.castling_state.black_queen_side = False
 
-            if (x, y, new_x, new_y) == (4, 0, 6, 0):  # White king side castling
-                moved_rook = self.board[0][7]
-                moved_rook.set_position(5, 0)
-                self.board[0][7] = None
-                self.board[0][5] = moved_rook
-
-            if (x, y, new_x, new_y) == (4, 0, 2, 0):  # White queen side castling
-                moved_rook = self.board[0][0]
-                moved_rook.set_position(3, 0)
-                self.board[0][0] = None
-                self.board[0][3] = moved_rook
-
-            if (x, y, new_x, new_y) == (4, 7, 6, 7):  # Black king side castling
-                moved_rook = self.board[7][7]
-                moved_rook.set_position(5, 7)
-                self.board[7][7] = None
-                self.board[7][5] = moved_rook
-
-            if (x, y, new_x, new_y) == (4, 7, 2, 7):  # Black queen side castling
-                moved_rook = self.board[7][0]
-                moved_rook.set_position(3, 7)
-                self.board[7][0] = None
-                self.board[7][3] = moved_rook
+            if (x, y, new_x, new_y) in self.castling_rook_moves:
+                rook_x, rook_y, new_rook_x, new_rook_y = self.castling_rook_moves[(x, y, new_x, new_y)]
+                moved_rook = self.board[rook_y][rook_x]
+                moved_rook.set_position(new_rook_x, new_rook_y)
+                self.board[rook_y][rook_x] = None
+                self.board[new_rook_y][new_rook_x] = moved_rook
+                record.rook_move = (moved_rook, rook_x, rook_y, new_rook_x, new_rook_y)
 
         # If rook moved, castling with no longer available
         if isinstance(moved_piece, Rook):
@@ -221,11 +506,105 @@ class ChessPosition:
         if (new_x, new_y) == (7, 7):
             self.castling_state.black_king_side = False
 
+        changed_cells, removed_pieces, added_pieces = self.get_move_changes(record)
+        removed_pieces.append(record.moved_piece)
+        added_pieces.append(moved_piece)
+        if record.captured_piece:
+            removed_pieces.append(record.captured_piece)
+        self.update_attack_maps(changed_cells, removed_pieces, added_pieces)
+
+        # Update Zobrist key by all changes
+        self.zobrist_key ^= zobrist_keys.piece_key(record.moved_piece, x, y) \
+            ^ zobrist_keys.piece_key(moved_piece, new_x, new_y) \
+            ^ zobrist_keys.castling_key(record.castling_state) ^ zobrist_keys.castling_key(self.castling_state) \
+            ^ zobrist_keys.en_passant_key(record.en_passant) ^ zobrist_keys.en_passant_key(self.en_passant) \
+            ^ zobrist_keys.black_move
+
+        if record.captured_piece:
+            self.zobrist_key ^= zobrist_keys.piece_key(record.captured_piece)
+
+        if record.rook_move:
+            moved_rook, rook_x, rook_y, new_rook_x, new_rook_y = record.rook_move
+            self.zobrist_key ^= zobrist_keys.piece_key(moved_rook, rook_x, rook_y) \
+                ^ zobrist_keys.piece_key(moved_rook, new_rook_x, new_rook_y)
+
+        # Captures and pawn moves are irreversible, so they restart the fifty-move count
+        if record.captured_piece or isinstance(record.moved_piece, Pawn):
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        if self.move_color == Color.BLACK:
+            self.fullmove_number += 1
+
         self.move_color = self.move_color.opposite()
+        self.move_records.append(record)
+        self.possible_moves_ready = False
+        self.status = None
+
         return {'is_piece_captured': captured_piece is not None}
 
+    def unmake_move(self):
+        """Restores the position as it was before the last make_move call"""
+
+        record = self.move_records.pop()
+        self.move_color = self.move_color.opposite()
+
+        if record.rook_move:
+            moved_rook, rook_x, rook_y, new_rook_x, new_rook_y = record.rook_move
+            self.board[new_rook_y][new_rook_x] = None
+            self.board[rook_y][rook_x] = moved_rook
+            moved_rook.set_position(rook_x, rook_y)
+
+        if record.promoted_piece:
+            self.pieces[self.pieces.index(record.promoted_piece)] = record.moved_piece
+
+        self.board[record.new_y][record.new_x] = None
+        self.board[record.y][record.x] = record.moved_piece
+        record.moved_piece.set_position(record.x, record.y)
+
+        if record.captured_piece:
+            captured_piece = record.captured_piece
+            self.pieces.insert(record.captured_index, captured_piece)
+            self.board[captured_piece.y][captured_piece.x] = captured_piece
+
+        self.castling_state = record.castling_state
+        self.en_passant = record.en_passant
+        self.halfmove_clock = record.halfmove_clock
+        self.zobrist_key = record.zobrist_key
+
+        if self.move_color == Color.BLACK:
+            self.fullmove_number -= 1
+        self.possible_moves_ready = False
+        self.status = None
+
+        changed_cells, removed_pieces, added_pieces = self.get_move_changes(record)
+        removed_pieces.append(record.promoted_piece or record.moved_piece)
+        added_pieces.append(record.moved_piece)
+        if record.captured_piece:
+            added_pieces.append(record.captured_piece)
+        self.update_attack_maps(changed_cells, removed_pieces, added_pieces)
+
+    @staticmethod
+    def get_move_changes(record):
+        """Returns cells changed by the move, and the castling rook which attacks must be updated"""
+
+        changed_cells = [(record.x, record.y), (record.new_x, record.new_y)]
+        moved_pieces = []
+
+        if record.captured_piece:
+            changed_cells.append(record.captured_piece.position)
+
+        if record.rook_move:
+            moved_rook, rook_x, rook_y, new_rook_x, new_rook_y = record.rook_move
+            changed_cells.extend([(rook_x, rook_y), (new_rook_x, new_rook_y)])
+            moved_pieces.append(moved_rook)
+
+        return changed_cells, moved_pieces[:], moved_pieces
+
     def copy(self):
-        chess_position = ChessPosition(self.move_color, self.castling_state.copy(), self.en_passant)
+        chess_position = ChessPosition(self.move_color, self.castling_state.copy(), self.en_passant,
+                                       self.halfmove_clock, self.fullmove_number)
         for piece in self.pieces:
             chess_position.add_piece(piece.copy(None, chess_position))
 
@@ -233,7 +612,24 @@ class ChessPosition:
 
     @classmethod
     def generate_from_fen(cls, fen):
-        pieces, move_color, castling, en_passant, *other = fen.split()
+        fields = fen.split()
+        if len(fields) < 4:
+            raise FENError(f'FEN must have at least 4 fields, got {len(fields)}')
+
+        pieces, move_color, castling, en_passant, *clocks = fields
+
+        rows = pieces.split('/')
+        if len(rows) != 8:
+            raise FENError(f'Board must have 8 rows, got {len(rows)}')
+
+        if move_color not in ('w', 'b'):
+            raise FENError(f'Move color must be "w" or "b", got "{move_color}"')
+
+        if castling != '-' and (not set(castling) <= set('KQkq') or len(set(castling)) != len(castling)):
+            raise FENError(f'Invalid castling availability "{castling}"')
+
+        if en_passant != '-' and (len(en_passant) != 2 or en_passant[0] not in 'abcdefgh' or en_passant[1] not in '36'):
+            raise FENError(f'Invalid en passant cell "{en_passant}"')
 
         castling_state = CastlingState(white_king_side='K' in castling,
                                        white_queen_side='Q' in castling,
@@ -242,15 +638,34 @@ class ChessPosition:
 
         en_passant = None if en_passant == '-' else cell_to_coords(en_passant)
 
-        chess_position = ChessPosition([Color.WHITE, Color.BLACK][move_color == 'b'], castling_state, en_passant)
+        # Move clocks are optional, EPD and short FEN have none
+        if clocks and not (len(clocks) == 2 and clocks[0].isdigit() and clocks[1].isdigit() and int(clocks[1]) >= 1):
+            raise FENError(f'Invalid move clocks "{" ".join(clocks)}"')
+
+        halfmove_clock, fullmove_number = (int(clocks[0]), int(clocks[1])) if clocks else (0, 1)
 
-        for row, row_text in zip(range(7, -1, -1), pieces.split('/')):
+        chess_position = ChessPosition([Color.WHITE, Color.BLACK][move_color == 'b'], castling_state, en_passant,
+                                       halfmove_clock, fullmove_number)
+
+        for row, row_text in zip(range(7, -1, -1), rows):
             column = 0
+            previous_char = ''
 
             for char in row_text:
-                if char in '12345678':
+                if char in '0123456789':
+                    # Empty cells are counted by one digit, "71" is not a valid row even though it sums to 8
+                    if previous_char and previous_char in '0123456789':
+                        raise FENError(f'Row {row + 1} has consecutive digits "{previous_char}{char}"')
+                    if char == '0':
+                        raise FENError(f'Empty cell count in row {row + 1} must be 1-8, got "0"')
+
                     column += int(char)
-                else:
+                    if column > 8:
+                        raise FENError(f'Row {row + 1} is longer than 8 cells')
+                elif char.lower() in 'kqrbnp':
+                    if column >= 8:
+                        raise FENError(f'Row {row + 1} is longer than 8 cells')
+
                     piece_class = dict(k=King,
                                        q=Queen,
                                        r=Rook,
@@ -262,6 +677,13 @@ class ChessPosition:
 
                     chess_position.add_piece(piece_class(column, row, piece_color, chess_position))
                     column += 1
+                else:
+                    raise FENError(f'Unknown piece "{char}" in row {row + 1}')
+
+                previous_char = char
+
+            if column != 8:
+                raise FENError(f'Row {row + 1} has {column} cells instead of 8')
 
         return chess_position
 
@@ -290,11 +712,11 @@ class ChessPosition:
 
         move_color = 'w' if self.move_color == Color.WHITE else 'b'
 
-        castling = str(self.castling_state)
+        castling = str(self.castling_state) or '-'
 
         en_passant = coords_to_cell(*self.en_passant) if self.en_passant else '-'
 
-        return ' '.join([pieces, move_color, castling, en_passant])
+        return ' '.join([pieces, move_color, castling, en_passant, str(self.halfmove_clock), str(self.fullmove_number)])
 
     def show_board(self):
         pieces = [[' ' + (piece.text_repr if piece else '▰▱'[(i + j) % 2]) + ' '
@@ -307,64 +729,123 @@ class ChessPosition:
                  f'\nEn passant: {coords_to_cell(*self.en_passant) if self.en_passant else None}' \
                  f'\nMovement: {self.move_color}'
 
-    def is_any_movement_possible(self):
-        for piece in self.pieces:
-            if piece.moves:
-                return True
+    def has_any_legal_move(self):
+        """Stops at the first legal move, so checkmate and stalemate are found without generating all moves"""
 
-        return False
+        if self.possible_moves_ready:
+            return any(piece.moves for piece in self.pieces if piece.color == self.move_color)
 
-    def is_stalemate(self):
-        state = self.get_state()
-        any_movement_possible = self.is_any_movement_possible()
+        cached = self.move_cache.get(self.zobrist_key)
+        if cached is not None:
+            piece_moves, _ = cached
+            return bool(piece_moves)
 
-        if any_movement_possible:
-            return False
+        legality = self.get_legality_state(self.move_color)
 
-        if not state.white_king_under_attack and self.move_color == Color.WHITE:
-            return True
+        # King goes first, as only king can escape double check. Castling is never the only legal move,
+        # because the king could also step to the cell it passes
+        pieces = [legality.king] + [piece for piece in self.pieces
+                                    if piece.color == self.move_color and piece is not legality.king]
 
-        if not state.black_king_under_attack and self.move_color == Color.BLACK:
-            return True
+        for piece in pieces:
+            for new_x, new_y in piece.get_possible_moves():
+                if legality.is_move_legal(piece, new_x, new_y):
+                    return True
 
         return False
 
-    def is_checkmate(self):
-        state = self.get_state()
-        any_movement_possible = self.is_any_movement_possible()
+    def is_insufficient_material(self):
+        """Neither side can checkmate: only kings with at most one minor piece, or bishops all on one cell color"""
 
-        if any_movement_possible:
-            return False
+        minor_pieces = []
 
-        if state.white_king_under_attack and self.move_color == Color.WHITE:
-            return True
+        for piece in self.pieces:
+            if isinstance(piece, (Pawn, Rook, Queen)):
+                return False
+
+            if isinstance(piece, (Knight, Bishop)):
+                minor_pieces.append(piece)
 
-        if state.black_king_under_attack and self.move_color == Color.BLACK:
+        if len(minor_pieces) <= 1:
             return True
 
-        return False
+        return all(isinstance(piece, Bishop) for piece in minor_pieces) \
+            and len({(piece.x + piece.y) % 2 for piece in minor_pieces}) == 1
 
-    def is_check(self):
-        state = self.get_state()
+    def is_fifty_moves(self):
+        return self.halfmove_clock >= 100
 
-        if state.white_king_under_attack and self.move_color == Color.WHITE:
-            return True
+    def get_repetition_key(self):
+        """Zobrist key where en passant is counted only if a pawn can really capture,
+        because positions differing only by impossible en passant are the same for repetition"""
 
-        if state.black_king_under_attack and self.move_color == Color.BLACK:
-            return True
+        key = self.zobrist_key
 
-        return False
+        if self.en_passant:
+            x, y = self.en_passant
+            pawn_y = y - 1 if self.move_color == Color.WHITE else y + 1
+
+            can_capture = any(isinstance(piece, Pawn) and piece.color == self.move_color
+                              for piece in (self.get_piece_at(x - 1, pawn_y), self.get_piece_at(x + 1, pawn_y)))
+
+            if not can_capture:
+                key ^= zobrist_keys.en_passant_key(self.en_passant)
+
+        return key
+
+    def get_status(self):
+        if self.status is None:
+            state = self.get_state()
+            any_movement_possible = self.has_any_legal_move()
+
+            if self.move_color == Color.WHITE:
+                is_check = state.white_king_under_attack
+            else:
+                is_check = state.black_king_under_attack
+
+            king_under_attack_cell = None
+            if state.white_king_under_attack:
+                king_under_attack_cell = self.kings[Color.WHITE].position
+
+            if state.black_king_under_attack:
+                king_under_attack_cell = self.kings[Color.BLACK].position
+
+            self.status = PositionStatus(move_color=self.move_color,
+                                         is_check=is_check,
+                                         is_checkmate=is_check and not any_movement_possible,
+                                         is_stalemate=not is_check and not any_movement_possible,
+                                         king_under_attack_cell=king_under_attack_cell,
+                                         state=state)
+
+        return self.status
+
+    def is_stalemate(self):
+        return self.get_status().is_stalemate
+
+    def is_checkmate(self):
+        return self.get_status().is_checkmate
+
+    def is_check(self):
+        king = self.kings[self.move_color]
+        return self.is_attacked_by(king.x, king.y, self.move_color.opposite())
 
     def get_possible_moves(self):
+        self.ensure_possible_moves()
         result = []
 
         for piece in self.pieces:
             result.append({'type': piece.char_repr,
                            'x': piece.x,
                            'y': piece.y,
-                           'moves': piece.moves[:]})
+                           'moves': piece.moves[:] if piece.color == self.move_color else []})
 
         return result
 
+    def get_pieces(self):
+        """Returns pieces without generating their moves"""
+
+        return [{'type': piece.char_repr, 'x': piece.x, 'y': piece.y} for piece in self.pieces]
+
 
-__all__ = ['ChessPosition', 'cell_to_coords', 'coords_to_cell']
+__all__ = ['ChessPosition', 'FENError', 'PositionStatus', 'MoveRecord', 'LegalityState', 'cell_to_coords',
+           'coords_to_cell']
@@ -0,0 +1,141 @@
+from array import array
+
+from .Colors import Color
+from .ChessPosition import ChessPosition, CastlingState, coords_to_cell
+from .Pieces import *
+
+
+# Pieces are stored as small integers, positive for white and negative for black
+PIECE_CODES = {Pawn: 1, Knight: 2, Bishop: 3, Rook: 4, Queen: 5, King: 6}
+PIECE_CLASSES = {code: piece_class for piece_class, code in PIECE_CODES.items()}
+PIECE_CHARS = ' PNBRQK'
+
+CASTLINGS = ('white_king_side', 'white_queen_side', 'black_king_side', 'black_queen_side')
+
+
+class PieceView:
+    """Thin read-only view of a piece stored in CompactPosition"""
+
+    __slots__ = ('char_repr', 'x', 'y')
+
+    def __init__(self, char_repr, x, y):
+        self.char_repr = char_repr
+        self.x, self.y = x, y
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+    @property
+    def color(self):
+        return Color.WHITE if self.char_repr.isupper() else Color.BLACK
+
+
+class CompactPosition:
+    """Memory-compact chess position: 64 cell mailbox of piece codes and per color piece square lists.
+    It is used to keep many positions alive, and expanded to ChessPosition to generate moves"""
+
+    __slots__ = ('mailbox', 'piece_squares', 'move_color', 'castling', 'en_passant', 'zobrist_key',
+                 'halfmove_clock', 'fullmove_number')
+
+    def __init__(self, mailbox, move_color, castling, en_passant, zobrist_key, halfmove_clock=0, fullmove_number=1):
+        self.mailbox = mailbox  # array('b') of 64 cells, index is y * 8 + x
+        self.piece_squares = (bytes(square for square, code in enumerate(mailbox) if code > 0),
+                              bytes(square for square, code in enumerate(mailbox) if code < 0))
+        self.move_color = move_color
+        self.castling = castling  # Castling availability as bits in CASTLINGS order
+        self.en_passant = en_passant  # Square index or -1
+        self.zobrist_key = zobrist_key
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+
+    @classmethod
+    def from_position(cls, chess_position):
+        mailbox = array('b', bytes(64))
+
+        for piece in chess_position.pieces:
+            code = PIECE_CODES[piece.__class__]
+            mailbox[piece.y * 8 + piece.x] = code if piece.color == Color.WHITE else -code
+
+        castling = 0
+        for bit, castling_name in enumerate(CASTLINGS):
+            if getattr(chess_position.castling_state, castling_name):
+                castling |= 1 << bit
+
+        en_passant = -1
+        if chess_position.en_passant:
+            en_passant = chess_position.en_passant[1] * 8 + chess_position.en_passant[0]
+
+        return cls(mailbox, chess_position.move_color, castling, en_passant, chess_position.zobrist_key,
+                   chess_position.halfmove_clock, chess_position.fullmove_number)
+
+    @classmethod
+    def generate_from_fen(cls, fen):
+        return cls.from_position(ChessPosition.generate_from_fen(fen))
+
+    def to_position(self):
+        """Expands compact position to ChessPosition"""
+
+        castling_state = CastlingState(**{castling_name: bool(self.castling >> bit & 1)
+                                          for bit, castling_name in enumerate(CASTLINGS)})
+        en_passant = (self.en_passant % 8, self.en_passant // 8) if self.en_passant >= 0 else None
+
+        chess_position = ChessPosition(self.move_color, castling_state, en_passant,
+                                       self.halfmove_clock, self.fullmove_number)
+
+        # Same piece order as in positions generated from FEN
+        for row in range(7, -1, -1):
+            for column in range(8):
+                code = self.mailbox[row * 8 + column]
+                if code:
+                    piece_color = Color.WHITE if code > 0 else Color.BLACK
+                    chess_position.add_piece(PIECE_CLASSES[abs(code)](column, row, piece_color, chess_position))
+
+        return chess_position
+
+    def get_char_at(self, x, y):
+        code = self.mailbox[y * 8 + x]
+
+        if code == 0:
+            return None
+
+        return PIECE_CHARS[code] if code > 0 else PIECE_CHARS[-code].lower()
+
+    def get_pieces(self, color=None):
+        colors = [color] if color else [Color.WHITE, Color.BLACK]
+
+        return [PieceView(self.get_char_at(square % 8, square // 8), square % 8, square // 8)
+                for piece_color in colors for square in self.piece_squares[piece_color.value]]
+
+    def generate_fen(self):
+        rows = []
+
+        for row in range(7, -1, -1):
+            row_text = ''
+            empty_spaces = 0
+
+            for column in range(8):
+                char = self.get_char_at(column, row)
+                if char is None:
+                    empty_spaces += 1
+                    continue
+
+                if empty_spaces > 0:
+                    row_text += f'{empty_spaces}'
+                empty_spaces = 0
+                row_text += char
+
+            if empty_spaces > 0:
+                row_text += f'{empty_spaces}'
+
+            rows.append(row_text)
+
+        move_color = 'w' if self.move_color == Color.WHITE else 'b'
+        castling = ''.join(letter for bit, letter in enumerate('KQkq') if self.castling >> bit & 1) or '-'
+        en_passant = coords_to_cell(self.en_passant % 8, self.en_passant // 8) if self.en_passant >= 0 else '-'
+
+        return ' '.join(['/'.join(rows), move_color, castling, en_passant,
+                         str(self.halfmove_clock), str(self.fullmove_number)])
+
+
+__all__ = ['CompactPosition', 'PieceView']
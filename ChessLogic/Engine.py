@@ -0,0 +1,484 @@
+"""Alpha-beta search engine on top of ChessPosition
+
+Usage: python -m ChessLogic.Engine --fen "<fen>" --depth 6 --time 5
+"""
+
+import argparse
+import sys
+import time
+
+from .ChessPosition import ChessPosition, coords_to_cell
+from .Colors import Color
+from .Pieces import *
+
+
+PIECE_VALUES = {Pawn: 100, Knight: 320, Bishop: 330, Rook: 500, Queen: 900, King: 20000}
+PROMOTION_VALUES = {'Q': 900, 'R': 500, 'B': 330, 'N': 320, None: 0}
+
+# Piece-square tables from white side, first row is the 8th rank
+PIECE_SQUARE_TABLES = {
+    Pawn: [0, 0, 0, 0, 0, 0, 0, 0,
+           50, 50, 50, 50, 50, 50, 50, 50,
+           10, 10, 20, 30, 30, 20, 10, 10,
+           5, 5, 10, 25, 25, 10, 5, 5,
+           0, 0, 0, 20, 20, 0, 0, 0,
+           5, -5, -10, 0, 0, -10, -5, 5,
+           5, 10, 10, -20, -20, 10, 10, 5,
+           0, 0, 0, 0, 0, 0, 0, 0],
+    Knight: [-50, -40, -30, -30, -30, -30, -40, -50,
+             -40, -20, 0, 0, 0, 0, -20, -40,
+             -30, 0, 10, 15, 15, 10, 0, -30,
+             -30, 5, 15, 20, 20, 15, 5, -30,
+             -30, 0, 15, 20, 20, 15, 0, -30,
+             -30, 5, 10, 15, 15, 10, 5, -30,
+             -40, -20, 0, 5, 5, 0, -20, -40,
+             -50, -40, -30, -30, -30, -30, -40, -50],
+    Bishop: [-20, -10, -10, -10, -10, -10, -10, -20,
+             -10, 0, 0, 0, 0, 0, 0, -10,
+             -10, 0, 5, 10, 10, 5, 0, -10,
+             -10, 5, 5, 10, 10, 5, 5, -10,
+             -10, 0, 10, 10, 10, 10, 0, -10,
+             -10, 10, 10, 10, 10, 10, 10, -10,
+             -10, 5, 0, 0, 0, 0, 5, -10,
+             -20, -10, -10, -10, -10, -10, -10, -20],
+    Rook: [0, 0, 0, 0, 0, 0, 0, 0,
+           5, 10, 10, 10, 10, 10, 10, 5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           -5, 0, 0, 0, 0, 0, 0, -5,
+           0, 0, 0, 5, 5, 0, 0, 0],
+    Queen: [-20, -10, -10, -5, -5, -10, -10, -20,
+            -10, 0, 0, 0, 0, 0, 0, -10,
+            -10, 0, 5, 5, 5, 5, 0, -10,
+            -5, 0, 5, 5, 5, 5, 0, -5,
+            0, 0, 5, 5, 5, 5, 0, -5,
+            -10, 5, 5, 5, 5, 5, 0, -10,
+            -10, 0, 5, 0, 0, 0, 0, -10,
+            -20, -10, -10, -5, -5, -10, -10, -20],
+    King: [-30, -40, -40, -50, -50, -40, -40, -30,
+           -30, -40, -40, -50, -50, -40, -40, -30,
+           -30, -40, -40, -50, -50, -40, -40, -30,
+           -30, -40, -40, -50, -50, -40, -40, -30,
+           -20, -30, -30, -40, -40, -30, -30, -20,
+           -10, -20, -20, -20, -20, -20, -20, -10,
+           20, 20, 0, 0, 0, 0, 20, 20,
+           20, 30, 10, 0, 0, 10, 30, 20],
+}
+
+# Material and piece-square bonus for every (piece class, color, x, y), positive is good for the piece owner
+PIECE_SQUARE_VALUES = {(piece_class, color): [[PIECE_VALUES[piece_class]
+                                               + table[(7 - y if color == Color.WHITE else y) * 8 + x]
+                                               for x in range(8)] for y in range(8)]
+                       for piece_class, table in PIECE_SQUARE_TABLES.items() for color in Color}
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000  # Scores above it are mates in some moves
+INFINITY = MATE_SCORE + 1
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+def evaluate(chess_position):
+    """Static evaluation in centipawns from side to move"""
+
+    score = 0
+
+    for piece in chess_position.pieces:
+        value = PIECE_SQUARE_VALUES[piece.__class__, piece.color][piece.y][piece.x]
+        score += value if piece.color == Color.WHITE else -value
+
+    return score if chess_position.move_color == Color.WHITE else -score
+
+
+def get_history_keys(chess_position):
+    """Returns Zobrist keys of earlier positions that can still repeat, i.e. since the last capture or pawn move"""
+
+    keys = []
+
+    for record in reversed(chess_position.move_records):
+        keys.append(record.zobrist_key)
+
+        if record.captured_piece or isinstance(record.moved_piece, Pawn):
+            break
+
+    return keys
+
+
+def move_to_text(move):
+    x, y, new_x, new_y, promotion = move
+    return coords_to_cell(x, y) + coords_to_cell(new_x, new_y) + (promotion.lower() if promotion else '')
+
+
+class SearchAborted(Exception):
+    """Raised inside search when node or time budget is exhausted"""
+
+
+class SearchLimits:
+    """Class that describes search budget, None means no limit"""
+
+    def __init__(self, **kwargs):
+        self.depth = None
+        self.nodes = None
+        self.time = None  # Seconds
+        self.stop_event = None  # Object with is_set(), e.g. threading.Event, to cancel search from outside
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+
+class SearchResult:
+    """Class that describes result of the last completed search iteration"""
+
+    def __init__(self, **kwargs):
+        self.best_move = None
+        self.pv = []
+        self.score = 0
+        self.depth = 0
+        self.nodes = 0
+        self.seconds = 0.0
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mate_in(self):
+        """Moves to mate, negative if side to move is mated, None if score is not a mate"""
+
+        if abs(self.score) < MATE_THRESHOLD:
+            return None
+
+        plies = MATE_SCORE - abs(self.score)
+        return (plies + 1) // 2 if self.score > 0 else -(plies // 2)
+
+    def __str__(self):
+        score = f'mate {self.mate_in}' if self.mate_in is not None else f'cp {self.score}'
+        return f'depth {self.depth} score {score} nodes {self.nodes} nps {self.nodes_per_second:.0f} ' \
+               f'time {self.seconds * 1000:.0f} pv {" ".join(move_to_text(move) for move in self.pv)}'
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results, slot is chosen by Zobrist key and deeper entries are kept"""
+
+    def __init__(self, size=1 << 20):
+        self.size = size
+        self.entries = [None] * size  # (key, depth, score, flag, move)
+
+    def get(self, key):
+        entry = self.entries[key % self.size]
+
+        if entry is not None and entry[0] == key:
+            return entry
+
+        return None
+
+    def put(self, key, depth, score, flag, move):
+        index = key % self.size
+        entry = self.entries[index]
+
+        if entry is None or entry[0] == key or entry[1] <= depth:
+            self.entries[index] = (key, depth, score, flag, move)
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+
+class Engine:
+    """Negamax alpha-beta search with iterative deepening, transposition table and quiescence search"""
+
+    max_ply = 64
+    check_interval = 256  # Nodes between time and stop checks
+    delta_margin = 200  # Centipawns added to captured piece value in quiescence delta pruning
+
+    def __init__(self, table_size=1 << 20, transposition_table=None):
+        # Table can be given from outside, e.g. shared between processes
+        self.transposition_table = transposition_table if transposition_table is not None \
+            else TranspositionTable(table_size)
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        self.history = {}  # (x, y, new_x, new_y) -> score of quiet moves that caused cutoffs
+
+        self.limits = SearchLimits()
+        self.nodes = 0
+        self.start_time = 0.0
+        self.path_keys = []  # Zobrist keys of the game and search path, for repetition detection
+
+    def new_game(self):
+        self.transposition_table.clear()
+        self.history.clear()
+
+    def search(self, chess_position, limits=None, history_keys=(), on_iteration=None):
+        """Searches the position with iterative deepening until limits are reached.
+        history_keys are Zobrist keys of earlier game positions since the last capture or pawn move.
+        on_iteration is called with SearchResult after every completed depth"""
+
+        self.limits = limits or SearchLimits()
+        self.nodes = 0
+        self.start_time = time.perf_counter()
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        self.path_keys = list(history_keys)
+
+        # Search works on a copy, so the caller position can be changed meanwhile
+        chess_position = chess_position.copy()
+
+        result = SearchResult()
+        max_depth = min(self.limits.depth or self.max_ply, self.max_ply)
+
+        for depth in self.iteration_depths(max_depth):
+            pv = []
+
+            try:
+                score = self.negamax(chess_position, depth, -INFINITY, INFINITY, 0, pv, can_abort=depth > 1)
+            except SearchAborted:
+                break
+
+            result = SearchResult(best_move=pv[0] if pv else None, pv=pv, score=score, depth=depth,
+                                  nodes=self.nodes, seconds=time.perf_counter() - self.start_time)
+
+            if on_iteration:
+                on_iteration(result)
+
+            if not pv or abs(score) >= MATE_THRESHOLD:  # No legal moves or forced mate is found
+                break
+
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - self.start_time
+        return result
+
+    def iteration_depths(self, max_depth):
+        """Depths searched by iterative deepening, first one must be 1 so search always finds a move"""
+        return range(1, max_depth + 1)
+
+    def check_limits(self):
+        limits = self.limits
+
+        if limits.nodes is not None and self.nodes >= limits.nodes:
+            raise SearchAborted()
+
+        if limits.time is not None and time.perf_counter() - self.start_time >= limits.time:
+            raise SearchAborted()
+
+        if limits.stop_event is not None and limits.stop_event.is_set():
+            raise SearchAborted()
+
+    def order_moves(self, chess_position, moves, tt_move, ply):
+        """Sorts moves: transposition table move, captures by MVV-LVA, killers, then by history"""
+
+        board = chess_position.board
+        killers = self.killers[ply]
+        history = self.history
+        keys = {}
+
+        for move in moves:
+            x, y, new_x, new_y, promotion = move
+
+            if move == tt_move:
+                keys[move] = 1 << 30
+                continue
+
+            victim = board[new_y][new_x]
+            attacker = board[y][x]
+
+            if victim is None and x != new_x and isinstance(attacker, Pawn):  # En passant
+                victim = attacker
+
+            if victim is not None or promotion:
+                victim_value = PIECE_VALUES[victim.__class__] if victim is not None else 0
+                keys[move] = (1 << 20) + 10 * (victim_value + PROMOTION_VALUES[promotion]) \
+                    - PIECE_VALUES[attacker.__class__] // 10
+            elif move == killers[0]:
+                keys[move] = (1 << 19) + 1
+            elif move == killers[1]:
+                keys[move] = 1 << 19
+            else:
+                keys[move] = history.get((x, y, new_x, new_y), 0)
+
+        moves.sort(key=keys.__getitem__, reverse=True)
+        return moves
+
+    def negamax(self, chess_position, depth, alpha, beta, ply, pv, can_abort=True):
+        self.nodes += 1
+        if can_abort and self.nodes % self.check_interval == 0:
+            self.check_limits()
+
+        key = chess_position.zobrist_key
+
+        # Repetition and dead position are scored as a draw
+        if ply > 0 and (key in self.path_keys or chess_position.is_insufficient_material()):
+            return 0
+
+        if depth <= 0 or ply >= self.max_ply - 1:
+            return self.quiescence(chess_position, alpha, beta, ply, can_abort)
+
+        original_alpha = alpha
+        tt_move = None
+        entry = self.transposition_table.get(key)
+
+        if entry is not None:
+            _, entry_depth, entry_score, flag, tt_move = entry
+
+            if ply > 0 and entry_depth >= depth:
+                entry_score = score_from_table(entry_score, ply)
+
+                if flag == EXACT or (flag == LOWER_BOUND and entry_score >= beta) \
+                        or (flag == UPPER_BOUND and entry_score <= alpha):
+                    if tt_move:
+                        pv[:] = [tt_move]
+                    return entry_score
+
+        moves = chess_position.generate_legal_moves()
+
+        if not moves:
+            return -MATE_SCORE + ply if chess_position.is_check() else 0
+
+        if ply > 0 and chess_position.is_fifty_moves():  # Checked after mate, which wins even on the 100th ply
+            return 0
+
+        self.order_moves(chess_position, moves, tt_move, ply)
+
+        best_score = -INFINITY
+        best_move = None
+        child_pv = []
+        self.path_keys.append(key)
+
+        try:
+            for move in moves:
+                chess_position.make_move(*move)
+                child_pv.clear()
+                score = -self.negamax(chess_position, depth - 1, -beta, -alpha, ply + 1, child_pv, can_abort)
+                chess_position.unmake_move()
+
+                if score > best_score:
+                    best_score, best_move = score, move
+
+                    if score > alpha:
+                        alpha = score
+                        pv[:] = [move] + child_pv
+
+                        if alpha >= beta:
+                            x, y, new_x, new_y, promotion = move
+                            if chess_position.board[new_y][new_x] is None and not promotion:  # Quiet move
+                                self.store_quiet_cutoff(move, depth, ply)
+                            break
+        finally:
+            self.path_keys.pop()
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+
+        self.transposition_table.put(key, depth, score_to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def store_quiet_cutoff(self, move, depth, ply):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1], killers[0] = killers[0], move
+
+        history_key = move[:4]
+        self.history[history_key] = self.history.get(history_key, 0) + depth * depth
+
+    def quiescence(self, chess_position, alpha, beta, ply, can_abort=True):
+        """Searches captures and promotions until the position is quiet, all moves are searched in check"""
+
+        self.nodes += 1
+        if can_abort and self.nodes % self.check_interval == 0:
+            self.check_limits()
+
+        in_check = chess_position.is_check()
+
+        if not in_check:
+            stand_pat = evaluate(chess_position)
+
+            if stand_pat >= beta or ply >= self.max_ply - 1:
+                return stand_pat
+
+            alpha = max(alpha, stand_pat)
+
+        moves = chess_position.generate_legal_moves()
+
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+
+        if not in_check:
+            board = chess_position.board
+            moves = [move for move in moves
+                     if board[move[3]][move[2]] is not None or move[4] == 'Q'
+                     or (move[0] != move[2] and isinstance(board[move[1]][move[0]], Pawn))]
+
+            # Delta pruning: skip captures that cannot raise alpha even with a margin
+            moves = [move for move in moves
+                     if stand_pat + self.delta_margin + PROMOTION_VALUES[move[4]]
+                     + PIECE_VALUES.get(board[move[3]][move[2]].__class__, PIECE_VALUES[Pawn]) > alpha]
+
+        self.order_moves(chess_position, moves, None, min(ply, self.max_ply - 1))
+        best_score = alpha if not in_check else -INFINITY
+
+        for move in moves:
+            chess_position.make_move(*move)
+            score = -self.quiescence(chess_position, -beta, -alpha, ply + 1, can_abort)
+            chess_position.unmake_move()
+
+            if score > best_score:
+                best_score = score
+
+                if score > alpha:
+                    alpha = score
+
+                    if alpha >= beta:
+                        break
+
+        return best_score
+
+
+def score_to_table(score, ply):
+    """Mate scores are stored relative to the position, not to the root"""
+
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search the best move in a position')
+    parser.add_argument('--fen', default='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
+    parser.add_argument('--depth', type=int, default=None, help='maximal search depth')
+    parser.add_argument('--nodes', type=int, default=None, help='maximal number of nodes')
+    parser.add_argument('--time', type=float, default=None, help='maximal search time in seconds')
+    args = parser.parse_args(argv)
+
+    if args.depth is None and args.nodes is None and args.time is None:
+        args.depth = 4
+
+    chess_position = ChessPosition.generate_from_fen(args.fen)
+    limits = SearchLimits(depth=args.depth, nodes=args.nodes, time=args.time)
+
+    result = Engine().search(chess_position, limits, on_iteration=lambda result: print(f'info {result}'))
+    print(f'bestmove {move_to_text(result.best_move) if result.best_move else "(none)"}')
+
+    return 0
+
+
+__all__ = ['Engine', 'SearchLimits', 'SearchResult', 'TranspositionTable', 'evaluate', 'get_history_keys',
+           'move_to_text', 'PIECE_VALUES', 'MATE_SCORE']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
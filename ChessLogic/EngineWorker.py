@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import queue
+
+from .ChessPosition import ChessPosition
+from .Engine import Engine, SearchLimits, SearchResult, get_history_keys
+from .OpeningBook import OpeningBook
+from .Tablebase import Tablebase
+
+
+class RequestCancellation:
+    """Stop event of a single request: it is set once the caller starts another request or cancels this one"""
+
+    def __init__(self, latest_request, request_id):
+        self.latest_request = latest_request
+        self.request_id = request_id
+
+    def is_set(self):
+        return self.latest_request.value != self.request_id
+
+
+def run_worker(requests, results, latest_request, book_path=None, tablebase_directory=None):
+    """Worker process loop: searches requested positions one by one and posts results back"""
+
+    engine = Engine()
+    book = OpeningBook(book_path) if book_path and os.path.exists(book_path) else None
+    tablebase = Tablebase(tablebase_directory) if tablebase_directory else None
+
+    while True:
+        request = requests.get()
+
+        if request is None:
+            return
+
+        request_id, kind, fen, history_keys, think_time = request
+        if latest_request.value != request_id:  # Cancelled while waiting in the queue
+            continue
+
+        chess_position = ChessPosition.generate_from_fen(fen)
+
+        # Book and tablebase moves are answered without search
+        known_move = book.choose_move(chess_position) if book else None
+        if not known_move and tablebase:
+            known_move = tablebase.best_move(chess_position)
+
+        if known_move:
+            results.put((request_id, kind, SearchResult(best_move=known_move, pv=[known_move])))
+            continue
+
+        limits = SearchLimits(time=think_time, stop_event=RequestCancellation(latest_request, request_id))
+
+        # Single legal move needs no thinking
+        if len(chess_position.generate_legal_moves()) == 1:
+            limits.depth = 1
+
+        result = engine.search(chess_position, limits, history_keys)
+        results.put((request_id, kind, result))
+
+
+class EngineWorker:
+    """Runs Engine in a separate process, so search does not block drawing and event handling.
+    Only the latest request is searched, results of cancelled requests are dropped"""
+
+    def __init__(self, book_path=None, tablebase_directory=None):
+        self.book_path = book_path
+        self.tablebase_directory = tablebase_directory
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.latest_request = multiprocessing.Value('i', 0, lock=False)  # Id of the only request worth searching
+        self.request_id = 0
+        self.process = None
+
+    def start(self):
+        self.process = multiprocessing.Process(target=run_worker,
+                                               args=(self.requests, self.results, self.latest_request,
+                                                     self.book_path, self.tablebase_directory),
+                                               daemon=True)
+        self.process.start()
+
+    @property
+    def is_thinking(self):
+        return self.latest_request.value != 0
+
+    def search(self, chess_position, think_time, kind='move'):
+        """Starts search of the position instead of the current one, returns request id"""
+
+        self.request_id += 1
+        self.latest_request.value = self.request_id
+
+        self.requests.put((self.request_id, kind, chess_position.generate_fen(),
+                           get_history_keys(chess_position), think_time))
+
+        return self.request_id
+
+    def cancel(self):
+        self.latest_request.value = 0
+
+    def poll(self):
+        """Returns (kind, SearchResult) of finished current request or None, never blocks"""
+
+        while True:
+            try:
+                request_id, kind, result = self.results.get_nowait()
+            except queue.Empty:
+                return None
+
+            if request_id == self.latest_request.value:
+                self.latest_request.value = 0
+                return kind, result
+
+    def close(self):
+        self.cancel()
+
+        if self.process is not None:
+            self.requests.put(None)
+            self.process.join(timeout=1)
+
+            if self.process.is_alive():
+                self.process.terminate()
+
+            self.process = None
+
+
+__all__ = ['EngineWorker']
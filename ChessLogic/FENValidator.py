@@ -0,0 +1,165 @@
+"""Validation and normalization of FEN and EPD positions
+
+Usage: python -m ChessLogic.FENValidator positions.epd --output normalized.epd --errors errors.txt --jobs 8
+"""
+
+import argparse
+import sys
+from contextlib import nullcontext
+
+from .BatchProcessing import split_batches, map_batches, open_text
+from .ChessPosition import ChessPosition, FENError, coords_to_cell
+from .Colors import Color
+from .Pieces import *
+
+
+# Castling availability -> king and rook that must stay at their initial cells
+CASTLING_PIECES = {'white_king_side': (Color.WHITE, (4, 0), (7, 0)),
+                   'white_queen_side': (Color.WHITE, (4, 0), (0, 0)),
+                   'black_king_side': (Color.BLACK, (4, 7), (7, 7)),
+                   'black_queen_side': (Color.BLACK, (4, 7), (0, 7))}
+
+
+def find_position_errors(chess_position):
+    """Returns list of reasons why the position cannot happen in a game"""
+
+    errors = []
+
+    for color in Color:
+        pieces = [piece for piece in chess_position.pieces if piece.color == color]
+        kings = [piece for piece in pieces if isinstance(piece, King)]
+        pawns = [piece for piece in pieces if isinstance(piece, Pawn)]
+
+        if len(kings) != 1:
+            errors.append(f'{color} must have exactly one king, found {len(kings)}')
+
+        if len(pawns) > 8:
+            errors.append(f'{color} has {len(pawns)} pawns')
+
+        if len(pieces) > 16:
+            errors.append(f'{color} has {len(pieces)} pieces')
+
+        for pawn in pawns:
+            if pawn.y in (0, 7):
+                errors.append(f'{color} pawn at back rank {coords_to_cell(pawn.x, pawn.y)}')
+
+    if errors:  # Attack checks need exactly one king for both sides
+        return errors
+
+    waiting_king = chess_position.get_king(chess_position.move_color.opposite())
+    if chess_position.is_attacked_by(waiting_king.x, waiting_king.y, chess_position.move_color):
+        errors.append(f'{chess_position.move_color.opposite()} is not to move but is in check')
+
+    for castling, (color, king_cell, rook_cell) in CASTLING_PIECES.items():
+        if not getattr(chess_position.castling_state, castling):
+            continue
+
+        king = chess_position.get_piece_at(*king_cell)
+        rook = chess_position.get_piece_at(*rook_cell)
+
+        if not isinstance(king, King) or king.color != color or not isinstance(rook, Rook) or rook.color != color:
+            errors.append(f'Castling {castling} is available, but king or rook has moved')
+
+    if chess_position.en_passant:
+        x, y = chess_position.en_passant
+        expected_y, direction = (5, -1) if chess_position.move_color == Color.WHITE else (2, 1)
+        pawn = chess_position.get_piece_at(x, y + direction)
+
+        if y != expected_y:
+            errors.append(f'En passant cell {coords_to_cell(x, y)} does not match move color')
+
+        elif not isinstance(pawn, Pawn) or pawn.color != chess_position.move_color.opposite() \
+                or not chess_position.is_empty_at(x, y) or not chess_position.is_empty_at(x, y - direction):
+            errors.append(f'En passant cell {coords_to_cell(x, y)} does not follow a pawn double step')
+
+    return errors
+
+
+def validate_fen(fen):
+    """Parses FEN and checks position legality, raises FENError with all found problems"""
+
+    chess_position = ChessPosition.generate_from_fen(fen)
+    errors = find_position_errors(chess_position)
+
+    if errors:
+        raise FENError('; '.join(errors))
+
+    return chess_position
+
+
+def normalize_fen(line):
+    """Returns validated position in canonical form, with FEN move clocks or EPD operations kept as is"""
+
+    fields = line.split(maxsplit=4)
+    if len(fields) < 4:
+        raise FENError(f'FEN must have at least 4 fields, got {len(fields)}')
+
+    rest = fields[4] if len(fields) > 4 else ''
+
+    if rest and rest.split()[0].isdigit():  # FEN move clocks
+        clocks = rest.split()
+        if len(clocks) != 2 or not all(clock.isdigit() for clock in clocks) or int(clocks[1]) < 1:
+            raise FENError(f'Invalid move clocks "{rest}"')
+
+    chess_position = validate_fen(' '.join(fields[:4]))
+    board_fields = chess_position.generate_fen().split()[:4]  # Clocks of the line are kept, not the default ones
+
+    return ' '.join(board_fields + [rest]).strip()
+
+
+def validate_batch(numbered_lines):
+    """Returns (line_number, normalized_fen, error) for every line"""
+
+    results = []
+
+    for line_number, line in numbered_lines:
+        try:
+            results.append((line_number, normalize_fen(line), None))
+        except FENError as e:
+            results.append((line_number, None, str(e)))
+        except Exception as e:  # Report any unexpected failure as error of this line
+            results.append((line_number, None, f'{e.__class__.__name__}: {e}'))
+
+    return results
+
+
+def validate_lines(lines, jobs=None, batch_size=1000):
+    """Validates lines lazily in input order, at most 2 * jobs batches are kept in memory at once"""
+
+    numbered_lines = ((line_number, line.strip()) for line_number, line in enumerate(lines, 1) if line.strip())
+
+    for results in map_batches(validate_batch, split_batches(numbered_lines, batch_size), jobs):
+        yield from results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate and normalize FEN/EPD positions')
+    parser.add_argument('input', help='file with one position per line, "-" for stdin, .gz is supported')
+    parser.add_argument('--output', default='-', help='file for normalized positions, stdout by default')
+    parser.add_argument('--errors', default=None, help='file for error report, stderr by default')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes, all cores by default')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    valid, invalid = 0, 0
+
+    with open_text(args.input, 'r') as input_file, open_text(args.output, 'w') as output_file, \
+            open_text(args.errors, 'w') if args.errors else nullcontext(sys.stderr) as errors_file:
+
+        for line_number, normalized_fen, error in validate_lines(input_file, args.jobs, args.batch_size):
+            if error is None:
+                valid += 1
+                output_file.write(normalized_fen + '\n')
+            else:
+                invalid += 1
+                errors_file.write(f'line {line_number}: {error}\n')
+
+    print(f'Valid: {valid}, invalid: {invalid}', file=sys.stderr)
+    return 1 if invalid else 0
+
+
+__all__ = ['validate_fen', 'normalize_fen', 'find_position_errors', 'validate_lines']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
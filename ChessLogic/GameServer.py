@@ -0,0 +1,435 @@
+"""Asyncio server hosting many chess games at once. Clients send JSON lines over TCP and receive JSON lines:
+
+    {"type": "new", "fen": "<optional fen>"}          -> {"type": "game", "game": "1", "fen": ..., "legal_moves": [...]}
+    {"type": "join", "game": "1"}                     -> the same, updates of the game are pushed to the client
+    {"type": "state", "game": "1"}                    -> the same without subscribing
+    {"type": "move", "game": "1", "move": "e2e4"}     -> {"type": "moved", ..., "latency_ms": 1.2}
+    {"type": "leave" | "close", "game": "1"}, {"type": "stats"}
+
+Subscribers of the game get {"type": "update", ...} after every move of another client.
+Legal move generation and game result run in a process pool, so slow positions do not stall the event loop.
+Requests of one connection are handled in order, "id" of the request is copied to its response
+
+Usage: python -m ChessLogic.GameServer serve --port 8765 --jobs 4
+       python -m ChessLogic.GameServer bench --port 8765 --games 2000 --plies 40
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .ChessGame import ChessGame, get_game_result
+from .ChessPosition import ChessPosition
+from .Engine import move_to_text
+from .FENValidator import validate_fen
+from .UCI import parse_move
+
+
+MAX_LINE = 1 << 16  # Longest accepted request
+MAX_WRITE_BUFFER = 1 << 20  # Clients that do not read their updates are disconnected
+
+
+def analyse_position(fen, repetition_count=1, validate=False):
+    """Runs in executor: returns (legal moves as UCI text, result, reason) of the position.
+    Only FENs from clients are validated, positions reached by legal moves are parsed directly"""
+
+    chess_position = validate_fen(fen) if validate else ChessPosition.generate_from_fen(fen)
+    legal_moves = [move_to_text(move) for move in chess_position.generate_legal_moves()]
+    result, reason = get_game_result(chess_position, repetition_count)
+
+    return legal_moves, result, reason
+
+
+class RequestError(Exception):
+    """Raised when request cannot be done, its message is sent back to the client"""
+
+
+class LatencyStats:
+    """Move latencies in seconds, percentiles are computed over the latest window of moves"""
+
+    def __init__(self, window=10000):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.latest = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self.latest.append(seconds)
+
+    def percentile(self, fraction):
+        if not self.latest:
+            return 0.0
+
+        ordered = sorted(self.latest)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """Milliseconds, rounded for output"""
+
+        return {'moves': self.count,
+                'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                'p50_ms': round(self.percentile(0.5) * 1000, 3),
+                'p99_ms': round(self.percentile(0.99) * 1000, 3),
+                'max_ms': round(self.maximum * 1000, 3)}
+
+
+class GameSession:
+    """Class that describes hosted game: ChessGame, analysis of its current position and subscribed clients"""
+
+    def __init__(self, **kwargs):
+        self.game_id = None
+        self.chess_game = None
+        self.fen = None
+        self.legal_moves = []
+        self.result = '*'
+        self.reason = None
+        self.subscribers = set()
+        self.lock = asyncio.Lock()  # Moves of one game are applied one by one, different games go in parallel
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+    def to_message(self, message_type):
+        return {'type': message_type, 'game': self.game_id, 'fen': self.fen, 'legal_moves': self.legal_moves,
+                'result': self.result, 'reason': self.reason, 'ply': len(self.chess_game.moves)}
+
+
+class Client:
+    """Connected client, writes are buffered so pushing updates never waits for a slow reader"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.games = set()
+
+    def send(self, message):
+        if self.writer.is_closing():
+            return
+
+        self.writer.write(json.dumps(message).encode() + b'\n')
+
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.writer.close()
+
+
+class GameServer:
+    """Keeps ChessGame sessions by ID and serves client requests"""
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.sessions = {}
+        self.clients = set()
+        self.game_ids = itertools.count(1)
+        self.latency = LatencyStats()
+
+    async def analyse(self, fen, repetition_count=1, validate=False):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, analyse_position, fen, repetition_count, validate)
+
+    async def handle_client(self, reader, writer):
+        client = Client(writer)
+        self.clients.add(client)
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Line is longer than reader limit
+                    client.send({'type': 'error', 'message': 'Request is too long'})
+                    break
+
+                if not line:
+                    break
+
+                # Requests of one connection are handled in order, so pipelined "new" and "move" work.
+                # Other connections are served meanwhile, as the analysis is awaited in the executor
+                await self.handle_line(client, line)
+
+        except ConnectionError:
+            pass
+
+        finally:
+            self.clients.discard(client)
+
+            for game_id in client.games:
+                if game_id in self.sessions:
+                    self.sessions[game_id].subscribers.discard(client)
+
+            writer.close()
+
+    async def handle_line(self, client, line):
+        request = {}
+        start = time.perf_counter()
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError('Request must be JSON object')
+
+            response = await self.handle_request(client, request, start)
+
+        except json.JSONDecodeError as e:
+            response = {'type': 'error', 'message': f'Invalid JSON: {e}'}
+
+        except (RequestError, ValueError) as e:  # ValueError includes FENError from the executor
+            response = {'type': 'error', 'message': str(e)}
+
+        except Exception as e:  # Client waiting for the id must get a response anyway
+            response = {'type': 'error', 'message': f'Internal error: {e!r}'}
+
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+
+        client.send(response)
+
+    def get_session(self, request):
+        session = self.sessions.get(str(request.get('game')))
+
+        if session is None:
+            raise RequestError(f'Unknown game {request.get("game")}')
+
+        return session
+
+    async def handle_request(self, client, request, start):
+        request_type = request.get('type')
+
+        if request_type == 'new':
+            fen = request.get('fen') or ChessGame.initial_chess_position
+            if not isinstance(fen, str):
+                raise RequestError('FEN must be a string')
+
+            legal_moves, result, reason = await self.analyse(fen, validate=True)
+
+            game_id = str(next(self.game_ids))
+            session = GameSession(game_id=game_id, chess_game=ChessGame(fen), fen=fen, legal_moves=legal_moves,
+                                  result=result, reason=reason)
+            self.sessions[game_id] = session
+            self.subscribe(client, session)
+
+            return session.to_message('game')
+
+        if request_type == 'join':
+            session = self.get_session(request)
+            self.subscribe(client, session)
+            return session.to_message('game')
+
+        if request_type == 'state':
+            return self.get_session(request).to_message('game')
+
+        if request_type == 'move':
+            return await self.make_move(client, self.get_session(request), str(request.get('move')), start)
+
+        if request_type == 'leave':
+            session = self.get_session(request)
+            session.subscribers.discard(client)
+            client.games.discard(session.game_id)
+            return {'type': 'left', 'game': session.game_id}
+
+        if request_type == 'close':
+            session = self.sessions.pop(self.get_session(request).game_id)
+
+            for subscriber in session.subscribers:
+                subscriber.games.discard(session.game_id)
+                if subscriber is not client:
+                    subscriber.send({'type': 'closed', 'game': session.game_id})
+
+            return {'type': 'closed', 'game': session.game_id}
+
+        if request_type == 'stats':
+            return self.get_stats()
+
+        raise RequestError(f'Unknown request type {request_type}')
+
+    def subscribe(self, client, session):
+        session.subscribers.add(client)
+        client.games.add(session.game_id)
+
+    async def make_move(self, client, session, move_text, start):
+        async with session.lock:
+            if session.result != '*':
+                raise RequestError(f'Game is over: {session.result}')
+
+            if move_text not in session.legal_moves:
+                raise RequestError(f'Illegal move {move_text}')
+
+            # The move is tried on the position and taken back, so the session does not change until
+            # the analysis succeeds, and requests handled during the analysis see the previous state
+            chess_game = session.chess_game
+            move = parse_move(move_text)
+            chess_position = chess_game.current_chess_position
+            chess_position.make_move(*move)
+            fen = chess_position.generate_fen()
+            repetition_count = chess_game.key_counts[chess_position.get_repetition_key()] + 1
+            chess_position.unmake_move()
+
+            legal_moves, result, reason = await self.analyse(fen, repetition_count)
+
+            chess_game.make_move(*move)
+            session.fen, session.legal_moves, session.result, session.reason = fen, legal_moves, result, reason
+
+            latency = time.perf_counter() - start
+            self.latency.add(latency)
+
+            update = session.to_message('update')
+            update.update(move=move_text, latency_ms=round(latency * 1000, 3))
+
+            for subscriber in session.subscribers:
+                if subscriber is not client:
+                    subscriber.send(update)
+
+            return dict(update, type='moved')
+
+    def get_stats(self):
+        return dict(self.latency.summary(), type='stats', games=len(self.sessions), clients=len(self.clients))
+
+    async def report_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(json.dumps(self.get_stats()), file=sys.stderr, flush=True)
+
+    async def serve(self, host, port, stats_interval=None):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        print(f'Serving on {", ".join(str(socket.getsockname()) for socket in server.sockets)}', file=sys.stderr)
+
+        if stats_interval:
+            asyncio.ensure_future(self.report_stats(stats_interval))
+
+        async with server:
+            await server.serve_forever()
+
+
+class BenchmarkConnection:
+    """Client connection that matches responses to requests by "id" and ignores pushed updates"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.request_ids = itertools.count()
+        self.pending = {}
+        self.reading = asyncio.ensure_future(self.read_responses())
+
+    async def read_responses(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+
+            response = json.loads(line)
+            future = self.pending.pop(response.get('id'), None)
+            if future is not None:
+                future.set_result(response)
+
+        for future in self.pending.values():
+            future.set_exception(ConnectionError('Server closed the connection'))
+        self.pending.clear()
+
+    async def request(self, message):
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+
+        self.writer.write(json.dumps(dict(message, id=request_id)).encode() + b'\n')
+        return await future
+
+    async def close(self):
+        self.reading.cancel()
+        self.writer.close()
+
+
+async def play_random_game(connection, plies, generator, latencies):
+    """Plays random legal moves in a new game, returns number of moves"""
+
+    state = await connection.request({'type': 'new'})
+    game_id = state['game']
+
+    for _ in range(plies):
+        if state['result'] != '*':
+            break
+
+        start = time.perf_counter()
+        state = await connection.request({'type': 'move', 'game': game_id,
+                                          'move': generator.choice(state['legal_moves'])})
+        latencies.append(time.perf_counter() - start)
+
+        if state['type'] == 'error':
+            raise RequestError(state['message'])
+
+    await connection.request({'type': 'close', 'game': game_id})
+
+
+async def run_benchmark(host, port, games, clients, plies, seed=None):
+    """Plays games concurrently over clients connections, one per game by default.
+    Server handles requests of a connection in order, so games sharing a connection wait for each other.
+    Returns round-trip latency summary"""
+
+    clients = clients or games
+    generator = random.Random(seed)
+    connections = [BenchmarkConnection(*await asyncio.open_connection(host, port, limit=MAX_LINE))
+                   for _ in range(clients)]
+    latencies = LatencyStats(window=None)
+
+    start = time.perf_counter()
+    moves = []
+    await asyncio.gather(*[play_random_game(connections[index % clients], plies, generator, moves)
+                           for index in range(games)])
+    seconds = time.perf_counter() - start
+
+    for latency in moves:
+        latencies.add(latency)
+
+    for connection in connections:
+        await connection.close()
+
+    return dict(latencies.summary(), games=games, seconds=round(seconds, 3),
+                moves_per_second=round(len(moves) / seconds, 1) if seconds else 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host many chess games over TCP with JSON lines')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='run the server')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--jobs', type=int, default=None, help='analysis processes, all cores by default')
+    serve_parser.add_argument('--stats-interval', type=float, default=None, help='seconds between stats lines')
+
+    bench_parser = subparsers.add_parser('bench', help='play random games against running server')
+    bench_parser.add_argument('--host', default='127.0.0.1')
+    bench_parser.add_argument('--port', type=int, default=8765)
+    bench_parser.add_argument('--games', type=int, default=1000, help='games played at once')
+    bench_parser.add_argument('--clients', type=int, default=None,
+                              help='connections the games are spread over, one per game by default')
+    bench_parser.add_argument('--plies', type=int, default=40, help='moves played in every game at most')
+    bench_parser.add_argument('--seed', type=int, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        summary = asyncio.run(run_benchmark(args.host, args.port, args.games, args.clients, args.plies, args.seed))
+        print(json.dumps(summary))
+        return 0
+
+    with ProcessPoolExecutor(args.jobs or os.cpu_count() or 1) as executor:
+        try:
+            asyncio.run(GameServer(executor).serve(args.host, args.port, args.stats_interval))
+        except KeyboardInterrupt:
+            pass
+
+    return 0
+
+
+__all__ = ['GameServer', 'GameSession', 'LatencyStats', 'analyse_position', 'run_benchmark']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
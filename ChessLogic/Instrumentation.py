@@ -0,0 +1,232 @@
+"""Opt-in call counters and timers of ChessLogic hot methods, and cProfile of FEN workloads.
+While disabled, methods are the original class functions, so there is no overhead at all. Enabling replaces them
+with counting wrappers; timings are inclusive, e.g. calculate_possible_moves includes piece get_possible_moves
+
+    with Instrumentation() as instrumentation:
+        perft(chess_position, 3)
+    print(instrumentation.snapshot())
+
+Usage: python -m ChessLogic.Instrumentation --suite --depth 3 --profile perft.prof --top 25
+       python -m ChessLogic.Instrumentation positions.epd --depth 2 --copies --no-cache
+"""
+
+import argparse
+import functools
+import sys
+import time
+
+from .BatchProcessing import open_text
+from .ChessPosition import ChessPosition
+from .Perft import REFERENCE_POSITIONS, perft, perft_with_copies, timed_perft
+from .Pieces import *
+
+
+POSITION_METHODS = ('copy', 'make_move', 'unmake_move', 'get_state', 'get_status', 'calculate_possible_moves',
+                    'generate_legal_moves')
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+
+counters = {}  # Name -> [calls, nanoseconds]
+allocations = {}  # Piece class name -> pieces created
+originals = {}  # (class, attribute) -> original function, only while enabled
+
+
+def instrument(cls, attribute, name):
+    """Replaces method of the class with a wrapper counting its calls and time"""
+
+    original = cls.__dict__[attribute]
+    counter = counters.setdefault(name, [0, 0])
+    perf_counter_ns = time.perf_counter_ns
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            counter[0] += 1
+            counter[1] += perf_counter_ns() - start
+
+    originals[cls, attribute] = original
+    setattr(cls, attribute, wrapper)
+
+
+def instrument_allocations():
+    """Counts pieces created by their class, all piece classes share ChessPiece.__init__"""
+
+    original = ChessPiece.__dict__['__init__']
+
+    @functools.wraps(original)
+    def wrapper(self, *args, **kwargs):
+        name = self.__class__.__name__
+        allocations[name] = allocations.get(name, 0) + 1
+        original(self, *args, **kwargs)
+
+    originals[ChessPiece, '__init__'] = original
+    ChessPiece.__init__ = wrapper
+
+
+def is_enabled():
+    return bool(originals)
+
+
+def enable():
+    """Starts counting, counters keep values of earlier runs until reset"""
+
+    if is_enabled():
+        return
+
+    for attribute in POSITION_METHODS:
+        instrument(ChessPosition, attribute, f'ChessPosition.{attribute}')
+
+    for piece_class in PIECE_CLASSES:
+        instrument(piece_class, 'get_possible_moves', f'{piece_class.__name__}.get_possible_moves')
+
+    instrument_allocations()
+
+
+def disable():
+    """Restores original methods"""
+
+    for (cls, attribute), original in originals.items():
+        setattr(cls, attribute, original)
+
+    originals.clear()
+
+
+def reset():
+    for counter in counters.values():
+        counter[:] = [0, 0]
+
+    allocations.clear()
+
+
+class Snapshot:
+    """Class that describes counter values at one moment"""
+
+    def __init__(self, **kwargs):
+        self.calls = {}  # Name -> (calls, seconds)
+        self.allocations = {}  # Piece class name -> pieces created
+        self.seconds = 0.0  # Wall time since instrumentation was entered, if it was
+
+        for k, v in kwargs.items():
+            self.__setattr__(k, v)
+
+    def to_dict(self):
+        return {'calls': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.calls.items()},
+                'allocations': dict(self.allocations), 'seconds': self.seconds}
+
+    def __str__(self):
+        lines = [f'{"Method":<40} {"calls":>10} {"total s":>9} {"us/call":>9}']
+
+        for name, (calls, seconds) in sorted(self.calls.items(), key=lambda item: -item[1][1]):
+            if calls:
+                lines.append(f'{name:<40} {calls:>10} {seconds:9.3f} {seconds / calls * 1e6:9.2f}')
+
+        lines.append(f'Pieces created: {sum(self.allocations.values())} ('
+                     + ', '.join(f'{name} {count}' for name, count in sorted(self.allocations.items())) + ')')
+
+        if self.seconds:
+            lines.append(f'Wall time: {self.seconds:.3f} s')
+
+        return '\n'.join(lines)
+
+
+def snapshot(seconds=0.0):
+    return Snapshot(calls={name: (calls, nanoseconds / 1e9) for name, (calls, nanoseconds) in counters.items()},
+                    allocations=dict(allocations), seconds=seconds)
+
+
+class Instrumentation:
+    """Context manager that resets and enables counters, snapshot stays available after exit"""
+
+    def __init__(self):
+        self.start = None
+        self.final_snapshot = None
+
+    def __enter__(self):
+        if is_enabled():
+            raise RuntimeError('Instrumentation is already enabled')
+
+        reset()
+        enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.final_snapshot = snapshot(time.perf_counter() - self.start)
+        disable()
+
+    def snapshot(self):
+        if self.final_snapshot is not None:
+            return self.final_snapshot
+
+        return snapshot(time.perf_counter() - self.start)
+
+
+def run_workload(fens, depth, counter=perft, use_cache=True):
+    """Perft of every FEN from a cold move cache, returns node count"""
+
+    return sum(timed_perft(fen, depth, counter, use_cache).nodes for fen in fens)
+
+
+def profile_workload(fens, depth, counter=perft, use_cache=True, path=None, top=25, output=sys.stdout):
+    """Runs the workload under cProfile without counters, dumps stats to path and prints top functions"""
+
+    import cProfile
+    import pstats
+
+    profile = cProfile.Profile()
+    profile.runcall(run_workload, fens, depth, counter, use_cache)
+
+    if path:
+        profile.dump_stats(path)
+
+    stats = pstats.Stats(profile, stream=output)
+    stats.sort_stats('cumulative').print_stats(top)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count and time ChessLogic calls in perft of FEN positions')
+    parser.add_argument('input', nargs='?', default=None, help='file with a FEN or EPD per line, .gz is supported')
+    parser.add_argument('--suite', action='store_true', help='use perft reference positions')
+    parser.add_argument('--fen', default=None, help='single position')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--copies', action='store_true', help='copy position for every move instead of unmake')
+    parser.add_argument('--no-cache', action='store_true', help='disable move cache')
+    parser.add_argument('--profile', default=None, help='also run under cProfile and dump pstats to the file')
+    parser.add_argument('--top', type=int, default=25, help='functions shown from cProfile')
+    args = parser.parse_args(argv)
+
+    fens = []
+    if args.fen:
+        fens.append(args.fen)
+    if args.suite:
+        fens.extend(fen for _, fen, _ in REFERENCE_POSITIONS)
+    if args.input:
+        with open_text(args.input) as file:
+            fens.extend(' '.join(line.split()[:4]) for line in file if line.strip())
+    if not fens:
+        fens.append(REFERENCE_POSITIONS[0][1])
+
+    counter = perft_with_copies if args.copies else perft
+
+    with Instrumentation() as instrumentation:
+        nodes = run_workload(fens, args.depth, counter, not args.no_cache)
+
+    print(f'Positions: {len(fens)}, depth {args.depth}, nodes: {nodes}')
+    print(instrumentation.snapshot())
+
+    if args.profile is not None:
+        print()
+        profile_workload(fens, args.depth, counter, not args.no_cache, args.profile, args.top)
+
+    return 0
+
+
+__all__ = ['Instrumentation', 'Snapshot', 'enable', 'disable', 'reset', 'is_enabled', 'snapshot',
+           'run_workload', 'profile_workload']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,8 @@ class King(ChessPiece):
     text = '♚♔'
     char = 'K'
 
+    __slots__ = ()
+
     diagonals = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
     axis = [(0, 1), (0, -1), (1, 0), (-1, 0)]
 
@@ -27,9 +29,26 @@ class King(ChessPiece):
 
         return possible_moves
 
-    def calculate_valid_moves(self):
+    def get_attack_moves(self):
+        """King attacks every neighbour cell, even if it is occupied by a piece of the same color"""
+
+        attack_moves = []
+
+        for dx, dy in self.axis + self.diagonals:
+            new_x, new_y = self.x + dx, self.y + dy
+
+            if self.is_inside_board(new_x, new_y):  # New position must be inside chess board
+                attack_moves.append((new_x, new_y))
+
+        return attack_moves
+
+    def calculate_valid_moves(self, legality=None):
         """The difference between king and other pieces is that king can do castling move"""
-        super().calculate_valid_moves()
+
+        if legality is None:
+            legality = self.board.get_legality_state(self.color)
+
+        super().calculate_valid_moves(legality)
 
         # King must stay at position for castling
         if self.color == Color.WHITE and self.position != (4, 0):
@@ -38,13 +57,8 @@ class King(ChessPiece):
         if self.color == Color.BLACK and self.position != (4, 7):
             return
 
-        game_state = self.board.get_state()
-
         # King while castling cannot be under attack
-        if self.color == Color.WHITE and game_state.white_king_under_attack:
-            return
-
-        if self.color == Color.BLACK and game_state.black_king_under_attack:
+        if legality.checkers:
             return
 
         if self.color == Color.WHITE:  # White castling
@@ -53,7 +67,8 @@ class King(ChessPiece):
                 # No pieces must be between king and rook
                 if self.board.is_empty_at(5, 0) and self.board.is_empty_at(6, 0):
                     # Check that king is not under attack while castling
-                    if (5, 0) not in game_state.black_attack and (6, 0) not in game_state.black_attack:
+                    if not self.board.is_attacked_by(5, 0, Color.BLACK) \
+                            and not self.board.is_attacked_by(6, 0, Color.BLACK):
                         self.moves.append((6, 0))
 
             # Castling at queen side
@@ -61,7 +76,8 @@ class King(ChessPiece):
                 # No pieces must be between king and rook
                 if self.board.is_empty_at(3, 0) and self.board.is_empty_at(2, 0) and self.board.is_empty_at(1, 0):
                     # Check that king is not under attack while castling
-                    if (3, 0) not in game_state.black_attack and (2, 0) not in game_state.black_attack:
+                    if not self.board.is_attacked_by(3, 0, Color.BLACK) \
+                            and not self.board.is_attacked_by(2, 0, Color.BLACK):
                         self.moves.append((2, 0))
 
         else:  # Black castling
@@ -70,7 +86,8 @@ class King(ChessPiece):
                 # No pieces must be between king and rook
                 if self.board.is_empty_at(5, 7) and self.board.is_empty_at(6, 7):
                     # Check that king is not under attack while castling
-                    if (5, 7) not in game_state.white_attack and (6, 7) not in game_state.white_attack:
+                    if not self.board.is_attacked_by(5, 7, Color.WHITE) \
+                            and not self.board.is_attacked_by(6, 7, Color.WHITE):
                         self.moves.append((6, 7))
 
             # Castling at queen side
@@ -78,7 +95,8 @@ class King(ChessPiece):
                 # No pieces must be between king and rook
                 if self.board.is_empty_at(3, 7) and self.board.is_empty_at(2, 7) and self.board.is_empty_at(1, 7):
                     # Check that king is not under attack while castling
-                    if (3, 7) not in game_state.white_attack and (2, 7) not in game_state.white_attack:
+                    if not self.board.is_attacked_by(3, 7, Color.WHITE) \
+                            and not self.board.is_attacked_by(2, 7, Color.WHITE):
                         self.moves.append((2, 7))
 
 
@@ -7,6 +7,8 @@ class Knight(ChessPiece):
     text = '♞♘'
     char = 'N'
 
+    __slots__ = ()
+
     L_jumps = [(1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (-2, 1), (2, -1), (-2, -1)]
 
     def get_possible_moves(self):
@@ -25,5 +27,18 @@ class Knight(ChessPiece):
 
         return possible_moves
 
+    def get_attack_moves(self):
+        """Knight attacks every cell it can jump to, even if it is occupied by a piece of the same color"""
+
+        attack_moves = []
+
+        for dx, dy in self.L_jumps:
+            new_x, new_y = self.x + dx, self.y + dy
+
+            if self.is_inside_board(new_x, new_y):  # New position must be inside chess board
+                attack_moves.append((new_x, new_y))
+
+        return attack_moves
+
 
 __all__ = ['Knight']
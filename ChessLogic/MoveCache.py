@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+class MoveCache:
+    """Size-bounded LRU cache that maps position hash to its legal moves and check status"""
+
+    def __init__(self, max_size=20000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def peek(self, key):
+        """Returns entry without counting it as a cache hit or refreshing it"""
+        return self.entries.get(key)
+
+    def put(self, key, piece_moves, is_check):
+        """piece_moves is a tuple of (x, y, moves) for every piece that can move"""
+
+        self.entries[key] = (piece_moves, is_check)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)  # Least recently used entry
+
+    def resize(self, max_size):
+        self.max_size = max_size
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+__all__ = ['MoveCache']
@@ -0,0 +1,203 @@
+"""Opening book: sorted fixed-width (position hash, move, weight, learn) entries, probed by binary search over mmap
+
+Entries have Polyglot layout, but positions are hashed with our Zobrist keys and castling is stored as
+a king move by two cells, so books are built from PGN by this module and are not compatible with Polyglot books.
+
+Usage: python -m ChessLogic.OpeningBook build games.pgn.gz --output book.bin --max-ply 24 --jobs 8
+       python -m ChessLogic.OpeningBook probe book.bin --fen "<fen>"
+"""
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+from collections import defaultdict
+
+from .ChessPosition import ChessPosition
+from .Engine import move_to_text
+from .PGN import decode_games
+
+
+ENTRY = struct.Struct('>QHHI')  # Key, move, weight, learn
+PROMOTIONS = (None, 'N', 'B', 'R', 'Q')
+RESULT_SCORES = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1)}  # Game result -> (white, black) move score
+
+
+def book_key(chess_position):
+    """Zobrist key where en passant is counted only if a pawn can really capture, as in Polyglot"""
+
+    return chess_position.get_repetition_key()
+
+
+def encode_move(move):
+    x, y, new_x, new_y, promotion = move
+    return new_x | new_y << 3 | x << 6 | y << 9 | PROMOTIONS.index(promotion) << 12
+
+
+def decode_move(code):
+    return code >> 6 & 7, code >> 9 & 7, code & 7, code >> 3 & 7, PROMOTIONS[code >> 12 & 7]
+
+
+class BookEntry:
+    """Class that describes book move of a position"""
+
+    def __init__(self, move, weight, learn):
+        self.move = move
+        self.weight = weight
+        self.learn = learn
+
+    def __repr__(self):
+        return f'BookEntry({self.move}, weight={self.weight}, learn={self.learn})'
+
+
+class OpeningBook:
+    """Read-only opening book, file is memory-mapped, so opening is instant and processes share page cache"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+
+        # Empty file cannot be mapped
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.file.seek(0, 2) else b''
+        self.size = len(self.data) // ENTRY.size
+
+    def key_at(self, index):
+        return struct.unpack_from('>Q', self.data, index * ENTRY.size)[0]
+
+    def find_first(self, key):
+        """Returns index of the first entry with key not less than the given one"""
+
+        low, high = 0, self.size
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def get_entries(self, chess_position):
+        """Returns book entries of the position that are legal in it, the best ones first"""
+
+        key = book_key(chess_position)
+        legal_moves = set(chess_position.generate_legal_moves())
+        entries = []
+
+        for index in range(self.find_first(key), self.size):
+            entry_key, code, weight, learn = ENTRY.unpack_from(self.data, index * ENTRY.size)
+
+            if entry_key != key:
+                break
+
+            move = decode_move(code)
+            if move in legal_moves:  # Guards against hash collisions
+                entries.append(BookEntry(move, weight, learn))
+
+        return entries
+
+    def choose_move(self, chess_position, generator=random):
+        """Returns book move picked with probability proportional to its weight, or None if out of book"""
+
+        entries = [entry for entry in self.get_entries(chess_position) if entry.weight > 0]
+
+        if not entries:
+            return None
+
+        return generator.choices([entry.move for entry in entries], [entry.weight for entry in entries])[0]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def collect_book_moves(pgn_sources, max_ply=24, jobs=None):
+    """Returns {(key, move code): weight}, move scores 2 for win, 1 for draw and 0 for loss of the side that made it"""
+
+    weights = defaultdict(int)
+    games = 0
+
+    for source in pgn_sources:
+        for game, moves, error in decode_games(source, jobs):
+            if error:
+                continue
+
+            games += 1
+            chess_position = ChessPosition.generate_from_fen(game.initial_fen)
+            scores = RESULT_SCORES.get(game.result, (1, 1))  # Unfinished games count as draws
+
+            for move in moves[:max_ply]:
+                weights[book_key(chess_position), encode_move(move)] += scores[chess_position.move_color.value]
+                chess_position.make_move(*move)
+
+    return weights, games
+
+
+def write_book(weights, path, min_weight=1):
+    """Writes entries sorted by key and then by weight, weights are scaled to fit 16 bits"""
+
+    scale = max(1, max(weights.values(), default=0) / 0xFFFF)
+    entries = sorted(((key, code, min(0xFFFF, round(weight / scale)))
+                      for (key, code), weight in weights.items() if weight >= min_weight),
+                     key=lambda entry: (entry[0], -entry[2], entry[1]))
+
+    with open(path, 'wb') as file:
+        for key, code, weight in entries:
+            file.write(ENTRY.pack(key, code, weight, 0))
+
+    return len(entries)
+
+
+def build_book(pgn_sources, path, max_ply=24, min_weight=1, jobs=None):
+    """Builds book from PGN files, returns (games, entries)"""
+
+    weights, games = collect_book_moves(pgn_sources, max_ply, jobs)
+    return games, write_book(weights, path, min_weight)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or probe opening book')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='build book from PGN files')
+    build_parser.add_argument('pgn', nargs='+', help='PGN files, .gz is supported')
+    build_parser.add_argument('--output', required=True)
+    build_parser.add_argument('--max-ply', type=int, default=24, help='book depth in plies')
+    build_parser.add_argument('--min-weight', type=int, default=1, help='drop moves with lower total score')
+    build_parser.add_argument('--jobs', type=int, default=None, help='number of PGN decoding processes')
+
+    probe_parser = subparsers.add_parser('probe', help='show book moves of a position')
+    probe_parser.add_argument('book')
+    probe_parser.add_argument('--fen', default='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        games, entries = build_book(args.pgn, args.output, args.max_ply, args.min_weight, args.jobs)
+        print(f'Games: {games}, entries: {entries}')
+
+    else:
+        with OpeningBook(args.book) as book:
+            for entry in book.get_entries(ChessPosition.generate_from_fen(args.fen)):
+                print(f'{move_to_text(entry.move)} weight {entry.weight} learn {entry.learn}')
+
+    return 0
+
+
+__all__ = ['OpeningBook', 'BookEntry', 'book_key', 'build_book', 'write_book', 'collect_book_moves']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""Streaming PGN reader and writer
+
+Usage: python -m ChessLogic.PGN games.pgn.gz --jobs 8
+"""
+
+import argparse
+import re
+import sys
+import time
+
+from .BatchProcessing import split_batches, map_batches, open_text
+from .ChessGame import ChessGame, get_game_result
+from .ChessPosition import ChessPosition, coords_to_cell
+from .Colors import Color
+from .Pieces import *
+
+
+class PGNError(ValueError):
+    """Raised when PGN move cannot be decoded in its position"""
+
+
+class PGNGame:
+    """Class that describes a game read from PGN, moves are kept as SAN text until decoded"""
+
+    def __init__(self):
+        self.headers = {}
+        self.san_moves = []
+        self.result = '*'
+        self.comments = []  # (ply, text), kept only on request
+        self.variations = []  # (ply, text), kept only on request
+
+    @property
+    def initial_fen(self):
+        return self.headers.get('FEN', ChessGame.initial_chess_position)
+
+    def __str__(self):
+        return f'{self.headers.get("White", "?")} - {self.headers.get("Black", "?")} {self.result}'
+
+
+class PGNReader:
+    """Reads games one by one from lines of PGN file, memory does not depend on file size"""
+
+    header_pattern = re.compile(r'^\s*\[(\w+)\s+"(.*)"\s*\]\s*$')
+    token_pattern = re.compile(r'[{}();]|\$\d+|1-0|0-1|1/2-1/2|\*|\d+\.+|[^\s{}();$]+')
+    move_number_pattern = re.compile(r'\d+\.+')
+    results = ('1-0', '0-1', '1/2-1/2', '*')
+
+    def __init__(self, lines, keep_comments=False, keep_variations=False):
+        self.lines = lines
+        self.keep_comments = keep_comments
+        self.keep_variations = keep_variations
+
+        self.game = PGNGame()
+        self.has_movetext = False
+        self.comment = None  # Text parts of unfinished {comment}
+        self.variation = []  # Tokens of unfinished variation
+        self.variation_depth = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            header = self.header_pattern.match(line) if self.comment is None and not self.variation_depth else None
+
+            if header:
+                if self.has_movetext:  # Game without result token
+                    yield self.finish_game()
+
+                self.game.headers[header.group(1)] = header.group(2).replace('\\"', '"')
+                continue
+
+            if self.feed_movetext(line):
+                yield self.finish_game()
+
+        if self.has_movetext or self.game.headers:
+            yield self.finish_game()
+
+    def finish_game(self):
+        game = self.game
+        self.game = PGNGame()
+        self.has_movetext = False
+        self.comment = None
+        self.variation = []
+        self.variation_depth = 0
+        return game
+
+    def add_comment(self, text):
+        if self.variation_depth:
+            self.variation.append('{' + text + '}')
+        elif self.keep_comments:
+            self.game.comments.append((len(self.game.san_moves), text.strip()))
+
+    def feed_movetext(self, line):
+        """Processes line of movetext, returns True when game result is reached"""
+
+        position = 0
+
+        while position < len(line):
+            if self.comment is not None:
+                end = line.find('}', position)
+
+                if end == -1:
+                    self.comment.append(line[position:])
+                    return False
+
+                self.comment.append(line[position:end])
+                self.add_comment(''.join(self.comment))
+                self.comment = None
+                position = end + 1
+                continue
+
+            match = self.token_pattern.search(line, position)
+            if not match:
+                return False
+
+            token = match.group()
+            position = match.end()
+            self.has_movetext = True
+
+            if token == '{':
+                self.comment = []
+
+            elif token == ';':  # Comment till the end of line
+                self.add_comment(line[position:].rstrip('\n'))
+                return False
+
+            elif token == '(':
+                self.variation_depth += 1
+                if self.variation_depth > 1:
+                    self.variation.append(token)
+
+            elif token == ')':
+                self.variation_depth = max(0, self.variation_depth - 1)
+
+                if self.variation_depth:
+                    self.variation.append(token)
+                else:
+                    if self.keep_variations:
+                        self.game.variations.append((len(self.game.san_moves), ' '.join(self.variation)))
+                    self.variation = []
+
+            elif self.variation_depth:
+                self.variation.append(token)
+
+            elif token in self.results:
+                self.game.result = token
+                return True
+
+            elif token.rstrip('+#!?') in ('0-0', '0-0-0'):  # Castling written with zeros starts with a digit too
+                self.game.san_moves.append(token)
+
+            elif token[0] == '$' or self.move_number_pattern.fullmatch(token):  # NAG or move number
+                continue
+
+            else:
+                self.game.san_moves.append(token)
+
+        return False
+
+
+def read_games(source, keep_comments=False, keep_variations=False):
+    """Yields games lazily from PGN file path (.gz is supported) or from iterable of lines"""
+
+    if isinstance(source, str):
+        with open_text(source, 'r') as file:
+            yield from PGNReader(file, keep_comments, keep_variations)
+    else:
+        yield from PGNReader(source, keep_comments, keep_variations)
+
+
+san_pattern = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+piece_classes = {'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+
+
+def decode_san(chess_position, san):
+    """Returns legal move (x, y, new_x, new_y, promotion) written as SAN in the position"""
+
+    text = san.rstrip('+#!?')
+    legal_moves = chess_position.generate_legal_moves()
+
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        row = 0 if chess_position.move_color == Color.WHITE else 7
+        new_x = 6 if text in ('O-O', '0-0') else 2
+
+        for move in legal_moves:
+            if move[:4] == (4, row, new_x, row) and isinstance(chess_position.get_piece_at(4, row), King):
+                return move
+
+        raise PGNError(f'Illegal castling "{san}"')
+
+    match = san_pattern.match(text)
+    if not match:
+        raise PGNError(f'Cannot parse move "{san}"')
+
+    piece_char, from_file, from_rank, target, promotion = match.groups()
+    piece_class = piece_classes[piece_char] if piece_char else Pawn
+    new_x, new_y = ord(target[0]) - 97, int(target[1]) - 1
+
+    candidates = [move for move in legal_moves
+                  if move[2:4] == (new_x, new_y)
+                  and move[4] == promotion
+                  and isinstance(chess_position.get_piece_at(move[0], move[1]), piece_class)
+                  and (from_file is None or move[0] == ord(from_file) - 97)
+                  and (from_rank is None or move[1] == int(from_rank) - 1)]
+
+    if len(candidates) != 1:
+        raise PGNError(f'{"Ambiguous" if candidates else "Illegal"} move "{san}"')
+
+    return candidates[0]
+
+
+def encode_san(chess_position, move):
+    """Returns SAN of legal move in the position"""
+
+    x, y, new_x, new_y, promotion = move
+    piece = chess_position.get_piece_at(x, y)
+
+    if isinstance(piece, King) and abs(new_x - x) == 2:
+        san = 'O-O' if new_x == 6 else 'O-O-O'
+
+    elif isinstance(piece, Pawn):
+        is_capture = x != new_x
+        san = (coords_to_cell(x, y)[0] + 'x' if is_capture else '') + coords_to_cell(new_x, new_y)
+
+        if new_y in (0, 7):
+            san += '=' + (promotion or 'Q')
+
+    else:
+        san = piece.char
+
+        # Other pieces of the same kind that can move to the same cell
+        rivals = [(other_x, other_y) for other_x, other_y, other_new_x, other_new_y, _
+                  in chess_position.generate_legal_moves()
+                  if (other_new_x, other_new_y) == (new_x, new_y) and (other_x, other_y) != (x, y)
+                  and chess_position.get_piece_at(other_x, other_y).__class__ is piece.__class__]
+
+        if rivals:
+            if all(other_x != x for other_x, _ in rivals):
+                san += coords_to_cell(x, y)[0]
+            elif all(other_y != y for _, other_y in rivals):
+                san += coords_to_cell(x, y)[1]
+            else:
+                san += coords_to_cell(x, y)
+
+        if not chess_position.is_empty_at(new_x, new_y):
+            san += 'x'
+
+        san += coords_to_cell(new_x, new_y)
+
+    chess_position.make_move(x, y, new_x, new_y, promotion)
+    status = chess_position.get_status()
+    chess_position.unmake_move()
+
+    if status.is_checkmate:
+        san += '#'
+    elif status.is_check:
+        san += '+'
+
+    return san
+
+
+def decode_game(game):
+    """Returns list of moves of the game, raises PGNError on illegal or ambiguous SAN"""
+
+    chess_position = ChessPosition.generate_from_fen(game.initial_fen)
+    moves = []
+
+    for ply, san in enumerate(game.san_moves):
+        try:
+            move = decode_san(chess_position, san)
+        except PGNError as e:
+            raise PGNError(f'Ply {ply + 1}: {e}') from e
+
+        chess_position.make_move(*move)
+        moves.append(move)
+
+    return moves
+
+
+def decode_batch(games):
+    """Returns (game, moves, error) for every game"""
+
+    results = []
+
+    for game in games:
+        try:
+            results.append((game, decode_game(game), None))
+        except ValueError as e:  # PGNError or FENError
+            results.append((game, None, str(e)))
+
+    return results
+
+
+def decode_games(source, jobs=None, batch_size=64, keep_comments=False, keep_variations=False):
+    """Reads games lazily and decodes them in worker processes, yields (game, moves, error) in file order"""
+
+    games = read_games(source, keep_comments, keep_variations)
+
+    for results in map_batches(decode_batch, split_batches(games, batch_size), jobs):
+        yield from results
+
+
+def create_game(game):
+    """Creates ChessGame with all moves of decoded PGN game"""
+
+    chess_game = ChessGame(game.initial_fen)
+
+    for move in decode_game(game):
+        chess_game.make_move(*move)
+
+    return chess_game
+
+
+def export_pgn(chess_game, headers=None):
+    """Returns PGN text of ChessGame main line"""
+
+    chess_position = ChessPosition.generate_from_fen(chess_game.initial_position)
+
+    tokens = []
+    for ply, (x, y, new_x, new_y, promotion) in enumerate(chess_game.moves):
+        # Promotion piece is kept only for pawns that reach last row
+        piece = chess_position.get_piece_at(x, y)
+        if not (isinstance(piece, Pawn) and new_y in (0, 7)):
+            promotion = None
+        move = (x, y, new_x, new_y, promotion)
+
+        if chess_position.move_color == Color.WHITE:
+            tokens.append(f'{chess_position.fullmove_number}.')
+        elif ply == 0:
+            tokens.append(f'{chess_position.fullmove_number}...')
+
+        tokens.append(encode_san(chess_position, move))
+        chess_position.make_move(*move)
+
+    result, _ = get_game_result(chess_position, chess_game.get_repetition_count(len(chess_game.moves)))
+
+    all_headers = {'Event': '?', 'Site': '?', 'Date': '????.??.??', 'Round': '?',
+                   'White': '?', 'Black': '?', 'Result': result}
+    if chess_game.initial_position != ChessGame.initial_chess_position:
+        all_headers.update(SetUp='1', FEN=chess_game.initial_position)
+    all_headers.update(headers or {})
+
+    lines = [f'[{name} "{value}"]' for name, value in all_headers.items()]
+    lines.append('')
+
+    # Movetext lines are at most 80 characters long
+    line = ''
+    for token in tokens + [all_headers['Result']]:
+        if line and len(line) + 1 + len(token) > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    lines.append(line)
+
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Decode PGN games and report errors')
+    parser.add_argument('input', help='PGN file, "-" for stdin, .gz is supported')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes, all cores by default')
+    parser.add_argument('--batch-size', type=int, default=64, help='games sent to worker at once')
+    args = parser.parse_args(argv)
+
+    games, plies, errors = 0, 0, 0
+    start = time.perf_counter()
+
+    for game, moves, error in decode_games(args.input, args.jobs, args.batch_size):
+        games += 1
+
+        if error:
+            errors += 1
+            print(f'Game {games} ({game}): {error}', file=sys.stderr)
+        else:
+            plies += len(moves)
+
+    seconds = time.perf_counter() - start
+    print(f'Games: {games}, plies: {plies}, errors: {errors}, '
+          f'{games / seconds if seconds else 0:.1f} games/s')
+
+    return 1 if errors else 0
+
+
+__all__ = ['PGNError', 'PGNGame', 'PGNReader', 'read_games', 'decode_san', 'encode_san', 'decode_game',
+           'decode_games', 'create_game', 'export_pgn']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""Multi-core perft and search: root moves are split between processes, which share a hash table
+
+Usage: python -m ChessLogic.Parallel perft --fen "<fen>" --depth 5 --jobs 32
+       python -m ChessLogic.Parallel search --fen "<fen>" --time 10 --jobs 32
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+
+from .ChessPosition import ChessPosition
+from .Engine import Engine, SearchLimits, SearchResult
+from .Perft import REFERENCE_POSITIONS, move_to_text
+
+
+OCCUPIED = 1 << 63  # Set in every stored value, so empty slots are never read as entries
+
+
+class SharedHashTable:
+    """Lockless fixed-size hash table of 64-bit keys and values in shared memory.
+    Slot keeps key XOR value, so slot torn by concurrent writes of two processes is read as a miss"""
+
+    slot = struct.Struct('<QQ')
+
+    def __init__(self, size=1 << 20, name=None):
+        self.size = size
+        self.is_owner = name is None
+
+        if self.is_owner:
+            self.memory = SharedMemory(create=True, size=size * self.slot.size)
+            self.memory.buf[:size * self.slot.size] = bytes(size * self.slot.size)
+        else:
+            self.memory = SharedMemory(name=name)
+
+        self.buffer = self.memory.buf
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def peek(self, key):
+        """Returns (stored key, value) of the slot for key, value is 0 for empty slot"""
+
+        check, value = self.slot.unpack_from(self.buffer, key % self.size * self.slot.size)
+        return check ^ value, value
+
+    def get(self, key):
+        stored_key, value = self.peek(key)
+        return value if value and stored_key == key else None
+
+    def put(self, key, value):
+        value |= OCCUPIED
+        self.slot.pack_into(self.buffer, key % self.size * self.slot.size, key ^ value, value)
+
+    def clear(self):
+        self.buffer[:self.size * self.slot.size] = bytes(self.size * self.slot.size)
+
+    def close(self):
+        self.buffer.release()
+        self.memory.close()
+
+        if self.is_owner:
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+PROMOTIONS = (None, 'Q', 'R', 'B', 'N')
+
+
+def pack_entry(depth, score, flag, move):
+    """Packs transposition table entry to 63 bits: score, move, flag and depth"""
+
+    packed_move = 0
+    if move:
+        x, y, new_x, new_y, promotion = move
+        packed_move = (y * 8 + x) | (new_y * 8 + new_x) << 6 | PROMOTIONS.index(promotion) << 12 | 1 << 15
+
+    return (score + (1 << 31)) | packed_move << 32 | flag << 48 | depth << 50
+
+
+def unpack_entry(value):
+    score = (value & 0xFFFFFFFF) - (1 << 31)
+    packed_move = value >> 32 & 0xFFFF
+    flag = value >> 48 & 0b11
+    depth = value >> 50 & 0xFF
+
+    move = None
+    if packed_move:
+        move = (packed_move & 7, packed_move >> 3 & 7, packed_move >> 6 & 7, packed_move >> 9 & 7,
+                PROMOTIONS[packed_move >> 12 & 7])
+
+    return depth, score, flag, move
+
+
+class SharedTranspositionTable(SharedHashTable):
+    """Transposition table in shared memory with the same interface as Engine TranspositionTable"""
+
+    def get(self, key):
+        value = super().get(key)
+
+        if value is None:
+            return None
+
+        return (key,) + unpack_entry(value)
+
+    def put(self, key, depth, score, flag, move):
+        stored_key, value = self.peek(key)
+
+        if not value or stored_key == key or unpack_entry(value)[0] <= depth:
+            super().put(key, pack_entry(depth, score, flag, move))
+
+
+# Perft counts of the same position at different depths are stored under different keys
+PERFT_DEPTH_KEYS = [random.Random(depth).getrandbits(64) for depth in range(64)]
+
+
+def perft_hashed(chess_position, depth, table):
+    """Perft that reuses node counts of transposed positions stored in the hash table"""
+
+    if depth == 0:
+        return 1
+
+    legal_moves = chess_position.generate_legal_moves()
+
+    if depth == 1:
+        return len(legal_moves)
+
+    key = chess_position.zobrist_key ^ PERFT_DEPTH_KEYS[depth]
+    nodes = table.get(key)
+
+    if nodes is not None:
+        return nodes & ~OCCUPIED
+
+    nodes = 0
+    for move in legal_moves:
+        chess_position.make_move(*move)
+        nodes += perft_hashed(chess_position, depth - 1, table)
+        chess_position.unmake_move()
+
+    table.put(key, nodes)
+    return nodes
+
+
+# Table attached in every worker process once, instead of once per task
+worker_table = None
+
+
+def attach_table(table_class, name, size):
+    global worker_table
+    worker_table = table_class(size, name)
+
+
+def perft_task(fen, move, depth):
+    chess_position = ChessPosition.generate_from_fen(fen)
+    chess_position.make_move(*move)
+    return move, perft_hashed(chess_position, depth - 1, worker_table)
+
+
+# Iterative deepening of helper workers skips depths in different phases, so they search ahead of the main
+# worker and of each other instead of repeating it
+SKIP_SIZES = (1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4)
+SKIP_PHASES = (0, 1, 0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4, 5, 6, 7)
+
+
+class HelperEngine(Engine):
+    """Engine of lazy SMP worker, worker 0 searches every depth like Engine"""
+
+    def __init__(self, worker_index, transposition_table):
+        super().__init__(transposition_table=transposition_table)
+        self.worker_index = worker_index
+
+    def iteration_depths(self, max_depth):
+        if self.worker_index == 0:
+            return super().iteration_depths(max_depth)
+
+        size = SKIP_SIZES[(self.worker_index - 1) % len(SKIP_SIZES)]
+        phase = SKIP_PHASES[(self.worker_index - 1) % len(SKIP_PHASES)]
+        return [depth for depth in range(1, max_depth + 1) if depth == 1 or (depth + phase) // size % 2 == 0]
+
+
+def search_task(fen, history_keys, limits, worker_index):
+    chess_position = ChessPosition.generate_from_fen(fen)
+    engine = HelperEngine(worker_index, worker_table)
+    return worker_index, engine.search(chess_position, limits, history_keys)
+
+
+def parallel_divide(fen, depth, jobs=None, table_size=1 << 20):
+    """Returns node count below every root move, root moves are counted in worker processes"""
+
+    chess_position = ChessPosition.generate_from_fen(fen)
+    legal_moves = chess_position.generate_legal_moves()
+
+    if depth <= 1:
+        return [(move_to_text(move), 1) for move in legal_moves]
+
+    jobs = jobs or os.cpu_count() or 1
+
+    with SharedHashTable(table_size) as table, \
+            ProcessPoolExecutor(jobs, initializer=attach_table,
+                                initargs=(SharedHashTable, table.name, table_size)) as executor:
+
+        futures = [executor.submit(perft_task, fen, move, depth) for move in legal_moves]
+        counts = dict(future.result() for future in as_completed(futures))
+
+    return [(move_to_text(move), counts[move]) for move in legal_moves]
+
+
+def parallel_perft(fen, depth, jobs=None, table_size=1 << 20):
+    if depth == 0:
+        return 1
+
+    return sum(nodes for _, nodes in parallel_divide(fen, depth, jobs, table_size))
+
+
+class ParallelSearch:
+    """Lazy SMP: every worker searches the whole position and they meet in the shared transposition table,
+    so work done by one worker cuts the tree of the others. Worker processes and the table are kept between
+    searches, so searching every move of a game pays process start once
+
+        with ParallelSearch(jobs=8) as parallel:
+            result = parallel.search(chess_position, SearchLimits(time=1.0))
+    """
+
+    def __init__(self, jobs=None, table_size=1 << 20):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.table = SharedTranspositionTable(table_size)
+        self.executor = ProcessPoolExecutor(self.jobs, initializer=attach_table,
+                                            initargs=(SharedTranspositionTable, self.table.name, table_size))
+
+    def search(self, chess_position, limits=None, history_keys=()):
+        """Result of the deepest search is returned, nodes are summed over workers"""
+
+        limits = limits or SearchLimits()
+        start = time.perf_counter()
+
+        # Stop events of this process cannot be shared with the pool, node budget is split between workers
+        worker_limits = SearchLimits(depth=limits.depth, time=limits.time,
+                                     nodes=limits.nodes // self.jobs if limits.nodes is not None else None)
+
+        futures = [self.executor.submit(search_task, chess_position.generate_fen(), list(history_keys),
+                                        worker_limits, worker_index) for worker_index in range(self.jobs)]
+        results = [future.result() for future in futures]
+
+        _, best = max(results, key=lambda indexed_result: (indexed_result[1].depth, -indexed_result[0]))
+
+        return SearchResult(best_move=best.best_move, pv=best.pv, score=best.score, depth=best.depth,
+                            nodes=sum(result.nodes for _, result in results), seconds=time.perf_counter() - start)
+
+    def new_game(self):
+        self.table.clear()
+
+    def close(self):
+        self.executor.shutdown()
+        self.table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def parallel_search(chess_position, limits=None, history_keys=(), jobs=None, table_size=1 << 20):
+    """Single search with a new ParallelSearch, use ParallelSearch directly to search many positions"""
+
+    with ParallelSearch(jobs, table_size) as parallel:
+        return parallel.search(chess_position, limits, history_keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Multi-core perft and search')
+    parser.add_argument('mode', choices=['perft', 'search'])
+    parser.add_argument('--fen', default=REFERENCE_POSITIONS[0][1])
+    parser.add_argument('--depth', type=int, default=None)
+    parser.add_argument('--time', type=float, default=None, help='search time in seconds')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes, all cores by default')
+    parser.add_argument('--table-size', type=int, default=1 << 20, help='number of shared hash table slots')
+    parser.add_argument('--divide', action='store_true', help='print perft node count for every root move')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    if args.mode == 'perft':
+        depth = args.depth or 4
+        counts = parallel_divide(args.fen, depth, args.jobs, args.table_size)
+
+        if args.divide:
+            for move_text, nodes in counts:
+                print(f'{move_text}: {nodes}')
+
+        nodes = sum(nodes for _, nodes in counts)
+        seconds = time.perf_counter() - start
+        print(f'Depth {depth}: {nodes} nodes in {seconds:.3f} s, {nodes / seconds:.0f} nodes/s')
+
+    else:
+        limits = SearchLimits(depth=args.depth, time=args.time if args.time or args.depth else 5.0)
+        result = parallel_search(ChessPosition.generate_from_fen(args.fen), limits,
+                                 jobs=args.jobs, table_size=args.table_size)
+        print(f'info {result}')
+        print(f'bestmove {move_to_text(result.best_move) if result.best_move else "(none)"}')
+
+    return 0
+
+
+__all__ = ['SharedHashTable', 'SharedTranspositionTable', 'HelperEngine', 'ParallelSearch', 'perft_hashed',
+           'parallel_divide', 'parallel_perft', 'parallel_search']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,8 @@ class Pawn(ChessPiece):
     text = '♟♙'
     char = 'P'
 
+    __slots__ = ()
+
     def get_possible_moves(self):
         """Pawn can move 1 cell forward (or 2 cells at first move) and attack diagonally"""
 
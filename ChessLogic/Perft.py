@@ -0,0 +1,187 @@
+"""Perft: counts leaf nodes of the move tree to verify and benchmark move generation
+
+Usage: python -m ChessLogic.Perft --fen "<fen>" --depth 3 --divide
+       python -m ChessLogic.Perft --suite --max-depth 3 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+
+from .ChessPosition import ChessPosition, coords_to_cell
+
+
+# Name, FEN, expected node counts for depth 1, 2, 3, ...
+REFERENCE_POSITIONS = [
+    ('Start position', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     [20, 400, 8902, 197281, 4865609]),
+    ('Kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('Position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('Position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('Position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('Position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+    ('En passant discovered check', '8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1',
+     [6, 136, 863, 20471]),
+    ('En passant evasion', '8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1',
+     [15, 126, 1928, 13931]),
+    ('Promotions', 'n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1',
+     [24, 496, 9483]),
+    ('Promotion near king', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+     [9, 40, 472, 2661]),
+]
+
+
+def move_to_text(move):
+    x, y, new_x, new_y, promotion = move
+    return coords_to_cell(x, y) + coords_to_cell(new_x, new_y) + (promotion.lower() if promotion else '')
+
+
+def perft(chess_position, depth):
+    """Counts leaf nodes at depth using make_move/unmake_move on a single position"""
+
+    if depth == 0:
+        return 1
+
+    legal_moves = chess_position.generate_legal_moves()
+
+    if depth == 1:
+        return len(legal_moves)
+
+    nodes = 0
+    for move in legal_moves:
+        chess_position.make_move(*move)
+        nodes += perft(chess_position, depth - 1)
+        chess_position.unmake_move()
+
+    return nodes
+
+
+def perft_with_copies(chess_position, depth):
+    """Counts leaf nodes at depth creating a position copy for every move, like ChessGame does"""
+
+    if depth == 0:
+        return 1
+
+    legal_moves = chess_position.generate_legal_moves()
+
+    if depth == 1:
+        return len(legal_moves)
+
+    return sum(perft_with_copies(chess_position.generate_position_after_move(*move), depth - 1)
+               for move in legal_moves)
+
+
+def divide(chess_position, depth, counter=perft):
+    """Returns node count below every root move"""
+
+    result = []
+
+    for move in chess_position.generate_legal_moves():
+        chess_position.make_move(*move)
+        result.append((move_to_text(move), counter(chess_position, depth - 1)))
+        chess_position.unmake_move()
+
+    return result
+
+
+class PerftResult:
+    """Class that describes a timed perft run"""
+
+    def __init__(self, nodes, seconds):
+        self.nodes = nodes
+        self.seconds = seconds
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds > 0 else float('inf')
+
+
+def timed_perft(fen, depth, counter=perft, use_cache=True):
+    """Runs perft from FEN with a cold move cache, so repeated runs are comparable"""
+
+    ChessPosition.move_cache.clear()
+    max_size = ChessPosition.move_cache.max_size
+
+    if not use_cache:
+        ChessPosition.move_cache.resize(0)
+
+    try:
+        chess_position = ChessPosition.generate_from_fen(fen)
+        start = time.perf_counter()
+        nodes = counter(chess_position, depth)
+        return PerftResult(nodes, time.perf_counter() - start)
+
+    finally:
+        ChessPosition.move_cache.resize(max_size)
+        ChessPosition.move_cache.clear()
+
+
+def run_suite(max_depth, counter=perft, use_cache=True, repeat=1, output=print):
+    """Runs reference positions up to max_depth, returns True if all node counts are correct"""
+
+    all_correct = True
+    total_nodes, total_seconds = 0, 0
+
+    for name, fen, expected_counts in REFERENCE_POSITIONS:
+        for depth, expected in enumerate(expected_counts[:max_depth], 1):
+            results = [timed_perft(fen, depth, counter, use_cache) for _ in range(repeat)]
+            best = min(results, key=lambda result: result.seconds)
+
+            total_nodes += best.nodes
+            total_seconds += best.seconds
+
+            status = 'OK' if best.nodes == expected else f'FAILED (expected {expected})'
+            all_correct = all_correct and best.nodes == expected
+
+            output(f'{name:<28} depth {depth}: {best.nodes:>9} nodes '
+                   f'{best.seconds:8.3f} s {best.nodes_per_second:10.0f} nodes/s  {status}')
+
+    if total_seconds > 0:
+        output(f'Total: {total_nodes} nodes in {total_seconds:.3f} s, {total_nodes / total_seconds:.0f} nodes/s')
+
+    return all_correct
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count and time move generation (perft)')
+    parser.add_argument('--fen', default=REFERENCE_POSITIONS[0][1], help='position to count moves from')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help='print node count for every root move')
+    parser.add_argument('--suite', action='store_true', help='run reference positions and check node counts')
+    parser.add_argument('--max-depth', type=int, default=3, help='maximal depth for --suite')
+    parser.add_argument('--repeat', type=int, default=1, help='repeat timing and report the best run')
+    parser.add_argument('--copy', action='store_true', help='copy position for every move instead of unmaking it')
+    parser.add_argument('--no-cache', action='store_true', help='disable legal moves cache')
+    args = parser.parse_args(argv)
+
+    counter = perft_with_copies if args.copy else perft
+    use_cache = not args.no_cache
+
+    if args.suite:
+        return 0 if run_suite(args.max_depth, counter, use_cache, args.repeat) else 1
+
+    if args.divide:
+        chess_position = ChessPosition.generate_from_fen(args.fen)
+        total = 0
+
+        for move_text, nodes in divide(chess_position, args.depth, counter):
+            print(f'{move_text}: {nodes}')
+            total += nodes
+
+        print(f'\nMoves: {len(chess_position.generate_legal_moves())}')
+        print(f'Nodes: {total}')
+
+    results = [timed_perft(args.fen, args.depth, counter, use_cache) for _ in range(args.repeat)]
+    best = min(results, key=lambda result: result.seconds)
+    print(f'Depth {args.depth}: {best.nodes} nodes in {best.seconds:.3f} s, {best.nodes_per_second:.0f} nodes/s')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
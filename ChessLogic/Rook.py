@@ -7,6 +7,8 @@ class Rook(ChessPiece):
     text = '♜♖'
     char = 'R'
 
+    __slots__ = ()
+
     axis = [(0, 1), (0, -1), (1, 0), (-1, 0)]
 
     def get_possible_moves(self):
@@ -31,5 +33,24 @@ class Rook(ChessPiece):
 
         return possible_moves
 
+    def get_attack_moves(self):
+        """Rook attacks cells up to the first piece on every axis, even if the piece is of the same color"""
+
+        attack_moves = []
+
+        for dx, dy in self.axis:
+            for i in range(1, 8):
+                new_x, new_y = self.x + i * dx, self.y + i * dy
+
+                if not self.is_inside_board(new_x, new_y):  # New position must be inside chess board
+                    break
+
+                attack_moves.append((new_x, new_y))
+
+                if not self.board.is_empty_at(new_x, new_y):  # Ray is blocked by any piece
+                    break
+
+        return attack_moves
+
 
 __all__ = ['Rook']
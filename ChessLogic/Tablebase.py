@@ -0,0 +1,581 @@
+"""Endgame tablebases: retrograde generation and mmap probing of distance to mate for small piece sets
+
+Every table is a file <material>.tb, e.g. KQK.tb, with one byte for every indexed position:
+0 is draw, 255 is impossible position, other values are plies to mate + 1 for the side to move,
+even number of plies means that side to move is mated, odd means that it mates.
+
+Supported materials have at most 4 pieces with kings, as generation keeps moves of every position in memory
+(a 4-men table with pawns takes about 2 GB, a 5-men one would take over 100 GB). Pawns of both sides are not
+supported either, as tables have no en passant square, e.g. KPK, KQKP and KRKN are supported, KPKP is not.
+
+Usage: python -m ChessLogic.Tablebase generate KQK KRK KPK --directory tablebases --jobs 8
+       python -m ChessLogic.Tablebase probe --directory tablebases --fen "<fen>"
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+
+from .BatchProcessing import map_batches
+from .BitboardPosition import BitboardPosition, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, \
+    PAWN_ATTACKS, iterate_bits
+
+
+DRAW, INVALID = 0, 255
+PIECE_TYPES = {'Q': QUEEN, 'R': ROOK, 'B': BISHOP, 'N': KNIGHT, 'P': PAWN}
+PIECE_ORDER = 'QRBNP'
+PIECE_VALUES = {'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+
+# Materials where nobody can mate, they have no tables
+DRAWN_MATERIALS = {'KK', 'KBK', 'KNK'}
+
+MAX_PIECES = 4  # With kings
+
+# Symmetries of the board as square -> square maps, the first one is identity
+SYMMETRIES = [[(y if swap else x) ^ flip_x | ((x if swap else y) ^ flip_y) << 3
+               for square in range(64) for x, y in [(square % 8, square // 8)]]
+              for swap in (False, True) for flip_x in (0, 7) for flip_y in (0, 7)]
+SYMMETRIES.sort(key=lambda symmetry: symmetry != list(range(64)))
+FILE_MIRROR = [square ^ 7 for square in range(64)]
+
+# White king cells left after symmetry reduction: a1-d1-d4 triangle without pawns, a-d files with pawns
+PAWNLESS_KING_SQUARES = [y * 8 + x for y in range(4) for x in range(y, 4)]
+PAWN_KING_SQUARES = [y * 8 + x for y in range(8) for x in range(4)]
+
+
+def split_material(material):
+    """Splits material like KRPKB into white and black piece letters without kings"""
+
+    second_king = material.index('K', 1)
+    return material[1:second_king], material[second_king + 1:]
+
+
+def normalize_material(material):
+    """Returns canonical material name and whether colors have to be swapped to use it"""
+
+    material = material.upper()
+    if not (material.startswith('K') and material.count('K') == 2):
+        raise ValueError(f'Material must contain two kings, got "{material}"')
+
+    white, black = (''.join(sorted(side, key=PIECE_ORDER.index)) for side in split_material(material))
+
+    def strength(side):
+        return sum(PIECE_VALUES[piece] for piece in side), len(side), [-PIECE_ORDER.index(piece) for piece in side]
+
+    if strength(black) > strength(white):
+        return f'K{black}K{white}', True
+
+    return f'K{white}K{black}', False
+
+
+def check_material(name):
+    """Raises ValueError if tables of the canonical material name cannot be generated or probed"""
+
+    if len(name) > MAX_PIECES:
+        raise ValueError(f'Tables of {name} are not supported, at most {MAX_PIECES} pieces with kings')
+
+    white, black = split_material(name)
+    if 'P' in white and 'P' in black:
+        raise ValueError(f'Tables of {name} are not supported, en passant is possible with pawns of both sides')
+
+
+def is_supported(name):
+    try:
+        check_material(name)
+    except ValueError:
+        return False
+
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_material(name):
+    return Material(name)
+
+
+class Material:
+    """Indexing of positions with the given canonical material. Index is built from side to move,
+    white king cell reduced by symmetry, then black king and other pieces cells"""
+
+    def __init__(self, name):
+        self.name = name
+        white, black = split_material(name)
+
+        # (color, piece type) of every piece except kings, in index order
+        self.pieces = [(WHITE, PIECE_TYPES[piece]) for piece in white] + \
+                      [(BLACK, PIECE_TYPES[piece]) for piece in black]
+
+        self.has_pawns = 'P' in name
+        self.symmetries = [SYMMETRIES[0], FILE_MIRROR] if self.has_pawns else SYMMETRIES
+        self.king_squares = PAWN_KING_SQUARES if self.has_pawns else PAWNLESS_KING_SQUARES
+        self.king_indices = {square: index for index, square in enumerate(self.king_squares)}
+
+        # Symmetry that moves white king to the reduced cells, for every king cell
+        self.king_symmetry = {}
+        for square in range(64):
+            self.king_symmetry[square] = next(symmetry for symmetry in self.symmetries
+                                              if symmetry[square] in self.king_indices)
+
+        self.size = 2 * len(self.king_squares) * 64 ** (len(self.pieces) + 1)
+
+    def index(self, side, white_king, black_king, squares):
+        """Index of position, squares of equal pieces are sorted so every position has one index"""
+
+        symmetry = self.king_symmetry[white_king]
+        index = side * len(self.king_squares) + self.king_indices[symmetry[white_king]]
+        index = index * 64 + symmetry[black_king]
+
+        squares = [symmetry[square] for square in squares]
+        start = 0
+        for end in range(1, len(squares) + 1):
+            if end == len(squares) or self.pieces[end] != self.pieces[start]:
+                squares[start:end] = sorted(squares[start:end])
+                start = end
+
+        for square in squares:
+            index = index * 64 + square
+
+        return index
+
+    def position_index(self, bitboard_position, swap_colors=False):
+        """Index of BitboardPosition with this material, colors are swapped by mirroring the board vertically"""
+
+        flip = 56 if swap_colors else 0
+        strong, weak = (BLACK, WHITE) if swap_colors else (WHITE, BLACK)
+        bitboards = bitboard_position.bitboards
+
+        # Pieces of the same kind take their cells in order
+        squares = []
+        taken = defaultdict(int)
+        for color, piece_type in self.pieces:
+            board_color = strong if color == WHITE else weak
+            squares_of_type = sorted(square ^ flip for square in iterate_bits(bitboards[board_color][piece_type]))
+            squares.append(squares_of_type[taken[color, piece_type]])
+            taken[color, piece_type] += 1
+
+        return self.index(bitboard_position.move_color ^ swap_colors,
+                          bitboard_position.king_square(strong) ^ flip,
+                          bitboard_position.king_square(weak) ^ flip,
+                          squares)
+
+    def decode(self, index):
+        """Returns (side, white king, black king, squares of other pieces)"""
+
+        squares = []
+        for _ in self.pieces:
+            index, square = divmod(index, 64)
+            squares.append(square)
+        squares.reverse()
+
+        index, black_king = divmod(index, 64)
+        side, king_index = divmod(index, len(self.king_squares))
+
+        return side, self.king_squares[king_index], black_king, squares
+
+    def create_position(self, index):
+        """Returns BitboardPosition of the index or None if pieces overlap or pawns are at the last rows"""
+
+        side, white_king, black_king, squares = self.decode(index)
+        all_squares = [white_king, black_king] + squares
+
+        if len(set(all_squares)) != len(all_squares):
+            return None
+
+        bitboard_position = BitboardPosition()
+        bitboard_position.put_piece(white_king, WHITE, KING)
+        bitboard_position.put_piece(black_king, BLACK, KING)
+
+        for (color, piece_type), square in zip(self.pieces, squares):
+            if piece_type == PAWN and square // 8 in (0, 7):
+                return None
+            bitboard_position.put_piece(square, color, piece_type)
+
+        bitboard_position.move_color = side
+        return bitboard_position
+
+
+def get_position_key(bitboard_position):
+    """Returns (canonical material name, index) of position without castling rights"""
+
+    bitboards = bitboard_position.bitboards
+    white = ''.join(piece * bin(bitboards[WHITE][PIECE_TYPES[piece]]).count('1') for piece in PIECE_ORDER)
+    black = ''.join(piece * bin(bitboards[BLACK][PIECE_TYPES[piece]]).count('1') for piece in PIECE_ORDER)
+    name, swap_colors = normalize_material(f'K{white}K{black}')
+
+    return name, get_material(name).position_index(bitboard_position, swap_colors)
+
+
+class ProbeResult:
+    """Class that describes tablebase value of a position for the side to move"""
+
+    def __init__(self, code):
+        self.code = code
+
+    @property
+    def is_draw(self):
+        return self.code == DRAW
+
+    @property
+    def plies(self):
+        """Plies to mate, None for draw"""
+        return None if self.code == DRAW else self.code - 1
+
+    @property
+    def is_win(self):
+        return self.code != DRAW and self.plies % 2 == 1
+
+    @property
+    def is_loss(self):
+        return self.code != DRAW and self.plies % 2 == 0
+
+    def __str__(self):
+        if self.is_draw:
+            return 'draw'
+
+        return f'{"win" if self.is_win else "loss"} in {self.plies} plies'
+
+
+class Tablebase:
+    """Tables of a directory, every table file is memory-mapped on first probe"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.tables = {}  # Material name -> mmap, or None if there is no table
+
+    def get_table(self, name):
+        if name not in self.tables:
+            if not is_supported(name):  # Files of unsupported materials would have wrong values
+                self.tables[name] = None
+                return None
+
+            path = os.path.join(self.directory, f'{name}.tb')
+
+            if os.path.exists(path) and os.path.getsize(path) == get_material(name).size:
+                self.files[name] = open(path, 'rb')
+                self.tables[name] = mmap.mmap(self.files[name].fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.tables[name] = None
+
+        return self.tables[name]
+
+    def probe_code(self, bitboard_position):
+        """Returns byte code of the position or None if there is no table for its material"""
+
+        if bitboard_position.castling:
+            return None
+
+        # Tables have no en passant, so only positions where it cannot be taken are covered
+        if bitboard_position.en_passant is not None:
+            color = bitboard_position.move_color
+            if PAWN_ATTACKS[color ^ 1][bitboard_position.en_passant] & bitboard_position.bitboards[color][PAWN]:
+                return None
+
+        name, index = get_position_key(bitboard_position)
+
+        if name in DRAWN_MATERIALS:
+            return DRAW
+
+        table = self.get_table(name)
+        return table[index] if table is not None else None
+
+    def probe(self, chess_position):
+        """Returns ProbeResult of ChessPosition, None if the position is not covered by tables"""
+
+        bitboard_position = BitboardPosition.generate_from_fen(chess_position.generate_fen())
+        if sum(bin(occupancy).count('1') for occupancy in bitboard_position.occupancy) > MAX_PIECES:
+            return None
+
+        code = self.probe_code(bitboard_position)
+        return ProbeResult(code) if code is not None and code != INVALID else None
+
+    def best_move(self, chess_position):
+        """Returns move that keeps the best tablebase value, or None if the position is not covered"""
+
+        if self.probe(chess_position) is None:
+            return None
+
+        best_move, best_score = None, None
+
+        for move in chess_position.generate_legal_moves():
+            chess_position.make_move(*move)
+            result = self.probe(chess_position)
+            chess_position.unmake_move()
+
+            if result is None:
+                return None
+
+            score = move_score(result.code)
+            if best_score is None or score > best_score:
+                best_move, best_score = move, score
+
+        return best_move
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+
+        for file in self.files.values():
+            file.close()
+
+        self.tables.clear()
+        self.files.clear()
+
+
+NO_MOVE = -32768
+
+
+def move_score(code):
+    """Score of a move for the side that made it by tablebase code of the next position:
+    wins are positive and faster is better, losses are negative and slower is better"""
+
+    if code == DRAW:
+        return 0
+
+    plies = code - 1
+    if plies % 2 == 0:  # Opponent is mated
+        return 1000 - (plies + 1)
+
+    return -1000 + plies + 1
+
+
+# Tables of smaller materials opened once in every worker process
+worker_tablebases = {}
+
+
+def analyse_batch(batch):
+    """Generates moves for a range of indices. Returns statuses, best score of moves to other materials,
+    counts of moves inside the material and indices they lead to"""
+
+    name, directory, start, stop = batch
+
+    if directory not in worker_tablebases:
+        worker_tablebases[directory] = Tablebase(directory)
+    tablebase = worker_tablebases[directory]
+
+    material = get_material(name)
+    statuses = bytearray(stop - start)  # 0 is normal, 1 is impossible, 2 is checkmate, 3 is stalemate
+    external_scores = array('h', [NO_MOVE]) * (stop - start)
+    counts = array('H', bytes(2 * (stop - start)))
+    successors = array('I')
+
+    for offset, index in enumerate(range(start, stop)):
+        bitboard_position = material.create_position(index)
+
+        # Side that is not to move must not be in check
+        if bitboard_position is None or bitboard_position.is_square_attacked(
+                bitboard_position.king_square(bitboard_position.move_color ^ 1), bitboard_position.move_color):
+            statuses[offset] = 1
+            continue
+
+        legal_moves = bitboard_position.generate_legal_moves()
+
+        if not legal_moves:
+            statuses[offset] = 2 if bitboard_position.is_check() else 3
+            continue
+
+        for square, new_square, promotion in legal_moves:
+            is_capture = bitboard_position.make_square_move(square, new_square, promotion)
+
+            if is_capture or promotion:
+                code = tablebase.probe_code(bitboard_position)
+                if code is None:
+                    raise RuntimeError(f'Table for {get_position_key(bitboard_position)[0]} '
+                                       f'is needed to generate {name}')
+
+                external_scores[offset] = max(external_scores[offset], move_score(code))
+            else:
+                successors.append(material.position_index(bitboard_position))
+                counts[offset] += 1
+
+            bitboard_position.unmake_move()
+
+    return start, statuses, external_scores, counts, successors
+
+
+def solve(size, statuses, external_scores, counts, successors):
+    """Retrograde analysis: positions are resolved in order of distance to mate, starting from checkmates.
+    Position is won if some move leads to a lost position, and lost if all moves lead to won positions"""
+
+    # Moves leading into every position
+    predecessor_counts = array('I', bytes(4 * (size + 1)))
+    for successor in successors:
+        predecessor_counts[successor + 1] += 1
+
+    predecessor_offsets = predecessor_counts
+    for index in range(size):
+        predecessor_offsets[index + 1] += predecessor_offsets[index]
+
+    predecessors = array('I', bytes(4 * len(successors)))
+    filled = array('I', predecessor_offsets[:size])
+    offset = 0
+    for index in range(size):
+        for successor in successors[offset:offset + counts[index]]:
+            predecessors[filled[successor]] = index
+            filled[successor] += 1
+        offset += counts[index]
+
+    values = bytearray(size)
+    resolved = bytearray(size)
+    remaining = array('H', counts)
+    buckets = defaultdict(list)  # Plies -> positions that are resolved at this distance
+
+    for index in range(size):
+        status = statuses[index]
+
+        if status == 1:
+            values[index], resolved[index] = INVALID, 1
+        elif status == 2:
+            buckets[0].append(index)
+        elif status == 3:
+            resolved[index] = 1
+        else:
+            score = external_scores[index]
+
+            if score > 0:  # Some capture or promotion wins
+                buckets[1000 - score].append(index)
+            elif counts[index] == 0:
+                if score < 0:
+                    buckets[score + 1000].append(index)
+                else:
+                    resolved[index] = 1
+
+    plies = 0
+    while buckets:
+        for index in buckets.pop(plies, []):
+            if resolved[index]:
+                continue
+
+            resolved[index] = 1
+            values[index] = plies + 1
+
+            for predecessor in predecessors[predecessor_offsets[index]:predecessor_offsets[index + 1]]:
+                if resolved[predecessor]:
+                    continue
+
+                if plies % 2 == 0:  # Move to a lost position wins
+                    buckets[plies + 1].append(predecessor)
+                    continue
+
+                remaining[predecessor] -= 1
+                score = external_scores[predecessor]
+
+                if remaining[predecessor] == 0 and score < 0:  # All moves lose
+                    loss_plies = plies + 1 if score == NO_MOVE else max(plies + 1, score + 1000)
+                    buckets[loss_plies].append(predecessor)
+
+        plies += 1
+
+    return values
+
+
+def generate_table(name, directory, jobs=None, batch_size=4096, output=print):
+    """Generates table of canonical material name and the tables it depends on, if they are missing"""
+
+    name, _ = normalize_material(name)
+    path = os.path.join(directory, f'{name}.tb')
+
+    if name in DRAWN_MATERIALS:
+        return
+
+    check_material(name)
+    material = get_material(name)
+
+    if os.path.exists(path) and os.path.getsize(path) == material.size:
+        return
+
+    # Captures and promotions lead to other materials
+    white, black = split_material(name)
+    for side, other in ((white, black), (black, white)):
+        for position, piece in enumerate(side):
+            smaller = side[:position] + side[position + 1:]
+            generate_table(f'K{smaller}K{other}', directory, jobs, batch_size, output)
+
+            if piece == 'P':
+                for promotion in 'QRBN':
+                    generate_table(f'K{smaller}{promotion}K{other}', directory, jobs, batch_size, output)
+
+    os.makedirs(directory, exist_ok=True)
+    start_time = time.perf_counter()
+
+    statuses = bytearray()
+    external_scores = array('h')
+    counts = array('H')
+    successors = array('I')
+
+    batches = ((name, directory, start, min(start + batch_size, material.size))
+               for start in range(0, material.size, batch_size))
+
+    for _, batch_statuses, batch_scores, batch_counts, batch_successors in map_batches(analyse_batch, batches, jobs):
+        statuses += batch_statuses
+        external_scores += batch_scores
+        counts += batch_counts
+        successors += batch_successors
+
+    values = solve(material.size, statuses, external_scores, counts, successors)
+
+    # Table is written under temporary name, so a partial file is never used
+    with open(path + '.tmp', 'wb') as file:
+        file.write(values)
+    os.replace(path + '.tmp', path)
+
+    longest = max((value - 1 for value in values if value not in (DRAW, INVALID)), default=0)
+    output(f'{name}: {material.size} positions, longest mate {longest} plies, '
+           f'{time.perf_counter() - start_time:.1f} s')
+
+
+def main(argv=None):
+    from .ChessPosition import ChessPosition
+    from .Engine import move_to_text
+
+    parser = argparse.ArgumentParser(description='Generate or probe endgame tablebases')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='generate tables with their dependencies')
+    generate_parser.add_argument('materials', nargs='+', help='materials like KQK KRK KPK KBNK')
+    generate_parser.add_argument('--directory', default='tablebases')
+    generate_parser.add_argument('--jobs', type=int, default=None, help='number of worker processes')
+
+    probe_parser = subparsers.add_parser('probe', help='show tablebase value and best move')
+    probe_parser.add_argument('--directory', default='tablebases')
+    probe_parser.add_argument('--fen', required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        try:
+            for material in args.materials:  # Fail before generating any table
+                check_material(normalize_material(material)[0])
+        except ValueError as e:
+            parser.error(str(e))
+
+        for material in args.materials:
+            generate_table(material, args.directory, args.jobs)
+        return 0
+
+    tablebase = Tablebase(args.directory)
+    chess_position = ChessPosition.generate_from_fen(args.fen)
+    result = tablebase.probe(chess_position)
+
+    if result is None:
+        print('Position is not in tablebases')
+        return 1
+
+    best_move = tablebase.best_move(chess_position)
+    print(f'{result}, best move {move_to_text(best_move) if best_move else "(none)"}')
+    tablebase.close()
+    return 0
+
+
+__all__ = ['Tablebase', 'ProbeResult', 'Material', 'generate_table', 'get_position_key', 'normalize_material',
+           'check_material', 'is_supported']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
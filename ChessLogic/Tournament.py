@@ -0,0 +1,285 @@
+"""Self-play match between two players in worker processes, with PGN output and W/D/L, Elo and nodes/second.
+Player is "random" or "engine" with search limits, e.g. "engine:depth=4", "engine:nodes=20000,hash=18" or
+"engine:time=0.1". Every opening is played twice with swapped colors
+
+Usage: python -m ChessLogic.Tournament engine:nodes=20000 engine:depth=3 --games 1000 --openings openings.epd
+       --jobs 8 --pgn match.pgn.gz --max-plies 300
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+from .BatchProcessing import split_batches, map_batches, open_text
+from .ChessGame import ChessGame
+from .Colors import Color
+from .Engine import Engine, SearchLimits, get_history_keys
+from .FENValidator import validate_fen
+from .PGN import export_pgn
+
+
+PLAYER_OPTIONS = {'depth': int, 'nodes': int, 'time': float, 'hash': int}  # hash is log2 of table size
+
+
+def parse_player(spec):
+    """"engine:depth=4,hash=18" -> ('engine', {'depth': 4, 'hash': 18})"""
+
+    kind, _, options_text = spec.partition(':')
+    if kind not in ('engine', 'random'):
+        raise ValueError(f'Unknown player "{kind}", expected "engine" or "random"')
+
+    options = {}
+    for option in filter(None, options_text.split(',')):
+        name, _, value = option.partition('=')
+        if name not in PLAYER_OPTIONS:
+            raise ValueError(f'Unknown player option "{name}"')
+        options[name] = PLAYER_OPTIONS[name](value)
+
+    if kind == 'engine' and not {'depth', 'nodes', 'time'} & options.keys():
+        options['depth'] = 3  # Search must be limited somehow
+
+    return kind, options
+
+
+def read_openings(path):
+    """Returns FENs of the file, EPD operations after the 4 position fields are dropped"""
+
+    openings = []
+
+    with open_text(path) as file:
+        for line in file:
+            fields = line.split()
+            if not fields or line.startswith('#'):
+                continue
+
+            has_clocks = len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit()
+            openings.append(' '.join(fields[:6] if has_clocks else fields[:4]))
+
+    return openings
+
+
+class Player:
+    """Chooses moves of one side, counts nodes and thinking time"""
+
+    def __init__(self, spec, seed=None):
+        self.spec = spec
+        self.kind, self.options = parse_player(spec)
+        self.generator = random.Random(seed)
+        self.engine = Engine(1 << self.options.get('hash', 16)) if self.kind == 'engine' else None
+        self.nodes = 0
+        self.seconds = 0.0
+
+    def choose_move(self, chess_position):
+        start = time.perf_counter()
+
+        if self.engine is None:
+            move = self.generator.choice(chess_position.generate_legal_moves())
+        else:
+            limits = SearchLimits(depth=self.options.get('depth'), nodes=self.options.get('nodes'),
+                                  time=self.options.get('time'))
+            result = self.engine.search(chess_position, limits, get_history_keys(chess_position))
+            move = result.best_move
+            self.nodes += result.nodes
+
+        self.seconds += time.perf_counter() - start
+        return move
+
+
+def play_game(game_index, fen, white_spec, black_spec, max_plies, seed=None):
+    """Plays one game, returns (ChessGame, result, reason, ((nodes, seconds) of white, (nodes, seconds) of black))"""
+
+    chess_game = ChessGame(fen)
+
+    # Player of every side is separate, so the same spec on both sides does not share search tables
+    white = Player(white_spec, None if seed is None else f'{seed}-{game_index}-white')
+    black = Player(black_spec, None if seed is None else f'{seed}-{game_index}-black')
+    sides = [white, black] if chess_game.current_chess_position.move_color == Color.WHITE else [black, white]
+
+    result, reason = chess_game.get_result()
+    while result == '*':
+        if len(chess_game.moves) >= max_plies:
+            result, reason = '1/2-1/2', 'move limit'
+            break
+
+        chess_position = chess_game.current_chess_position
+        chess_game.make_move(*sides[len(chess_game.moves) % 2].choose_move(chess_position))
+        result, reason = chess_game.get_result()
+
+    return chess_game, result, reason, ((white.nodes, white.seconds), (black.nodes, black.seconds))
+
+
+def play_batch(tasks):
+    """Runs in worker process: returns (game_index, is_first_white, result, reason, pgn, search) of every task"""
+
+    results = []
+
+    for game_index, fen, white_spec, black_spec, is_first_white, max_plies, seed in tasks:
+        chess_game, result, reason, search = play_game(game_index, fen, white_spec, black_spec, max_plies, seed)
+        pgn = export_pgn(chess_game, {'Event': 'Self-play match', 'Round': str(game_index + 1),
+                                      'White': white_spec, 'Black': black_spec,
+                                      'Result': result, 'Termination': reason})
+        results.append((game_index, is_first_white, result, reason, pgn, search))
+
+    return results
+
+
+def generate_tasks(first, second, openings, games, max_plies, seed=None):
+    """Every opening is played by both players as white, openings are repeated when there are fewer of them"""
+
+    for game_index in range(games):
+        fen = openings[game_index // 2 % len(openings)]
+        is_first_white = game_index % 2 == 0
+        white, black = (first, second) if is_first_white else (second, first)
+        yield game_index, fen, white, black, is_first_white, max_plies, seed
+
+
+class MatchStatistics:
+    """Wins, draws and losses of the first player, with Elo difference and nodes/second of both players.
+    Players are told apart by their slot, not spec, so a player can play against the same spec"""
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.reasons = {}
+        self.search = [(0, 0.0), (0, 0.0)]  # (nodes, seconds) of the first and the second player
+
+    def add(self, is_first_white, result, reason, search):
+        """search is ((nodes, seconds) of white, (nodes, seconds) of black)"""
+
+        first_score = {'1-0': 1, '0-1': 0}.get(result, 0.5)
+        if not is_first_white:
+            first_score = 1 - first_score
+            search = search[::-1]
+
+        if first_score == 1:
+            self.wins += 1
+        elif first_score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+        for slot, (nodes, seconds) in enumerate(search):
+            total_nodes, total_seconds = self.search[slot]
+            self.search[slot] = (total_nodes + nodes, total_seconds + seconds)
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self):
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.5
+
+    def elo_difference(self):
+        """Returns (Elo of the first player minus the second, 95% margin), infinite when one player scored all"""
+
+        score = self.score
+        if score in (0, 1):
+            return math.copysign(math.inf, score - 0.5), math.inf
+
+        deviation = math.sqrt((self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2
+                               + self.losses * score ** 2) / self.games / self.games)
+
+        def elo(value):
+            value = min(max(value, 1e-9), 1 - 1e-9)
+            return 400 * math.log10(value / (1 - value))
+
+        return elo(score), (elo(score + 1.96 * deviation) - elo(score - 1.96 * deviation)) / 2
+
+    def nodes_per_second(self, slot):
+        """slot is 0 for the first player, 1 for the second"""
+
+        nodes, seconds = self.search[slot]
+        return nodes / seconds if seconds else 0.0
+
+    def __str__(self):
+        elo, margin = self.elo_difference()
+        lines = [f'{self.first} vs {self.second}: games {self.games}, '
+                 f'+{self.wins} ={self.draws} -{self.losses}, score {self.score:.3f}, Elo {elo:+.1f} +/- {margin:.1f}',
+                 'Terminations: ' + ', '.join(f'{reason} {count}' for reason, count in sorted(self.reasons.items()))]
+
+        for slot, spec in enumerate((self.first, self.second)):
+            if self.search[slot][0]:
+                name = spec if self.first != self.second else f'{spec} ({("first", "second")[slot]})'
+                lines.append(f'{name}: {self.nodes_per_second(slot):.0f} nodes/s')
+
+        return '\n'.join(lines)
+
+
+def run_match(first, second, openings, games, max_plies=300, jobs=None, pgn_path=None, seed=None,
+              progress=None):
+    """Plays the match in worker processes, writes games to pgn_path in game order and returns MatchStatistics.
+    progress is called with the statistics after every game"""
+
+    statistics = MatchStatistics(first, second)
+    batches = split_batches(generate_tasks(first, second, openings, games, max_plies, seed), 1)
+    pgn_file = open_text(pgn_path, 'w') if pgn_path else None
+
+    try:
+        for results in map_batches(play_batch, batches, jobs):
+            for _, is_first_white, result, reason, pgn, search in results:
+                statistics.add(is_first_white, result, reason, search)
+
+                if pgn_file:
+                    pgn_file.write(pgn + '\n')
+
+                if progress:
+                    progress(statistics)
+    finally:
+        if pgn_file:
+            pgn_file.close()
+
+    return statistics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play a match between two players in parallel')
+    parser.add_argument('first', help='player, e.g. "engine:depth=4", "engine:nodes=20000" or "random"')
+    parser.add_argument('second', help='opponent of the first player')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--openings', default=None, help='file with a FEN or EPD per line, .gz is supported')
+    parser.add_argument('--max-plies', type=int, default=300, help='game is drawn after this many plies')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes, all cores by default')
+    parser.add_argument('--pgn', default=None, help='write games to PGN file, "-" for stdout')
+    parser.add_argument('--seed', type=int, default=None, help='seed of random players')
+    args = parser.parse_args(argv)
+
+    try:
+        parse_player(args.first)
+        parse_player(args.second)
+        openings = read_openings(args.openings) if args.openings else [ChessGame.initial_chess_position]
+
+        for opening in openings:  # Fail before starting workers
+            validate_fen(opening)
+    except ValueError as e:  # FENError is ValueError too
+        parser.error(str(e))
+
+    if not openings:
+        parser.error('Openings file is empty')
+
+    start = time.perf_counter()
+
+    def progress(statistics):
+        if statistics.games % 10 == 0 or statistics.games == args.games:
+            print(f'Games {statistics.games}/{args.games}: +{statistics.wins} ={statistics.draws} '
+                  f'-{statistics.losses}, {time.perf_counter() - start:.1f} s', file=sys.stderr)
+
+    statistics = run_match(args.first, args.second, openings, args.games, args.max_plies, args.jobs, args.pgn,
+                           args.seed, progress)
+
+    print(statistics, file=sys.stderr if args.pgn == '-' else sys.stdout)
+    return 0
+
+
+__all__ = ['Player', 'MatchStatistics', 'parse_player', 'read_openings', 'play_game', 'run_match']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Headless engine speaking UCI protocol on stdin and stdout, for tournament managers and chess GUIs.
+Only ChessLogic is imported, so it starts fast and runs on servers without display
+
+Usage: python -m ChessLogic.UCI --hash 64 --book book.bin --tablebases tablebases
+"""
+
+import argparse
+import re
+import sys
+import threading
+
+from .ChessGame import ChessGame
+from .ChessPosition import cell_to_coords
+from .Colors import Color
+from .Engine import Engine, SearchLimits, TranspositionTable, get_history_keys, move_to_text
+
+
+ENGINE_NAME = 'ChessPygame'
+ENGINE_AUTHOR = 'Yarodash'
+
+ENTRY_SIZE = 128  # Approximate bytes taken by transposition table entry with its tuple
+MOVE_OVERHEAD = 0.05  # Seconds kept for communication with the manager
+DEFAULT_MOVES_TO_GO = 30
+
+move_pattern = re.compile(r'[a-h][1-8][a-h][1-8][qrbn]?')
+
+
+def parse_move(text):
+    """"e7e8q" -> (4, 6, 4, 7, 'Q'), castling is king move by two cells in both UCI and ChessPosition.
+    Raises ValueError if text is not a move"""
+
+    if not move_pattern.fullmatch(text):
+        raise ValueError(f'Invalid move "{text}"')
+
+    x, y = cell_to_coords(text[0:2])
+    new_x, new_y = cell_to_coords(text[2:4])
+    promotion = text[4].upper() if len(text) > 4 else None
+
+    return x, y, new_x, new_y, promotion
+
+
+def get_think_time(options, move_color):
+    """Seconds for the move from "go" options, None if time is not limited"""
+
+    if 'movetime' in options:
+        return max(0.0, options['movetime'] / 1000 - MOVE_OVERHEAD)
+
+    remaining = options.get('wtime' if move_color == Color.WHITE else 'btime')
+    if remaining is None:
+        return None
+
+    increment = options.get('winc' if move_color == Color.WHITE else 'binc', 0) / 1000
+    remaining /= 1000
+    moves_to_go = options.get('movestogo') or DEFAULT_MOVES_TO_GO
+
+    think_time = remaining / moves_to_go + increment * 0.75
+    return max(0.01, min(think_time, remaining / 2) - MOVE_OVERHEAD)
+
+
+class UCIEngine:
+    """UCI protocol state: current game, engine and the search thread"""
+
+    def __init__(self, output=sys.stdout, hash_size=16, book_path=None, tablebase_directory=None):
+        self.output = output
+        self.output_lock = threading.Lock()  # Search thread prints info while main thread answers commands
+
+        self.engine = Engine(transposition_table=TranspositionTable(self.get_table_size(hash_size)))
+        self.chess_game = ChessGame.create_at_starting_position()
+        self.book = None
+        self.tablebase = None
+        self.set_book(book_path)
+        self.set_tablebase(tablebase_directory)
+
+        self.search_thread = None
+        self.stop_event = threading.Event()
+        self.is_infinite = False
+
+    @staticmethod
+    def get_table_size(megabytes):
+        return max(1, megabytes) * (1 << 20) // ENTRY_SIZE
+
+    def set_book(self, path):
+        if self.book:
+            self.book.close()
+        self.book = None
+
+        if path:
+            from .OpeningBook import OpeningBook  # Imported only when needed, so startup stays fast
+            self.book = OpeningBook(path)
+
+    def set_tablebase(self, directory):
+        if self.tablebase:
+            self.tablebase.close()
+        self.tablebase = None
+
+        if directory:
+            from .Tablebase import Tablebase
+            self.tablebase = Tablebase(directory)
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line):
+        """Handles single command line, returns False after "quit" """
+
+        tokens = line.split()
+        if not tokens:
+            return True
+
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'uci':
+            self.send(f'id name {ENGINE_NAME}')
+            self.send(f'id author {ENGINE_AUTHOR}')
+            self.send('option name Hash type spin default 16 min 1 max 4096')
+            self.send('option name BookFile type string default <empty>')
+            self.send('option name Tablebases type string default <empty>')
+            self.send('uciok')
+
+        elif command == 'isready':
+            self.send('readyok')
+
+        elif command == 'setoption':
+            self.wait()
+            self.set_option(args)
+
+        elif command == 'ucinewgame':
+            self.wait()
+            self.engine.new_game()
+            self.chess_game = ChessGame.create_at_starting_position()
+
+        elif command == 'position':
+            self.wait()
+            self.set_position(args)
+
+        elif command == 'go':
+            self.wait()
+            self.go(args)
+
+        elif command == 'stop':
+            self.stop()
+
+        elif command == 'quit':
+            self.stop()
+            return False
+
+        return True
+
+    def set_option(self, args):
+        text = ' '.join(args)
+        name, _, value = text.partition(' value ')
+        name = name.replace('name', '', 1).strip().lower()
+        value = '' if value.strip() == '<empty>' else value.strip()
+
+        if name == 'hash':
+            self.engine = Engine(transposition_table=TranspositionTable(self.get_table_size(int(value))))
+        elif name == 'bookfile':
+            self.set_book(value)
+        elif name == 'tablebases':
+            self.set_tablebase(value)
+
+    def set_position(self, args):
+        """Position is kept between commands, so "position ... moves" that extends it only makes the new moves"""
+
+        if args and args[0] == 'startpos':
+            fen, args = ChessGame.initial_chess_position, args[1:]
+        elif args and args[0] == 'fen':
+            fen_fields = args[1:args.index('moves')] if 'moves' in args else args[1:]
+            fen, args = ' '.join(fen_fields), args[1 + len(fen_fields):]
+        else:
+            return
+
+        moves = []
+        for text in args[1:] if args and args[0] == 'moves' else []:
+            try:
+                moves.append(parse_move(text))
+            except ValueError as error:
+                self.send(f'info string {error}, the following moves are ignored')
+                break
+
+        chess_game = self.chess_game
+        known_moves = list(chess_game.moves)
+
+        # Moves are compared with promotions, so a game that promoted to another piece is not reused
+        if chess_game.initial_position != fen or known_moves != moves[:len(known_moves)]:
+            chess_game = ChessGame(fen)
+            known_moves = []
+
+        chess_game.fast_forward()
+        for move in moves[len(known_moves):]:
+            if move not in chess_game.current_chess_position.generate_legal_moves():
+                self.send(f'info string Illegal move "{move_to_text(move)}", the following moves are ignored')
+                break
+
+            chess_game.make_move(*move)
+
+        self.chess_game = chess_game
+
+    def go(self, args):
+        options = {}
+        index = 0
+
+        while index < len(args):
+            if args[index] == 'infinite':
+                options['infinite'] = True
+                index += 1
+            elif index + 1 < len(args) and args[index + 1].lstrip('-').isdigit():
+                options[args[index]] = int(args[index + 1])
+                index += 2
+            else:  # ponder, searchmoves and other unsupported options
+                index += 1
+
+        chess_position = self.chess_game.current_chess_position
+        limits = SearchLimits(depth=options.get('depth'), nodes=options.get('nodes'),
+                              stop_event=self.stop_event)
+        if not options.get('infinite'):
+            limits.time = get_think_time(options, chess_position.move_color)
+
+        self.is_infinite = bool(options.get('infinite'))
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(target=self.search,
+                                              args=(chess_position.copy(), get_history_keys(chess_position), limits),
+                                              daemon=True)
+        self.search_thread.start()
+
+    def search(self, chess_position, history_keys, limits):
+        # Book and tablebase moves are played without search
+        best_move = self.book.choose_move(chess_position) if self.book else None
+        if not best_move and self.tablebase:
+            best_move = self.tablebase.best_move(chess_position)
+
+        if not best_move:
+            result = self.engine.search(chess_position, limits, history_keys,
+                                        on_iteration=lambda iteration: self.send(f'info {iteration}'))
+            best_move = result.best_move
+
+        # In infinite mode best move must not be sent before "stop", even if it is known or search ended earlier
+        if self.is_infinite:
+            self.stop_event.wait()
+
+        self.send(f'bestmove {move_to_text(best_move) if best_move else "0000"}')
+
+    def wait(self):
+        """Waits for running search to reach its limits, so commands piped at once are handled in order"""
+
+        if self.is_infinite:
+            self.stop_event.set()
+
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def stop(self):
+        """Stops running search, its best move is sent before this returns"""
+
+        self.stop_event.set()
+        self.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='UCI chess engine')
+    parser.add_argument('--hash', type=int, default=16, help='transposition table size in megabytes')
+    parser.add_argument('--book', default=None, help='opening book built by ChessLogic.OpeningBook')
+    parser.add_argument('--tablebases', default=None, help='directory of tables built by ChessLogic.Tablebase')
+    args = parser.parse_args(argv)
+
+    uci_engine = UCIEngine(sys.stdout, args.hash, args.book, args.tablebases)
+
+    for line in sys.stdin:
+        if not uci_engine.handle(line):
+            break
+    else:  # Input is closed without "quit", so searches piped with it are finished first
+        uci_engine.wait()
+
+    uci_engine.stop()
+    return 0
+
+
+__all__ = ['UCIEngine', 'parse_move', 'get_think_time']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import random
+
+from .Colors import Color
+
+
+class ZobristKeys:
+    """Random 64-bit keys for Zobrist hashing of chess positions"""
+
+    seed = 20221107
+
+    def __init__(self):
+        generator = random.Random(self.seed)  # Fixed seed, so keys are the same in every process
+
+        self.pieces = {char: [[generator.getrandbits(64) for _ in range(8)] for _ in range(8)]
+                       for char in 'PNBRQKpnbrqk'}
+        self.black_move = generator.getrandbits(64)
+        self.castling = {castling: generator.getrandbits(64)
+                         for castling in ('white_king_side', 'white_queen_side', 'black_king_side', 'black_queen_side')}
+        self.en_passant = [generator.getrandbits(64) for _ in range(8)]
+
+    def piece_key(self, piece, x=None, y=None):
+        """Key of piece standing at (x; y), by default at its current position"""
+
+        if x is None:
+            x, y = piece.x, piece.y
+
+        return self.pieces[piece.char_repr][y][x]
+
+    def move_color_key(self, move_color):
+        return self.black_move if move_color == Color.BLACK else 0
+
+    def castling_key(self, castling_state):
+        key = 0
+
+        for castling, castling_key in self.castling.items():
+            if getattr(castling_state, castling):
+                key ^= castling_key
+
+        return key
+
+    def en_passant_key(self, en_passant):
+        return self.en_passant[en_passant[0]] if en_passant else 0
+
+
+zobrist_keys = ZobristKeys()
+
+
+__all__ = ['ZobristKeys', 'zobrist_keys']
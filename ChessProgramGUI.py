@@ -1,10 +1,9 @@
-import tkinter
-from tkinter import simpledialog, messagebox
-
 import pygame
-import pyperclip
 
 from ChessLogic import *
+from ChessLogic.ChessPosition import FENError
+from ChessLogic.EngineWorker import EngineWorker
+from ChessLogic.FENValidator import validate_fen
 from GUIButtons import *
 from SoundEffects import *
 
@@ -88,9 +87,13 @@ class ChessBoardGUI:
         self.BLACK_CELL_ATTACK = self.load_image('Sprites/black_cell_attack.png')
         self.KING_UNDER_ATTACK = self.load_image('Sprites/king_under_attack_aura.png')
 
+        self.HINT_CELL = pygame.Surface((chess_program.SQUARE, chess_program.SQUARE), pygame.SRCALPHA)
+        self.HINT_CELL.fill((60, 160, 220, 110))
+
         self.surface = pygame.Surface((chess_program.SQUARE * 8, chess_program.SQUARE * 8))
         self.pieces = []
         self.attack_cell = None
+        self.hint_move = None
 
         self.selected_piece = None
 
@@ -109,6 +112,12 @@ class ChessBoardGUI:
                                  (i * self.chess_program.SQUARE, j * self.chess_program.SQUARE,
                                   self.chess_program.SQUARE, self.chess_program.SQUARE))
 
+        if self.hint_move:
+            x, y, new_x, new_y, _ = self.hint_move
+            self.surface.blit(self.HINT_CELL, (x * self.chess_program.SQUARE, (7 - y) * self.chess_program.SQUARE))
+            self.surface.blit(self.HINT_CELL, (new_x * self.chess_program.SQUARE,
+                                               (7 - new_y) * self.chess_program.SQUARE))
+
         if self.selected_piece:
             for x, y in self.selected_piece.moves:
                 image = [self.WHITE_CELL_MOVE, self.BLACK_CELL_MOVE, self.WHITE_CELL_ATTACK, self.BLACK_CELL_ATTACK][
@@ -117,9 +126,17 @@ class ChessBoardGUI:
                 self.surface.blit(image, (x * self.chess_program.SQUARE, (7 - y) * self.chess_program.SQUARE))
 
     def press_mouse(self, x, y):
+        if self.chess_program.is_computer_turn():
+            return
+
         for piece in self.pieces:
-            if piece.is_cursor_inside(x, y) and piece.moves:
-                self.selected_piece = piece
+            if piece.is_cursor_inside(x, y):
+                # Moves are generated only for the piece user takes
+                if piece.moves is None:
+                    piece.moves = self.chess_program.chess_game.get_piece_moves(piece.piece_x, piece.piece_y)
+
+                if piece.moves:
+                    self.selected_piece = piece
 
     def drag_mouse(self, x, y):
         if self.selected_piece:
@@ -145,13 +162,13 @@ class ChessBoardGUI:
         pass
 
     def update(self):
-        pieces_info = self.chess_program.chess_game.get_possible_moves()
+        pieces_info = self.chess_program.chess_game.get_pieces()
 
         self.pieces.clear()
         for piece_info in pieces_info:
             self.pieces.append(ChessPieceGUI(self,
                                              piece_info['type'],
-                                             piece_info['moves'],
+                                             None,
                                              piece_info['x'],
                                              piece_info['y'],
                                              piece_info['x'] * self.chess_program.SQUARE,
@@ -159,18 +176,7 @@ class ChessBoardGUI:
                                              self.chess_program.SQUARE,
                                              self.chess_program.SQUARE))
 
-        game_state = self.chess_program.chess_game.current_chess_position.get_state()
-        self.attack_cell = None
-
-        if game_state.white_king_under_attack:
-            for piece in self.pieces:
-                if piece.piece == 'K':
-                    self.attack_cell = (piece.piece_x, piece.piece_y)
-
-        if game_state.black_king_under_attack:
-            for piece in self.pieces:
-                if piece.piece == 'k':
-                    self.attack_cell = (piece.piece_x, piece.piece_y)
+        self.attack_cell = self.chess_program.chess_game.current_chess_position.get_status().king_under_attack_cell
 
     def draw(self):
         self.draw_board()
@@ -191,6 +197,11 @@ class ChessProgramGUI:
 
     FPS = 60
 
+    ENGINE_MOVE_TIME = 2.0  # Seconds for computer move
+    ENGINE_HINT_TIME = 1.0  # Seconds for best move hint
+    OPENING_BOOK = 'book.bin'  # Used by the engine if the file exists
+    TABLEBASES = 'tablebases'  # Directory of endgame tables used by the engine
+
     BACKGROUND_COLOR = (127, 127, 127)
 
     class QuitException(Exception):
@@ -199,6 +210,11 @@ class ChessProgramGUI:
     def __init__(self):
         self.chess_game = ChessGame.create_at_starting_position()
 
+        # Engine searches in another process, which is started before pygame, results are taken every frame
+        self.engine_worker = EngineWorker(self.OPENING_BOOK, self.TABLEBASES)
+        self.engine_worker.start()
+        self.computer_color = None
+
         pygame.init()
         pygame.mixer.init()
         pygame.font.init()
@@ -219,6 +235,7 @@ class ChessProgramGUI:
 
         self.buttons = []
         self.fen_copy_button = None
+        self.computer_buttons = {}
         self.create_buttons()
 
         self.update()
@@ -228,6 +245,7 @@ class ChessProgramGUI:
         self.create_promotion_buttons()
         self.create_history_buttons()
         self.create_special_buttons()
+        self.create_engine_buttons()
 
     def set_promotion(self, new_promotion):
         self.promotion = new_promotion
@@ -314,19 +332,22 @@ class ChessProgramGUI:
         self.buttons.append(restart_button)
 
         def import_fen_button_impl():
+            import tkinter  # Dialog modules are imported on first use, they are not needed to start the game
+            from tkinter import simpledialog, messagebox
+
             root = tkinter.Tk()
             root.withdraw()
             answer = simpledialog.askstring("FEN", "Enter FEN:", parent=root)
 
             try:
                 if answer is not None:
+                    validate_fen(answer)
                     self.chess_game.restart_game(answer)
                     self.update()
                     self.sound_effects.move_sound.play()
 
-            except Exception as e:
-                root.destroy()
-                raise e
+            except FENError as e:
+                messagebox.showerror('Error', f'Invalid FEN: {e}', parent=root)
 
             finally:
                 root.destroy()
@@ -348,6 +369,8 @@ class ChessProgramGUI:
         self.buttons.append(restart_initial_position_button)
 
         def copy_fen_to_clipboard():
+            import pyperclip
+
             fen = self.chess_game.current_chess_position.generate_fen()
             pyperclip.copy(fen)
 
@@ -364,6 +387,64 @@ class ChessProgramGUI:
                                  tooltip_position=TooltipPosition.BOTTOM)
         self.buttons.append(exit_button)
 
+    def create_engine_buttons(self):
+        for color, text, x in [(Color.WHITE, 'PC: White', 9.5), (Color.BLACK, 'PC: Black', 11.2)]:
+            button = TextToggleButtonGUI(self.SQUARE * x, self.SQUARE * 7.75, self.SQUARE * 1.6, self.SQUARE * 0.6,
+                                         text, self.font, lambda color=color: self.set_computer_color(color),
+                                         tooltip=f'Computer plays {str(color).lower()}', tooltip_font=self.font_tooltip,
+                                         tooltip_position=TooltipPosition.BOTTOM)
+            self.computer_buttons[color] = button
+            self.buttons.append(button)
+
+        hint_button = TextToggleButtonGUI(self.SQUARE * 12.9, self.SQUARE * 7.75, self.SQUARE * 1.6, self.SQUARE * 0.6,
+                                          'Hint', self.font, self.request_hint,
+                                          tooltip='Show best move', tooltip_font=self.font_tooltip,
+                                          tooltip_position=TooltipPosition.BOTTOM)
+        self.buttons.append(hint_button)
+
+    def set_computer_color(self, color):
+        self.computer_color = None if self.computer_color == color else color
+
+        for button_color, button in self.computer_buttons.items():
+            if button_color == self.computer_color:
+                button.activate()
+            else:
+                button.deactivate()
+
+        self.update()
+
+    def is_computer_turn(self):
+        # Computer moves only in the last position of the game, not while history is watched
+        return self.computer_color == self.chess_game.current_chess_position.move_color \
+            and self.chess_game.index == self.chess_game.history_length - 1
+
+    def is_game_over(self):
+        return self.chess_game.is_game_over()
+
+    def request_computer_move(self):
+        if self.is_computer_turn() and not self.is_game_over():
+            self.engine_worker.search(self.chess_game.current_chess_position, self.ENGINE_MOVE_TIME, 'move')
+
+    def request_hint(self):
+        if not self.is_computer_turn() and not self.is_game_over():
+            self.engine_worker.search(self.chess_game.current_chess_position, self.ENGINE_HINT_TIME, 'hint')
+
+    def handle_engine_results(self):
+        engine_result = self.engine_worker.poll()
+
+        if engine_result is None:
+            return
+
+        kind, result = engine_result
+        if result.best_move is None:
+            return
+
+        if kind == 'move' and self.is_computer_turn():
+            self.make_move(*result.best_move)
+
+        if kind == 'hint':
+            self.board.hint_move = result.best_move
+
     def handle_mouse_event(self, event):
         if event.type == pygame.MOUSEMOTION:
             if self.is_board_choosed:
@@ -409,19 +490,22 @@ class ChessProgramGUI:
         else:
             self.sound_effects.move_sound.play()
 
-        if self.chess_game.current_chess_position.is_checkmate():
+        status = self.chess_game.current_chess_position.get_status()
+        result, _ = self.chess_game.get_result()
+
+        if status.is_checkmate:
             self.sound_effects.victory_sound.play()
             return
 
-        if self.chess_game.current_chess_position.is_stalemate():
+        if result == '1/2-1/2':
             self.sound_effects.stalemate_sound.play()
             return
 
-        if self.chess_game.current_chess_position.is_check():
+        if status.is_check:
             self.sound_effects.check_sound.play()
 
-    def make_move(self, x, y, new_x, new_y):
-        move_result = self.chess_game.make_move(x, y, new_x, new_y, self.promotion)
+    def make_move(self, x, y, new_x, new_y, promotion=None):
+        move_result = self.chess_game.make_move(x, y, new_x, new_y, promotion or self.promotion)
         self.play_sound(move_result)
         self.update()
 
@@ -430,6 +514,11 @@ class ChessProgramGUI:
         self.board.update()
         self.fen_copy_button.set_fen(self.chess_game.current_chess_position.generate_fen())
 
+        # Any change of the shown position makes running search useless
+        self.board.hint_move = None
+        self.engine_worker.cancel()
+        self.request_computer_move()
+
     def draw_chessboard(self):
         pygame.draw.rect(self.screen, (110, 110, 110), (self.SQUARE * 0.4, self.SQUARE * 0.4,
                                                         self.SQUARE * 8.2, self.SQUARE * 8.2))
@@ -451,17 +540,24 @@ class ChessProgramGUI:
         for button in self.buttons:
             button.draw(self.screen)
 
-        if self.chess_game.current_chess_position.is_checkmate():
-            if self.chess_game.current_chess_position.move_color == Color.BLACK:
+        # Status is cached by position and repetitions are counted in O(1), so it is cheap every frame
+        position_status = self.chess_game.current_chess_position.get_status()
+        result, _ = self.chess_game.get_result()
+
+        if position_status.is_checkmate:
+            if position_status.move_color == Color.BLACK:
                 status = 'White won!'
             else:
                 status = 'Black won!'
 
-        elif self.chess_game.current_chess_position.is_stalemate():
+        elif position_status.is_stalemate:
             status = 'Stalemate'
 
+        elif result == '1/2-1/2':  # Reason is shown in window title
+            status = 'Draw'
+
         else:
-            if self.chess_game.current_chess_position.move_color == Color.WHITE:
+            if position_status.move_color == Color.WHITE:
                 status = 'Move for white'
             else:
                 status = 'Move for black'
@@ -469,6 +565,10 @@ class ChessProgramGUI:
         status_label = self.font_big.render(status, True, (0, 0, 0))
         self.screen.blit(status_label, status_label.get_rect(center=(self.SQUARE * 12, self.SQUARE * 4)))
 
+        if self.engine_worker.is_thinking:
+            engine_label = self.font.render('Thinking...', True, (0, 0, 0))
+            self.screen.blit(engine_label, engine_label.get_rect(center=(self.SQUARE * 12, self.SQUARE * 8.75)))
+
     def draw(self):
         self.screen.fill(self.BACKGROUND_COLOR)
 
@@ -481,12 +581,16 @@ class ChessProgramGUI:
         while True:
             try:
                 self.handle_events()
+                self.handle_engine_results()
                 self.draw()
 
             except self.QuitException as e:
                 raise e
 
             except Exception as e:
+                import tkinter
+                from tkinter import messagebox
+
                 root = tkinter.Tk()
                 root.withdraw()
                 messagebox.showerror('Error', 'Error with chess position occured.\nRestarting game...')
@@ -503,6 +607,8 @@ class ChessProgramGUI:
             self.mainloop()
         except self.QuitException:
             pygame.quit()
+        finally:
+            self.engine_worker.close()
 
 
 __all__ = ['ChessProgramGUI']
@@ -280,6 +280,27 @@ class FENCopyButtonGUI(ButtonGUI):
         high_surface.blit(text_surface, (self.x, self.y))
 
 
+class TextToggleButtonGUI(ButtonGUI):
+    """Button class with text label, that is highlighted while activated"""
+
+    def __init__(self, x, y, width, height, text, font, command=lambda: None, **kwargs):
+        super().__init__(x, y, width, height, command, **kwargs)
+
+        self.text = text
+        self.font = font
+
+    def _draw(self, high_surface):
+        if self.activated:
+            background_color = (70, 130, 70)
+        else:
+            background_color = (90, 90, 90) if self.is_hovered else (100, 100, 100)
+
+        pygame.draw.rect(high_surface, background_color, self, border_radius=5)
+
+        text_surface = self.font.render(self.text, True, (0, 0, 0))
+        high_surface.blit(text_surface, text_surface.get_rect(center=self.center))
+
+
 __all__ = ['QueenPromotionButton',
            'BishopPromotionButton',
            'KnightPromotionButton',
@@ -293,4 +314,5 @@ __all__ = ['QueenPromotionButton',
            'RestartInitialPositionButton',
            'ExitButton',
            'FENCopyButtonGUI',
+           'TextToggleButtonGUI',
            'TooltipPosition']
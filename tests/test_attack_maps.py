@@ -0,0 +1,45 @@
+import random
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Colors import Color
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+class AttackMapsTest(unittest.TestCase):
+    """Attack maps updated by make_move and unmake_move must equal the maps built from scratch"""
+
+    def assert_maps_rebuilt(self, chess_position):
+        chess_position.is_attacked_by(0, 0, Color.WHITE)  # Builds or updates the maps
+        fresh_position = ChessPosition.generate_from_fen(chess_position.generate_fen())
+        fresh_position.build_attack_maps()
+
+        for color in Color:
+            self.assertEqual(chess_position.attack_counts[color], fresh_position.attack_counts[color])
+
+    def test_random_games(self):
+        generator = random.Random(2)
+
+        for name, fen, _ in REFERENCE_POSITIONS:
+            for _ in range(5):
+                with self.subTest(position=name):
+                    chess_position = ChessPosition.generate_from_fen(fen)
+                    made_moves = 0
+
+                    for _ in range(40):
+                        legal_moves = sorted(chess_position.generate_legal_moves(),
+                                             key=lambda move: (move[:4], move[4] or ''))
+                        if not legal_moves:
+                            break
+
+                        chess_position.make_move(*generator.choice(legal_moves))
+                        made_moves += 1
+                        self.assert_maps_rebuilt(chess_position)
+
+                    for _ in range(made_moves):
+                        chess_position.unmake_move()
+                        self.assert_maps_rebuilt(chess_position)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import random
+import unittest
+
+import numpy as np
+
+from ChessLogic.BatchBitboards import encode_fens, encode_positions
+from ChessLogic.BatchEvaluation import evaluate_batch, evaluate_planes, evaluate_terms
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Colors import Color
+from ChessLogic.Engine import evaluate
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+def random_positions(count, seed):
+    """Positions along random games from every reference position"""
+
+    generator = random.Random(seed)
+    chess_positions = []
+
+    for _, fen, _ in REFERENCE_POSITIONS:
+        chess_position = ChessPosition.generate_from_fen(fen)
+
+        for _ in range(count):
+            legal_moves = chess_position.generate_legal_moves()
+            if not legal_moves:
+                break
+
+            chess_position = chess_position.generate_position_after_move(*generator.choice(legal_moves))
+            chess_positions.append(chess_position)
+
+    return chess_positions
+
+
+def mirror_fen(fen):
+    """FEN with board flipped vertically and colors swapped"""
+
+    board, move_color = fen.split()[:2]
+    return '/'.join(reversed(board.split('/'))).swapcase() + (' b' if move_color == 'w' else ' w')
+
+
+class BatchEvaluationTest(unittest.TestCase):
+    def test_material_matches_engine(self):
+        chess_positions = random_positions(30, seed=1)
+        planes, _ = encode_positions(chess_positions)
+        terms = evaluate_terms(planes)
+
+        for index, chess_position in enumerate(chess_positions):
+            score = evaluate(chess_position)
+            white_score = score if chess_position.move_color == Color.WHITE else -score
+            self.assertEqual(terms['material'][index] + terms['piece_square'][index], white_score)
+
+    def test_fens_and_positions(self):
+        chess_positions = random_positions(10, seed=2)
+        fens = [chess_position.generate_fen() for chess_position in chess_positions]
+
+        from_positions = evaluate_batch(chess_positions, batch_size=7)
+        self.assertEqual(from_positions.tolist(), evaluate_batch(fens).tolist())
+        self.assertEqual(len(evaluate_batch([])), 0)
+
+    def test_mirrored_positions(self):
+        fens = [fen for _, fen, _ in REFERENCE_POSITIONS]
+        mirrored = [mirror_fen(fen) for fen in fens]
+
+        # Score is from side to move, so the mirrored position with the other side to move scores the same
+        self.assertEqual(evaluate_batch(fens).tolist(), evaluate_batch(mirrored).tolist())
+
+        for term, scores in evaluate_terms(encode_fens(fens)[0]).items():
+            with self.subTest(term=term):
+                self.assertEqual(scores.tolist(), (-evaluate_terms(encode_fens(mirrored)[0])[term]).tolist())
+
+    def test_terms(self):
+        # Doubled and isolated pawns of white, passed pawn on the 6th rank of black
+        planes, white_to_move = encode_fens(['4k3/8/8/8/8/2P5/2P5/4K3 w - -', '4k3/8/8/8/8/2p5/8/4K3 w - -'])
+        pawn_structure = evaluate_terms(planes)['pawn_structure']
+
+        self.assertEqual(pawn_structure[0], -10 - 2 * 15 + 5 + 10)
+        self.assertEqual(pawn_structure[1], 15 - 60)
+        self.assertEqual(evaluate_planes(planes, ~white_to_move).tolist(),
+                         (-evaluate_planes(planes, white_to_move)).tolist())
+        self.assertEqual(evaluate_planes(planes, white_to_move).dtype, np.int32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import random
+import unittest
+
+import numpy as np
+
+from ChessLogic.BatchBitboards import popcount
+from ChessLogic.BatchMoveGeneration import check_targets, generate_batch_moves, move_masks
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.CompactPosition import CompactPosition
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+def random_fens(plies, seed):
+    """FENs along random games from every reference position"""
+
+    generator = random.Random(seed)
+    fens = []
+
+    for _, fen, _ in REFERENCE_POSITIONS:
+        chess_position = ChessPosition.generate_from_fen(fen)
+        fens.append(fen)
+
+        for _ in range(plies):
+            legal_moves = chess_position.generate_legal_moves()
+            if not legal_moves:
+                break
+
+            legal_moves = sorted(legal_moves, key=lambda move: (move[:4], move[4] or ''))
+            chess_position.make_move(*generator.choice(legal_moves))
+            fens.append(chess_position.generate_fen())
+
+    return fens
+
+
+class BatchMoveGenerationTest(unittest.TestCase):
+    def test_legal_targets(self):
+        fens = random_fens(40, seed=3)
+        pseudo_legal, legal = generate_batch_moves(fens)
+
+        for fen, targets in zip(fens, legal):
+            with self.subTest(fen=fen):
+                self.assertEqual(check_targets(fen, targets), [])
+
+        # Legal moves are a subset of pseudo-legal ones
+        self.assertFalse(np.any(legal & ~pseudo_legal))
+
+    def test_move_counts(self):
+        fens = [fen for _, fen, _ in REFERENCE_POSITIONS]
+        _, legal = generate_batch_moves(fens)
+
+        # Promotions are one from-to move in targets, but four moves in node counts
+        for fen, expected_counts, moves in zip(fens, (counts for _, _, counts in REFERENCE_POSITIONS),
+                                              popcount(legal).sum(axis=1)):
+            chess_position = ChessPosition.generate_from_fen(fen)
+            from_to_moves = {move[:4] for move in chess_position.generate_legal_moves()}
+
+            with self.subTest(fen=fen):
+                self.assertEqual(moves, len(from_to_moves))
+                self.assertLessEqual(moves, expected_counts[0])
+
+    def test_positions(self):
+        fens = random_fens(10, seed=4)
+        chess_positions = [ChessPosition.generate_from_fen(fen) for fen in fens]
+        compact_positions = [CompactPosition.from_position(chess_position) for chess_position in chess_positions]
+
+        expected = generate_batch_moves(fens)
+        for positions in (chess_positions, compact_positions):
+            for targets, expected_targets in zip(generate_batch_moves(positions), expected):
+                self.assertTrue(np.array_equal(targets, expected_targets))
+
+    def test_move_masks(self):
+        _, legal = generate_batch_moves([REFERENCE_POSITIONS[0][1]])
+        masks = move_masks(legal)
+
+        self.assertEqual(masks.shape, (1, 64, 64))
+        self.assertEqual(int(masks.sum()), 20)
+        self.assertEqual(masks[0, 6, 21], 1)  # g1f3
+        self.assertEqual(masks[0, 12, 28], 1)  # e2e4
+
+
+if __name__ == '__main__':
+    unittest.main()
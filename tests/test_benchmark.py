@@ -0,0 +1,53 @@
+import unittest
+
+from ChessLogic.Benchmark import BENCHMARKS, CORPUS, Benchmark, compare, measure, run_benchmarks
+from ChessLogic.ChessPosition import ChessPosition
+
+
+def results_of(**minimums):
+    return {'benchmarks': {name: {'min_us': value, 'median_us': value} for name, value in minimums.items()}}
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_measure_rounds(self):
+        order = []
+        benchmarks = [Benchmark(name=name, run=lambda corpus, name=name: order.append(name) or len(corpus))
+                      for name in ('first', 'second')]
+
+        runs = measure(benchmarks, CORPUS, repeat=3, number=2, warmup=1)
+
+        # Warmup runs first, then rounds measure every benchmark in turn
+        self.assertEqual(order, ['first', 'second'] + ['first', 'first', 'second', 'second'] * 3)
+        self.assertEqual([len(runs['first']), len(runs['second'])], [3, 3])
+
+    def test_run_benchmarks(self):
+        lines = []
+        max_size = ChessPosition.move_cache.max_size
+        results = run_benchmarks(['generate_fen', 'navigation'], repeat=2, number=1, warmup=0, output=lines.append)
+
+        self.assertEqual(set(results['benchmarks']), {'ChessPosition.generate_fen', 'ChessGame navigation'})
+        self.assertEqual(results['corpus_size'], len(CORPUS))
+        self.assertEqual(len(results['benchmarks']['ChessGame navigation']['runs_us']), 2)
+        self.assertEqual(len(lines), 2)
+
+        # Move cache is restored after it was disabled for timing
+        self.assertEqual(ChessPosition.move_cache.max_size, max_size)
+
+    def test_every_benchmark_runs(self):
+        for benchmark in BENCHMARKS:
+            with self.subTest(name=benchmark.name):
+                self.assertGreater(benchmark.run(benchmark.setup(CORPUS)), 0)
+
+    def test_compare(self):
+        baseline = results_of(fast=10.0, slow=10.0, same=10.0)
+        results = results_of(fast=8.0, slow=11.5, same=10.5, added=3.0)
+        lines = []
+
+        self.assertEqual(compare(results, baseline, threshold=0.1, output=lines.append), ['slow'])
+        self.assertEqual(compare(results, baseline, threshold=0.2, output=lines.append), [])
+        self.assertTrue(lines[0].startswith('Benchmark'))
+        self.assertTrue(any(line.startswith('added') and line.endswith('new') for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from ChessLogic.BitboardPosition import BitboardPosition
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+MAX_NODES = 10000
+
+
+def bitboard_perft(bitboard_position, depth):
+    legal_moves = bitboard_position.generate_legal_moves()
+
+    if depth == 1:
+        return len(legal_moves)
+
+    nodes = 0
+    for move in legal_moves:
+        bitboard_position.make_square_move(*move)
+        nodes += bitboard_perft(bitboard_position, depth - 1)
+        bitboard_position.unmake_move()
+
+    return nodes
+
+
+def sort_moves(moves):
+    return sorted(moves, key=lambda move: (move[:4], move[4] or ''))
+
+
+def sort_pieces(pieces):
+    """get_possible_moves output with pieces and their moves in a fixed order"""
+    return sorted((dict(piece, moves=sorted(piece['moves'])) for piece in pieces),
+                  key=lambda piece: (piece['x'], piece['y']))
+
+
+class BitboardPositionTest(unittest.TestCase):
+    """BitboardPosition must agree with ChessPosition on everything it exposes"""
+
+    def test_perft(self):
+        for name, fen, counts in REFERENCE_POSITIONS:
+            for depth, nodes in enumerate(counts, 1):
+                if nodes <= MAX_NODES:
+                    with self.subTest(position=name, depth=depth):
+                        self.assertEqual(bitboard_perft(BitboardPosition.generate_from_fen(fen), depth), nodes)
+
+    def test_fen_round_trip(self):
+        for name, fen, _ in REFERENCE_POSITIONS:
+            with self.subTest(position=name):
+                self.assertEqual(BitboardPosition.generate_from_fen(fen).generate_fen(), fen)
+
+    def test_same_as_chess_position(self):
+        """Legal moves, check and FEN with clocks after every move of random games, then FEN after every unmake"""
+
+        generator = random.Random(1)
+
+        for name, fen, _ in REFERENCE_POSITIONS:
+            for _ in range(10):
+                with self.subTest(position=name):
+                    chess_position = ChessPosition.generate_from_fen(fen)
+                    bitboard_position = BitboardPosition.generate_from_fen(fen)
+                    fens = []
+
+                    for _ in range(60):
+                        legal_moves = sort_moves(chess_position.generate_legal_moves())
+                        self.assertEqual(sort_moves(bitboard_position.calculate_legal_moves()), legal_moves)
+                        self.assertEqual(bitboard_position.is_check(), chess_position.get_status().is_check)
+                        if not legal_moves:
+                            break
+
+                        move = generator.choice(legal_moves)
+                        fens.append(bitboard_position.generate_fen())
+                        chess_position.make_move(*move)
+                        bitboard_position.make_move(*move)
+                        self.assertEqual(bitboard_position.generate_fen(), chess_position.generate_fen())
+
+                    while fens:
+                        bitboard_position.unmake_move()
+                        self.assertEqual(bitboard_position.generate_fen(), fens.pop())
+
+    def test_get_possible_moves(self):
+        for name, fen, _ in REFERENCE_POSITIONS:
+            with self.subTest(position=name):
+                self.assertEqual(sort_pieces(BitboardPosition.generate_from_fen(fen).get_possible_moves()),
+                                 sort_pieces(ChessPosition.generate_from_fen(fen).get_possible_moves()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from ChessLogic.ChessGame import ChessGame
+from ChessLogic.ChessPosition import ChessPosition
+
+
+def play_random_game(fen, plies, seed):
+    chess_game = ChessGame(fen)
+    generator = random.Random(seed)
+    fens = [chess_game.current_chess_position.generate_fen()]
+
+    for _ in range(plies):
+        legal_moves = chess_game.current_chess_position.generate_legal_moves()
+        if not legal_moves:
+            break
+
+        chess_game.make_move(*generator.choice(sorted(legal_moves, key=lambda move: (move[:4], move[4] or ''))))
+        fens.append(chess_game.current_chess_position.generate_fen())
+
+    return chess_game, fens
+
+
+class HistoryTest(unittest.TestCase):
+    """History is kept as moves and keyframes, so every ply has to be reconstructed exactly"""
+
+    def test_navigation(self):
+        chess_game, fens = play_random_game(ChessGame.initial_chess_position, 100, 5)
+
+        chess_game.rewind()
+        for index in range(len(fens)):
+            self.assertEqual(chess_game.current_chess_position.generate_fen(), fens[index])
+            chess_game.skip()
+
+        for index in range(len(fens) - 1, -1, -1):
+            self.assertEqual(chess_game.current_chess_position.generate_fen(), fens[index])
+            chess_game.skip_backward()
+
+        # Jumps in both directions over several keyframes
+        generator = random.Random(5)
+        for _ in range(50):
+            chess_game.index = generator.randrange(len(fens))
+            self.assertEqual(chess_game.current_chess_position.generate_fen(), fens[chess_game.index])
+
+        chess_game.fast_forward()
+        self.assertEqual(chess_game.current_chess_position.generate_fen(), fens[-1])
+
+    def test_move_after_going_back(self):
+        chess_game, fens = play_random_game(ChessGame.initial_chess_position, 40, 6)
+
+        chess_game.index = 20
+        move = chess_game.current_chess_position.generate_legal_moves()[0]
+        chess_game.make_move(*move)
+
+        chess_position = ChessPosition.generate_from_fen(fens[20])
+        chess_position.make_move(*move)
+
+        self.assertEqual(len(chess_game.moves), 21)
+        self.assertEqual(chess_game.history_length, 22)
+        self.assertEqual(chess_game.current_chess_position.generate_fen(), chess_position.generate_fen())
+
+    def test_keyframes(self):
+        chess_game, _ = play_random_game(ChessGame.initial_chess_position, 100, 7)
+
+        self.assertEqual(len(chess_game.keyframes), len(chess_game.moves) // chess_game.keyframe_interval + 1)
+
+        # Going back before a keyframe drops the keyframes after it
+        chess_game.index = chess_game.keyframe_interval + 1
+        chess_game.make_move(*chess_game.current_chess_position.generate_legal_moves()[0])
+        self.assertEqual(len(chess_game.keyframes), 2)
+
+        chess_game.restart()
+        self.assertEqual((chess_game.moves, len(chess_game.keyframes), chess_game.index), ([], 1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
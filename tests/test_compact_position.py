@@ -0,0 +1,33 @@
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.CompactPosition import CompactPosition
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+class CompactPositionTest(unittest.TestCase):
+    def test_round_trip(self):
+        for name, fen, _ in REFERENCE_POSITIONS:
+            with self.subTest(position=name):
+                chess_position = ChessPosition.generate_from_fen(fen)
+                compact_position = CompactPosition.from_position(chess_position)
+                restored_position = compact_position.to_position()
+
+                self.assertEqual(compact_position.generate_fen(), fen)
+                self.assertEqual(CompactPosition.generate_from_fen(fen).generate_fen(), fen)
+                self.assertEqual(restored_position.generate_fen(), fen)
+                self.assertEqual(restored_position.zobrist_key, chess_position.zobrist_key)
+                self.assertEqual(len(restored_position.generate_legal_moves()),
+                                 len(chess_position.generate_legal_moves()))
+
+    def test_pieces(self):
+        compact_position = CompactPosition.generate_from_fen(REFERENCE_POSITIONS[0][1])
+
+        self.assertEqual(compact_position.get_char_at(4, 0), 'K')
+        self.assertEqual(compact_position.get_char_at(3, 7), 'q')
+        self.assertIsNone(compact_position.get_char_at(4, 4))
+        self.assertEqual(len(compact_position.get_pieces()), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
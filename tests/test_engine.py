@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Engine import Engine, SearchLimits, evaluate, get_history_keys, move_to_text
+
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+class EngineTest(unittest.TestCase):
+    def test_mate_in_one(self):
+        chess_position = ChessPosition.generate_from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        result = Engine(table_size=1 << 12).search(chess_position, SearchLimits(depth=3))
+
+        self.assertEqual(move_to_text(result.best_move), 'a1a8')
+        self.assertEqual(result.mate_in, 1)
+
+        # Search leaves the position as it was
+        self.assertEqual(chess_position.generate_fen(), '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+
+    def test_mated_side(self):
+        chess_position = ChessPosition.generate_from_fen('R5k1/5ppp/8/8/8/8/8/6K1 b - - 1 1')
+        self.assertTrue(chess_position.get_status().is_checkmate)
+
+        result = Engine(table_size=1 << 12).search(chess_position, SearchLimits(depth=2))
+        self.assertIsNone(result.best_move)
+
+    def test_wins_material(self):
+        chess_position = ChessPosition.generate_from_fen('4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1')
+        result = Engine(table_size=1 << 12).search(chess_position, SearchLimits(depth=2))
+
+        self.assertEqual(move_to_text(result.best_move), 'd1d5')
+        self.assertGreater(result.score, 0)
+
+    def test_stop_event(self):
+        stop_event = threading.Event()
+        stop_event.set()
+
+        chess_position = ChessPosition.generate_from_fen(START_FEN)
+        result = Engine(table_size=1 << 12).search(chess_position, SearchLimits(depth=20, stop_event=stop_event))
+
+        # Even a cancelled search returns a legal move
+        self.assertLess(result.depth, 20)
+        self.assertIn(result.best_move, chess_position.generate_legal_moves())
+
+    def test_evaluate(self):
+        start = ChessPosition.generate_from_fen(START_FEN)
+        self.assertEqual(evaluate(start), 0)
+
+        # Evaluation is from side to move, so it is symmetrical
+        white_up = ChessPosition.generate_from_fen('4k3/8/8/8/8/8/8/3QK3 w - - 0 1')
+        black_to_move = ChessPosition.generate_from_fen('4k3/8/8/8/8/8/8/3QK3 b - - 0 1')
+        self.assertGreater(evaluate(white_up), 800)
+        self.assertEqual(evaluate(black_to_move), -evaluate(white_up))
+
+    def test_history_keys(self):
+        chess_position = ChessPosition.generate_from_fen(START_FEN)
+        chess_position.make_move(4, 1, 4, 3)
+        chess_position.make_move(6, 7, 5, 5)
+        chess_position.make_move(6, 0, 5, 2)
+
+        # Keys stop at the pawn move, as earlier positions cannot repeat
+        self.assertEqual(len(get_history_keys(chess_position)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition, FENError
+from ChessLogic.FENValidator import normalize_fen, validate_fen, validate_lines
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+class FENTest(unittest.TestCase):
+    def test_round_trip(self):
+        for name, fen, _ in REFERENCE_POSITIONS:
+            with self.subTest(position=name):
+                self.assertEqual(ChessPosition.generate_from_fen(fen).generate_fen(), fen)
+
+    def test_missing_clocks(self):
+        chess_position = ChessPosition.generate_from_fen('8/8/8/8/k2Pp2Q/8/8/3K4 b - d3')
+        self.assertEqual(chess_position.generate_fen(), '8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1')
+
+    def test_invalid(self):
+        for fen, message in [('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1', '8 rows'),
+                             ('rnbqkbnr/pppppppp/71/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'consecutive digits'),
+                             ('rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'longer than 8'),
+                             ('rnbqkbnr/pppppppp/p8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'longer than 8'),
+                             ('rnbqkbnr/pppppppp/7/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', '7 cells'),
+                             ('rnbqkbnr/ppppxppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'Unknown piece'),
+                             ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1', 'Move color'),
+                             ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkx - 0 1', 'castling'),
+                             ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4 0 1', 'en passant'),
+                             ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 0', 'clocks')]:
+            with self.subTest(fen=fen):
+                with self.assertRaisesRegex(FENError, message):
+                    ChessPosition.generate_from_fen(fen)
+
+
+class FENValidatorTest(unittest.TestCase):
+    def test_illegal_positions(self):
+        for fen, message in [('8/8/8/8/8/8/8/K7 w - -', 'exactly one king'),
+                             ('k7/8/8/8/8/8/8/KK6 w - -', 'exactly one king'),
+                             ('k6P/8/8/8/8/8/8/K7 w - -', 'back rank'),
+                             ('k6R/8/8/8/8/8/8/K7 w - -', 'not to move but is in check'),
+                             ('k7/8/8/8/8/8/8/K7 w K -', 'king or rook has moved'),
+                             ('k7/8/8/8/8/8/8/K7 w - e6', 'double step')]:
+            with self.subTest(fen=fen):
+                with self.assertRaisesRegex(FENError, message):
+                    validate_fen(fen)
+
+    def test_normalize(self):
+        self.assertEqual(normalize_fen('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 5 10'),
+                         'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 5 10')
+        self.assertEqual(normalize_fen('4k3/8/8/8/8/8/8/4K3 w - - bm Kd2; id "test";'),
+                         '4k3/8/8/8/8/8/8/4K3 w - - bm Kd2; id "test";')
+
+        with self.assertRaises(FENError):
+            normalize_fen('4k3/8/8/8/8/8/8/4K3 w - - 1')
+
+    def test_lines_keep_order(self):
+        lines = ['4k3/8/8/8/8/8/8/4K3 w - -', '', 'bad', '8/8/8/8/8/8/8/4K3 w - -', '4k3/8/8/8/8/8/8/4K3 b - -']
+        results = list(validate_lines(lines, jobs=1, batch_size=2))
+
+        self.assertEqual([line_number for line_number, _, _ in results], [1, 3, 4, 5])
+        self.assertEqual([error is None for _, _, error in results], [True, False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
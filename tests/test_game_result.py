@@ -0,0 +1,71 @@
+import unittest
+
+from ChessLogic.ChessGame import ChessGame, get_game_result
+from ChessLogic.ChessPosition import ChessPosition
+
+
+class GameResultTest(unittest.TestCase):
+    def test_threefold_repetition(self):
+        chess_game = ChessGame.create_at_starting_position()
+        knight_moves = [(6, 0, 5, 2), (6, 7, 5, 5), (5, 2, 6, 0), (5, 5, 6, 7)]
+
+        for move in knight_moves * 2:
+            self.assertEqual(chess_game.get_result(), ('*', None))
+            chess_game.make_move(*move)
+
+        self.assertEqual(chess_game.get_repetition_count(), 3)
+        self.assertEqual(chess_game.get_result(), ('1/2-1/2', 'threefold repetition'))
+
+        # Going back in history shows the earlier occurrences
+        chess_game.skip_backward()
+        self.assertEqual(chess_game.get_result(), ('*', None))
+        self.assertEqual(chess_game.get_repetition_count(4), 2)
+
+    def test_impossible_en_passant_is_not_a_different_position(self):
+        with_en_passant = ChessPosition.generate_from_fen('4k3/8/8/8/4P3/8/8/4K3 b - e3 0 1')
+        without_en_passant = ChessPosition.generate_from_fen('4k3/8/8/8/4P3/8/8/4K3 b - - 0 1')
+        capturable = ChessPosition.generate_from_fen('4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1')
+        not_capturable = ChessPosition.generate_from_fen('4k3/8/8/8/3pP3/8/8/4K3 b - - 0 1')
+
+        self.assertEqual(with_en_passant.get_repetition_key(), without_en_passant.get_repetition_key())
+        self.assertNotEqual(capturable.get_repetition_key(), not_capturable.get_repetition_key())
+
+    def test_fifty_moves(self):
+        self.assertEqual(get_game_result(ChessPosition.generate_from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 99 80')),
+                         ('*', None))
+        self.assertEqual(get_game_result(ChessPosition.generate_from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 100 80')),
+                         ('1/2-1/2', 'fifty-move rule'))
+
+        # Checkmate on the move that completes fifty moves wins
+        self.assertEqual(get_game_result(ChessPosition.generate_from_fen('R3k3/8/4K3/8/8/8/8/8 b - - 100 80')),
+                         ('1-0', 'checkmate'))
+
+    def test_move_clocks(self):
+        chess_game = ChessGame('4k3/8/8/8/8/8/4P3/R3K3 w - - 10 20')
+
+        chess_game.make_move(0, 0, 0, 5)
+        self.assertTrue(chess_game.current_chess_position.generate_fen().endswith(' b - - 11 20'))
+        chess_game.make_move(4, 7, 3, 7)
+        self.assertTrue(chess_game.current_chess_position.generate_fen().endswith(' w - - 12 21'))
+        chess_game.make_move(4, 1, 4, 3)
+        self.assertTrue(chess_game.current_chess_position.generate_fen().endswith(' b - e3 0 21'))
+
+    def test_insufficient_material(self):
+        for fen, is_draw in [('4k3/8/8/8/8/8/8/4K3 w - -', True),
+                             ('4k3/8/8/8/8/8/8/2B1K3 w - -', True),
+                             ('4k3/8/8/8/8/8/8/1N2K3 w - -', True),
+                             ('2b1k3/8/8/8/8/8/8/2B1K3 w - -', False),  # Bishops on different cell colors
+                             ('3bk3/8/8/8/8/8/8/2B1K3 w - -', True),
+                             ('4k3/8/8/8/8/8/8/1NN1K3 w - -', False),
+                             ('4k3/8/8/8/8/8/4P3/4K3 w - -', False)]:
+            with self.subTest(fen=fen):
+                result = get_game_result(ChessPosition.generate_from_fen(fen))
+                self.assertEqual(result == ('1/2-1/2', 'insufficient material'), is_draw)
+
+    def test_stalemate(self):
+        self.assertEqual(get_game_result(ChessPosition.generate_from_fen('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1')),
+                         ('1/2-1/2', 'stalemate'))
+
+
+if __name__ == '__main__':
+    unittest.main()
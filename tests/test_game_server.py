@@ -0,0 +1,131 @@
+import asyncio
+import json
+import unittest
+
+from ChessLogic.GameServer import MAX_LINE, GameServer, LatencyStats, analyse_position, run_benchmark
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b'\n')
+        return await self.receive()
+
+    async def receive(self):
+        return json.loads(await asyncio.wait_for(self.reader.readline(), 10))
+
+    def close(self):
+        self.writer.close()
+
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.game_server = GameServer()
+        self.server = await asyncio.start_server(self.game_server.handle_client, '127.0.0.1', 0, limit=MAX_LINE)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def connect(self):
+        connection = Connection(*await asyncio.open_connection('127.0.0.1', self.port, limit=MAX_LINE))
+        self.addCleanup(connection.close)
+        return connection
+
+    async def test_new_move_update(self):
+        player, watcher = await self.connect(), await self.connect()
+
+        game = await player.send({'type': 'new', 'id': 7})
+        self.assertEqual(game['type'], 'game')
+        self.assertEqual(game['id'], 7)
+        self.assertEqual(len(game['legal_moves']), 20)
+        self.assertEqual(game['ply'], 0)
+
+        joined = await watcher.send({'type': 'join', 'game': game['game']})
+        self.assertEqual(joined['fen'], game['fen'])
+
+        moved = await player.send({'type': 'move', 'game': game['game'], 'move': 'e2e4'})
+        self.assertEqual(moved['type'], 'moved')
+        self.assertEqual(moved['fen'], 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1')
+        self.assertEqual(moved['ply'], 1)
+
+        # Subscriber gets the move of the other client
+        update = await watcher.receive()
+        self.assertEqual(update['type'], 'update')
+        self.assertEqual(update['move'], 'e2e4')
+        self.assertEqual(update['fen'], moved['fen'])
+
+        state = await watcher.send({'type': 'state', 'game': game['game']})
+        self.assertEqual(state['legal_moves'], moved['legal_moves'])
+
+        stats = await watcher.send({'type': 'stats'})
+        self.assertEqual((stats['games'], stats['clients'], stats['moves']), (1, 2, 1))
+
+    async def test_game_over(self):
+        connection = await self.connect()
+        game = await connection.send({'type': 'new'})
+
+        for move in ('f2f3', 'e7e5', 'g2g4', 'd8h4'):
+            moved = await connection.send({'type': 'move', 'game': game['game'], 'move': move})
+
+        self.assertEqual((moved['result'], moved['reason']), ('0-1', 'checkmate'))
+        self.assertEqual(moved['legal_moves'], [])
+
+        error = await connection.send({'type': 'move', 'game': game['game'], 'move': 'e2e4'})
+        self.assertEqual(error, {'type': 'error', 'message': 'Game is over: 0-1'})
+
+        closed = await connection.send({'type': 'close', 'game': game['game']})
+        self.assertEqual(closed, {'type': 'closed', 'game': game['game']})
+        self.assertEqual(self.game_server.sessions, {})
+
+    async def test_errors(self):
+        connection = await self.connect()
+        game = await connection.send({'type': 'new', 'fen': '4k3/8/8/8/8/8/8/4K3 w - - 0 1'})
+        self.assertEqual((game['result'], game['reason']), ('1/2-1/2', 'insufficient material'))
+
+        for request, message in [({'type': 'move', 'game': '99', 'move': 'e2e4'}, 'Unknown game 99'),
+                                 ({'type': 'new', 'fen': 'k7/8/8/8/8/8/8/8 w - -'}, None),
+                                 ({'type': 'new', 'fen': 5}, 'FEN must be a string'),
+                                 ({'type': 'dance'}, 'Unknown request type dance'),
+                                 ([1, 2], 'Request must be JSON object')]:
+            with self.subTest(request=request):
+                error = await connection.send(request)
+                self.assertEqual(error['type'], 'error')
+                if message:
+                    self.assertEqual(error['message'], message)
+
+        connection.writer.write(b'{"type": \n')
+        self.assertTrue((await connection.receive())['message'].startswith('Invalid JSON'))
+
+        # Connection still works after errors
+        self.assertEqual((await connection.send({'type': 'state', 'game': game['game']}))['type'], 'game')
+
+    async def test_benchmark(self):
+        summary = await run_benchmark('127.0.0.1', self.port, games=3, clients=2, plies=6, seed=1)
+
+        self.assertEqual(summary['games'], 3)
+        self.assertGreater(summary['moves'], 0)
+        self.assertEqual(self.game_server.sessions, {})
+
+
+class AnalysisTest(unittest.TestCase):
+    def test_analyse_position(self):
+        legal_moves, result, reason = analyse_position('7k/8/8/8/8/8/8/K6R b - - 0 1', repetition_count=3)
+
+        self.assertEqual(sorted(legal_moves), ['h8g7', 'h8g8'])
+        self.assertEqual((result, reason), ('1/2-1/2', 'threefold repetition'))
+
+    def test_latency_stats(self):
+        latency = LatencyStats(window=3)
+        for seconds in (0.004, 0.001, 0.002, 0.003):
+            latency.add(seconds)
+
+        self.assertEqual(latency.summary(), {'moves': 4, 'mean_ms': 2.5, 'p50_ms': 2.0, 'p99_ms': 3.0, 'max_ms': 4.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
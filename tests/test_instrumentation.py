@@ -0,0 +1,69 @@
+import io
+import unittest
+
+from ChessLogic import Instrumentation as instrumentation_module
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Instrumentation import Instrumentation, is_enabled, profile_workload, run_workload
+from ChessLogic.Perft import REFERENCE_POSITIONS, perft
+from ChessLogic.Pieces import *
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_counts_calls(self):
+        fen = REFERENCE_POSITIONS[0][1]
+        make_move = ChessPosition.__dict__['make_move']
+        piece_init = ChessPiece.__dict__['__init__']
+
+        with Instrumentation() as instrumentation:
+            self.assertTrue(is_enabled())
+            self.assertIsNot(ChessPosition.__dict__['make_move'], make_move)
+
+            nodes = run_workload([fen], 3, use_cache=False)
+            during = instrumentation.snapshot()
+
+        # Depth 3 perft makes every move of depths 1 and 2 once
+        self.assertEqual(nodes, 8902)
+        calls = instrumentation.snapshot().calls
+        self.assertEqual(calls['ChessPosition.make_move'][0], 20 + 400)
+        self.assertEqual(calls['ChessPosition.unmake_move'][0], 20 + 400)
+        self.assertEqual(calls['ChessPosition.generate_legal_moves'][0], 1 + 20 + 400)
+        self.assertGreater(calls['Knight.get_possible_moves'][0], 0)
+        self.assertEqual(during.calls['ChessPosition.make_move'][0], 420)
+        self.assertGreater(instrumentation.snapshot().seconds, 0)
+
+        # Original methods are restored and calls are not counted any more
+        self.assertFalse(is_enabled())
+        self.assertIs(ChessPosition.__dict__['make_move'], make_move)
+        self.assertIs(ChessPiece.__dict__['__init__'], piece_init)
+
+        perft(ChessPosition.generate_from_fen(fen), 2)
+        self.assertEqual(instrumentation_module.snapshot().calls['ChessPosition.make_move'][0], 420)
+
+    def test_allocations(self):
+        with Instrumentation() as instrumentation:
+            ChessPosition.generate_from_fen(REFERENCE_POSITIONS[0][1])
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot.allocations['Pawn'], 16)
+        self.assertEqual(snapshot.allocations['King'], 2)
+        self.assertIn('Pieces created: 32', str(snapshot))
+        self.assertEqual(snapshot.to_dict()['allocations'], snapshot.allocations)
+
+    def test_nested(self):
+        with Instrumentation():
+            with self.assertRaises(RuntimeError):
+                Instrumentation().__enter__()
+
+        self.assertFalse(is_enabled())
+
+    def test_profile(self):
+        output = io.StringIO()
+        stats = profile_workload([REFERENCE_POSITIONS[0][1]], 2, output=output)
+
+        self.assertGreater(stats.total_calls, 0)
+        self.assertIn('perft', output.getvalue())
+        self.assertFalse(is_enabled())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.OpeningBook import OpeningBook, build_book, decode_move, encode_move
+from ChessLogic.Perft import move_to_text
+
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+PGN_LINES = '''[Event "1"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Event "2"]
+[Result "1/2-1/2"]
+
+1. e4 c5 2. Nf3 1/2-1/2
+
+[Event "3"]
+[Result "0-1"]
+
+1. d4 d5 0-1
+
+[Event "4"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 1-0
+'''.splitlines(keepends=True)
+
+
+class OpeningBookTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'book.bin')
+
+    def test_encode_move(self):
+        for move in [(4, 1, 4, 3, None), (4, 0, 6, 0, None), (0, 6, 1, 7, 'Q'), (7, 1, 7, 0, 'N')]:
+            self.assertEqual(decode_move(encode_move(move)), move)
+
+    def test_probe(self):
+        games, entries = build_book([PGN_LINES], self.path, jobs=1)
+        self.assertEqual(games, 4)
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual(len(book), entries)
+
+            # e4 scores 2 + 1 + 2, d4 lost and scores 0, so it is left out of the book
+            chess_position = ChessPosition.generate_from_fen(START_FEN)
+            self.assertEqual([(move_to_text(entry.move), entry.weight) for entry in book.get_entries(chess_position)],
+                             [('e2e4', 5)])
+
+            chess_position.make_move(4, 1, 4, 3)
+            # Black lost both games with e5
+            self.assertEqual([move_to_text(entry.move) for entry in book.get_entries(chess_position)], ['c7c5'])
+
+            chess_position.make_move(4, 6, 4, 4)
+            generator = random.Random(0)
+            chosen = {move_to_text(book.choose_move(chess_position, generator)) for _ in range(20)}
+            self.assertEqual(chosen, {'g1f3', 'f1c4'})
+
+            # Out of book
+            chess_position.make_move(0, 1, 0, 2)
+            self.assertEqual(book.get_entries(chess_position), [])
+            self.assertIsNone(book.choose_move(chess_position))
+
+    def test_transposition(self):
+        build_book([PGN_LINES], self.path, jobs=1)
+
+        # Position after 1. Nf3 Nc6 2. e4 e5 is found as after 1. e4 e5 2. Nf3 Nc6
+        chess_position = ChessPosition.generate_from_fen(
+            'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3')
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual(book.get_entries(chess_position), [])
+
+        build_book([PGN_LINES + ['\n', '1. e4 e5 2. Nf3 Nc6 3. Bb5 *\n']], self.path, jobs=1)
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual([move_to_text(entry.move) for entry in book.get_entries(chess_position)], ['f1b5'])
+
+    def test_empty_book(self):
+        build_book([[]], self.path, jobs=1)
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual(len(book), 0)
+            self.assertIsNone(book.choose_move(ChessPosition.generate_from_fen(START_FEN)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Engine import EXACT, LOWER_BOUND, SearchLimits, move_to_text
+from ChessLogic.Parallel import (HelperEngine, ParallelSearch, SharedHashTable, SharedTranspositionTable,
+                                 parallel_divide, parallel_perft, perft_hashed)
+from ChessLogic.Perft import REFERENCE_POSITIONS, divide
+
+
+class SharedHashTableTest(unittest.TestCase):
+    def test_get_put(self):
+        with SharedHashTable(size=16) as table:
+            self.assertIsNone(table.get(5))
+
+            table.put(5, 1234)
+            self.assertEqual(table.get(5) & 0xFFFF, 1234)
+
+            # Key in the same slot replaces the entry and the old key misses
+            table.put(21, 99)
+            self.assertIsNone(table.get(5))
+            self.assertEqual(table.get(21) & 0xFFFF, 99)
+
+            table.clear()
+            self.assertIsNone(table.get(21))
+
+    def test_transposition_entries(self):
+        with SharedTranspositionTable(size=16) as table:
+            table.put(3, 5, -250, EXACT, (4, 1, 4, 3, None))
+            self.assertEqual(table.get(3), (3, 5, -250, EXACT, (4, 1, 4, 3, None)))
+
+            # Shallower entry of another position does not replace a deeper one
+            table.put(19, 2, 100, LOWER_BOUND, (0, 6, 0, 7, 'N'))
+            self.assertIsNone(table.get(19))
+
+            table.put(19, 6, 100, LOWER_BOUND, (0, 6, 0, 7, 'N'))
+            self.assertEqual(table.get(19), (19, 6, 100, LOWER_BOUND, (0, 6, 0, 7, 'N')))
+
+
+class ParallelPerftTest(unittest.TestCase):
+    def test_perft_hashed(self):
+        for name, fen, expected_counts in REFERENCE_POSITIONS[:4]:
+            with self.subTest(name=name), SharedHashTable(size=1 << 12) as table:
+                self.assertEqual(perft_hashed(ChessPosition.generate_from_fen(fen), 3, table), expected_counts[2])
+
+    def test_parallel_divide(self):
+        fen = REFERENCE_POSITIONS[1][1]
+
+        self.assertEqual(parallel_divide(fen, 2, jobs=2, table_size=1 << 12),
+                         divide(ChessPosition.generate_from_fen(fen), 2))
+        self.assertEqual(parallel_perft(fen, 3, jobs=2, table_size=1 << 12), REFERENCE_POSITIONS[1][2][2])
+
+
+class ParallelSearchTest(unittest.TestCase):
+    def test_helper_depths(self):
+        self.assertEqual(list(HelperEngine(0, None).iteration_depths(6)), [1, 2, 3, 4, 5, 6])
+
+        # Every helper starts from depth 1 and skips some deeper iterations
+        for worker_index in range(1, 8):
+            depths = HelperEngine(worker_index, None).iteration_depths(12)
+            self.assertEqual(depths[0], 1)
+            self.assertLess(len(depths), 12)
+
+    def test_mate_in_one(self):
+        chess_position = ChessPosition.generate_from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+
+        with ParallelSearch(jobs=2, table_size=1 << 12) as parallel:
+            result = parallel.search(chess_position, SearchLimits(depth=3))
+            self.assertEqual(move_to_text(result.best_move), 'a1a8')
+            self.assertEqual(result.mate_in, 1)
+
+            # Pool and table are reused by the next search
+            parallel.new_game()
+            result = parallel.search(chess_position, SearchLimits(depth=2))
+            self.assertEqual(move_to_text(result.best_move), 'a1a8')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Perft import REFERENCE_POSITIONS, divide, perft, perft_with_copies, run_suite, timed_perft
+
+
+MAX_NODES = 10000  # Deeper reference counts are left to "python -m ChessLogic.Perft --suite"
+
+
+def reference_counts():
+    for name, fen, counts in REFERENCE_POSITIONS:
+        for depth, nodes in enumerate(counts, 1):
+            if nodes <= MAX_NODES:
+                yield name, fen, depth, nodes
+
+
+class PerftTest(unittest.TestCase):
+    """Node counts of reference positions, which cover castling, en passant, promotions and pins"""
+
+    def test_make_unmake(self):
+        for name, fen, depth, nodes in reference_counts():
+            with self.subTest(position=name, depth=depth):
+                self.assertEqual(timed_perft(fen, depth, perft).nodes, nodes)
+
+    def test_make_unmake_without_cache(self):
+        for name, fen, depth, nodes in reference_counts():
+            with self.subTest(position=name, depth=depth):
+                self.assertEqual(timed_perft(fen, depth, perft, use_cache=False).nodes, nodes)
+
+    def test_copies(self):
+        for name, fen, depth, nodes in reference_counts():
+            with self.subTest(position=name, depth=depth):
+                self.assertEqual(timed_perft(fen, depth, perft_with_copies).nodes, nodes)
+
+    def test_divide(self):
+        counts = dict(divide(ChessPosition.generate_from_fen(REFERENCE_POSITIONS[0][1]), 3))
+
+        self.assertEqual(len(counts), 20)
+        self.assertEqual(sum(counts.values()), 8902)
+        self.assertEqual((counts['a2a3'], counts['b1c3'], counts['e2e4'], counts['d2d4']), (380, 440, 600, 560))
+
+    def test_suite(self):
+        lines = []
+
+        self.assertTrue(run_suite(2, output=lines.append))
+        self.assertTrue(all(line.endswith('OK') for line in lines[:-1]))
+        self.assertTrue(lines[-1].startswith('Total: '))
+
+
+if __name__ == '__main__':
+    unittest.main()
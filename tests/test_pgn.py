@@ -0,0 +1,90 @@
+import random
+import unittest
+
+from ChessLogic.ChessGame import ChessGame
+from ChessLogic.PGN import PGNError, create_game, decode_game, decode_games, export_pgn, read_games
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+# Castling on both sides, en passant and underpromotion with capture
+PGN_TEXT = '''[Event "Test"]
+[Result "*"]
+
+1. e4 d5 2. e5 f5 3. exf6 Nc6 4. fxg7 Bf5 5. Nf3 Qd7 6. Bb5 O-O-O 7. O-O Nf6 8. gxh8=N Ng4 *
+'''
+
+
+def play_random_game(fen, plies, seed):
+    chess_game = ChessGame(fen)
+    generator = random.Random(seed)
+    fens = [chess_game.current_chess_position.generate_fen()]
+
+    for _ in range(plies):
+        legal_moves = chess_game.current_chess_position.generate_legal_moves()
+        if not legal_moves:
+            break
+
+        chess_game.make_move(*generator.choice(sorted(legal_moves, key=lambda move: (move[:4], move[4] or ''))))
+        fens.append(chess_game.current_chess_position.generate_fen())
+
+    return chess_game, fens
+
+
+class PGNTest(unittest.TestCase):
+    def test_decode(self):
+        game = next(read_games(PGN_TEXT.splitlines()))
+        chess_game = create_game(game)
+
+        self.assertEqual(len(chess_game.moves), 16)
+        self.assertEqual(chess_game.current_chess_position.generate_fen(),
+                         '2kr1b1N/pppqp2p/2n5/1B1p1b2/6n1/5N2/PPPP1PPP/RNBQ1RK1 w - - 1 9')
+
+    def test_round_trip(self):
+        for name, fen, _ in REFERENCE_POSITIONS:
+            for seed in range(3):
+                with self.subTest(position=name, seed=seed):
+                    chess_game, fens = play_random_game(fen, 80, seed)
+                    game = next(read_games(export_pgn(chess_game).splitlines()))
+
+                    self.assertEqual(game.initial_fen, fen)
+                    decoded_game = create_game(game)
+                    self.assertEqual([move[:4] for move in decoded_game.moves], [move[:4] for move in chess_game.moves])
+                    self.assertEqual(decoded_game.current_chess_position.generate_fen(), fens[-1])
+
+    def test_zero_castling(self):
+        """Castling written with zeros is a move, not a move number"""
+
+        game = next(read_games(['1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. 0-0 Nf6 5.d3 0-0-0+? 6. c3 0-0 *']))
+        self.assertEqual(game.san_moves[6:], ['0-0', 'Nf6', 'd3', '0-0-0+?', 'c3', '0-0'])
+
+        game = next(read_games(['1. e4 e5 2. Nf3 Nf6 3. Bc4 Bc5 4. 0-0 0-0 5. d3 *']))
+        chess_game = create_game(game)
+        self.assertEqual(chess_game.current_chess_position.generate_fen(),
+                         'rnbq1rk1/pppp1ppp/5n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQ1RK1 b - - 0 5')
+
+    def test_illegal_move(self):
+        game = next(read_games(['1. e4 e5 2. Ke3 *']))
+
+        with self.assertRaises(PGNError):
+            decode_game(game)
+
+    def test_comments_and_variations(self):
+        text = '1. e4 {best by test} e5 (1... c5 2. Nf3 (2. c3) d6) 2. Nf3 $1 ; rest of line\n2... Nc6 1-0'
+        game = next(read_games(text.splitlines(), keep_comments=True, keep_variations=True))
+
+        self.assertEqual(game.san_moves, ['e4', 'e5', 'Nf3', 'Nc6'])
+        self.assertEqual(game.result, '1-0')
+        self.assertEqual([ply for ply, _ in game.comments], [1, 3])
+        self.assertEqual(len(game.variations), 1)
+
+    def test_decode_games_in_order(self):
+        games = [export_pgn(play_random_game(ChessGame.initial_chess_position, 20, seed)[0]) for seed in range(5)]
+        results = list(decode_games('\n'.join(games).splitlines(), jobs=1, batch_size=2))
+
+        self.assertEqual([len(moves) for _, moves, error in results if error is None], [20] * 5)
+        self.assertEqual([game.san_moves for game, _, _ in results],
+                         [next(read_games(text.splitlines())).san_moves for text in games])
+
+
+if __name__ == '__main__':
+    unittest.main()
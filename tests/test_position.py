@@ -0,0 +1,59 @@
+import random
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+def sort_moves(moves):
+    return sorted(moves, key=lambda move: (move[:4], move[4] or ''))
+
+
+class MakeUnmakeTest(unittest.TestCase):
+    """Random games from reference positions, checked after every move and while unmaking them all"""
+
+    games = 10
+    plies = 60
+
+    def play_games(self):
+        generator = random.Random(1)
+
+        for name, fen, _ in REFERENCE_POSITIONS:
+            for _ in range(self.games):
+                yield name, fen, generator
+
+    def test_chess_position(self):
+        for name, fen, generator in self.play_games():
+            with self.subTest(position=name):
+                chess_position = ChessPosition.generate_from_fen(fen)
+                history = []
+
+                for _ in range(self.plies):
+                    legal_moves = chess_position.generate_legal_moves()
+                    if not legal_moves:
+                        break
+
+                    history.append(chess_position.generate_fen())
+                    chess_position.make_move(*generator.choice(sort_moves(legal_moves)))
+
+                    # Position after the move is the same as the one created from its FEN
+                    fen_position = ChessPosition.generate_from_fen(chess_position.generate_fen())
+                    self.assertEqual(sort_moves(fen_position.generate_legal_moves()),
+                                     sort_moves(chess_position.generate_legal_moves()))
+
+                while history:
+                    chess_position.unmake_move()
+                    self.assertEqual(chess_position.generate_fen(), history.pop())
+
+    def test_copy_is_independent(self):
+        chess_position = ChessPosition.generate_from_fen(REFERENCE_POSITIONS[1][1])
+        fen = chess_position.generate_fen()
+        copy = chess_position.copy()
+
+        copy.make_move(*copy.generate_legal_moves()[0])
+        self.assertEqual(chess_position.generate_fen(), fen)
+        self.assertNotEqual(copy.generate_fen(), fen)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.Tablebase import Tablebase, check_material, generate_table, is_supported, normalize_material
+
+
+class TablebaseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.lines = []
+        generate_table('KQK', cls.directory.name, jobs=1, output=cls.lines.append)
+        cls.tablebase = Tablebase(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.directory.cleanup()
+
+    def probe(self, fen):
+        return self.tablebase.probe(ChessPosition.generate_from_fen(fen))
+
+    def test_generation(self):
+        self.assertEqual(len(self.lines), 1)
+        self.assertIn('longest mate 20 plies', self.lines[0])
+
+        # Existing table is not generated again
+        generate_table('KKQ', self.directory.name, jobs=1, output=self.lines.append)
+        self.assertEqual(len(self.lines), 1)
+
+    def test_probe(self):
+        self.assertEqual(self.probe('7k/8/6K1/8/8/8/8/1Q6 w - - 0 1').plies, 1)
+
+        checkmate = self.probe('Q6k/8/6K1/8/8/8/8/8 b - - 0 1')
+        self.assertTrue(checkmate.is_loss)
+        self.assertEqual(checkmate.plies, 0)
+
+        self.assertTrue(self.probe('k7/2Q5/1K6/8/8/8/8/8 b - - 0 1').is_draw)  # Stalemate
+        self.assertTrue(self.probe('k7/1Q6/8/8/8/8/8/7K b - - 0 1').is_draw)  # Queen is taken
+
+        # Colors are swapped for the black queen
+        self.assertEqual(self.probe('1q6/8/8/8/8/6k1/8/7K b - - 0 1').plies,
+                         self.probe('7k/8/6K1/8/8/8/8/1Q6 w - - 0 1').plies)
+
+    def test_not_covered(self):
+        self.assertIsNone(self.probe('7k/8/6K1/8/8/8/8/1R6 w - - 0 1'))  # No KRK table
+        self.assertIsNone(self.probe('7k/8/6K1/8/8/8/P7/1QQ5 w - - 0 1'))  # Too many pieces
+
+    def test_best_move_mates(self):
+        chess_position = ChessPosition.generate_from_fen('8/8/8/4k3/8/8/8/1Q5K w - - 0 1')
+        plies = self.tablebase.probe(chess_position).plies
+        self.assertTrue(self.tablebase.probe(chess_position).is_win)
+
+        for played in range(plies):
+            self.assertEqual(self.tablebase.probe(chess_position).plies, plies - played)
+            chess_position.make_move(*self.tablebase.best_move(chess_position))
+
+        self.assertTrue(chess_position.get_status().is_checkmate)
+
+    def test_material(self):
+        self.assertEqual(normalize_material('kkrp'), ('KRPK', True))
+        self.assertEqual(normalize_material('KNKB'), ('KBKN', True))
+
+        for name in ('KQRKR', 'KPKP'):
+            with self.subTest(name=name):
+                self.assertFalse(is_supported(name))
+                self.assertRaises(ValueError, check_material, name)
+
+        self.assertTrue(is_supported('KQKP'))
+        self.assertRaises(ValueError, normalize_material, 'KQR')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import math
+import os
+import tempfile
+import unittest
+
+from ChessLogic.PGN import read_games
+from ChessLogic.Tournament import MatchStatistics, parse_player, play_game, read_openings, run_match
+
+
+class TournamentTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_parse_player(self):
+        self.assertEqual(parse_player('random'), ('random', {}))
+        self.assertEqual(parse_player('engine'), ('engine', {'depth': 3}))
+        self.assertEqual(parse_player('engine:nodes=2000,hash=12,time=0.5'),
+                         ('engine', {'nodes': 2000, 'hash': 12, 'time': 0.5}))
+
+        for spec in ('human', 'engine:speed=3', 'engine:depth=deep'):
+            with self.subTest(spec=spec):
+                self.assertRaises(ValueError, parse_player, spec)
+
+    def test_read_openings(self):
+        path = os.path.join(self.directory, 'openings.epd')
+        with open(path, 'w') as file:
+            file.write('# Comment\n\n'
+                       'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 bm e5; id "1";\n'
+                       '4k3/8/8/8/8/8/8/4K2R w K - 3 40\n')
+
+        self.assertEqual(read_openings(path), ['rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3',
+                                               '4k3/8/8/8/8/8/8/4K2R w K - 3 40'])
+
+    def test_play_game(self):
+        chess_game, result, reason, search = play_game(0, '7k/8/6K1/8/8/8/8/1Q6 w - - 0 1', 'engine:depth=2', 'random',
+                                                       max_plies=100)
+        self.assertEqual((result, reason), ('1-0', 'checkmate'))
+        self.assertEqual(len(chess_game.moves), 1)
+        self.assertGreater(search[0][0], 0)
+        self.assertEqual(search[1][0], 0)
+
+        # Random games with the same seed are the same
+        first = play_game(3, '4k3/8/8/8/8/8/8/R3K3 b - - 0 1', 'random', 'random', max_plies=20, seed=5)
+        second = play_game(3, '4k3/8/8/8/8/8/8/R3K3 b - - 0 1', 'random', 'random', max_plies=20, seed=5)
+        self.assertEqual(first[0].moves, second[0].moves)
+        self.assertLessEqual(len(first[0].moves), 20)
+
+        if len(first[0].moves) == 20:
+            self.assertEqual(first[1:3], ('1/2-1/2', 'move limit'))
+
+    def test_statistics_of_same_spec(self):
+        statistics = MatchStatistics('engine:depth=2', 'engine:depth=2')
+        statistics.add(True, '1-0', 'checkmate', ((100, 1.0), (300, 1.0)))
+        statistics.add(False, '1-0', 'checkmate', ((500, 1.0), (700, 1.0)))
+        statistics.add(True, '1/2-1/2', 'stalemate', ((0, 0.0), (0, 0.0)))
+
+        self.assertEqual((statistics.wins, statistics.draws, statistics.losses), (1, 1, 1))
+        self.assertEqual(statistics.reasons, {'checkmate': 2, 'stalemate': 1})
+
+        # Nodes are kept by slot, so players with the same spec are not mixed up
+        self.assertEqual(statistics.nodes_per_second(0), 400)
+        self.assertEqual(statistics.nodes_per_second(1), 400)
+        self.assertEqual(statistics.search, [(800, 2.0), (800, 2.0)])
+        self.assertEqual(statistics.elo_difference()[0], 0)
+        self.assertIn('engine:depth=2 (second): 400 nodes/s', str(statistics))
+
+        statistics.add(True, '1-0', 'checkmate', ((0, 0.0), (0, 0.0)))
+        self.assertGreater(statistics.elo_difference()[0], 0)
+
+        winner = MatchStatistics('random', 'random')
+        winner.add(False, '0-1', 'checkmate', ((0, 0.0), (0, 0.0)))
+        self.assertEqual(winner.elo_difference(), (math.inf, math.inf))
+
+    def test_run_match(self):
+        pgn_path = os.path.join(self.directory, 'match.pgn')
+        progress = []
+
+        statistics = run_match('random', 'engine:depth=1', ['4k3/8/8/8/8/8/8/R3K3 w - - 0 1'], games=4,
+                               max_plies=30, jobs=1, pgn_path=pgn_path, seed=2, progress=progress.append)
+
+        self.assertEqual(statistics.games, 4)
+        self.assertEqual(len(progress), 4)
+
+        games = list(read_games(pgn_path))
+        self.assertEqual([game.headers['White'] for game in games], ['random', 'engine:depth=1'] * 2)
+        self.assertEqual([game.headers['Round'] for game in games], ['1', '2', '3', '4'])
+        self.assertEqual(sum(game.result != '1/2-1/2' for game in games), statistics.wins + statistics.losses)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import io
+import time
+import unittest
+
+from ChessLogic.Colors import Color
+from ChessLogic.UCI import UCIEngine, get_think_time, parse_move
+
+
+MATE_IN_ONE_FEN = '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'
+
+
+class UCITest(unittest.TestCase):
+    def setUp(self):
+        self.output = io.StringIO()
+        self.uci_engine = UCIEngine(self.output, hash_size=1)
+        self.addCleanup(self.uci_engine.stop)
+
+    def exchange(self, *commands):
+        """Handles commands and returns lines sent in reply"""
+
+        start = len(self.output.getvalue())
+        for command in commands:
+            self.uci_engine.handle(command)
+
+        self.uci_engine.wait()
+        return self.output.getvalue()[start:].splitlines()
+
+    def test_handshake(self):
+        lines = self.exchange('uci', 'isready')
+
+        self.assertEqual(lines[0], 'id name ChessPygame')
+        self.assertEqual(lines[-2:], ['uciok', 'readyok'])
+        self.assertTrue(self.uci_engine.handle('quit') is False)
+
+    def test_go_depth(self):
+        lines = self.exchange(f'position fen {MATE_IN_ONE_FEN}', 'go depth 3')
+
+        self.assertTrue(lines[0].startswith('info depth 1 '))
+        self.assertIn('score mate 1', lines[-2])
+        self.assertEqual(lines[-1], 'bestmove a1a8')
+
+    def test_position_moves(self):
+        self.exchange('position startpos moves e2e4 e7e5 g1f3')
+        self.assertEqual(self.uci_engine.chess_game.current_chess_position.generate_fen(),
+                         'rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2')
+
+        # Game that extends the current one keeps its history
+        chess_game = self.uci_engine.chess_game
+        self.exchange('position startpos moves e2e4 e7e5 g1f3 b8c6')
+        self.assertIs(self.uci_engine.chess_game, chess_game)
+        self.assertEqual(len(chess_game.moves), 4)
+
+        self.exchange('position startpos moves d2d4')
+        self.assertIsNot(self.uci_engine.chess_game, chess_game)
+        self.assertEqual(self.uci_engine.chess_game.moves, [(3, 1, 3, 3, None)])
+
+    def test_position_promotion(self):
+        fen = '8/4P3/8/8/8/k7/8/K7 w - - 0 1'
+
+        self.exchange(f'position fen {fen} moves e7e8q')
+        self.exchange(f'position fen {fen} moves e7e8n')
+        self.assertEqual(self.uci_engine.chess_game.current_chess_position.generate_fen(),
+                         '4N3/8/8/8/8/k7/8/K7 b - - 0 1')
+
+    def test_illegal_moves(self):
+        for moves, message in [('e2e4 e7e5 e4e5 g1f3', 'info string Illegal move "e4e5"'),
+                               ('e2e4 e7e5 e2 g1f3', 'info string Invalid move "e2"'),
+                               ('e2e4 e7e5 e1e0 g1f3', 'info string Invalid move "e1e0"')]:
+            with self.subTest(moves=moves):
+                lines = self.exchange(f'position startpos moves {moves}')
+
+                # Moves up to the bad one are made and the rest is ignored
+                self.assertEqual(len(lines), 1)
+                self.assertTrue(lines[0].startswith(message))
+                self.assertEqual(self.uci_engine.chess_game.moves, [(4, 1, 4, 3, None), (4, 6, 4, 4, None)])
+
+        # Promotion must name its piece
+        self.exchange('position fen 8/4P3/8/8/8/k7/8/K7 w - - 0 1 moves e7e8')
+        self.assertEqual(self.uci_engine.chess_game.moves, [])
+
+    def test_go_infinite(self):
+        self.exchange(f'position fen {MATE_IN_ONE_FEN}')
+        self.uci_engine.handle('go infinite')
+
+        # Forced mate ends the search at once, but best move waits for "stop"
+        time.sleep(0.2)
+        self.assertNotIn('bestmove', self.output.getvalue())
+
+        self.uci_engine.handle('stop')
+        self.assertEqual(self.output.getvalue().splitlines()[-1], 'bestmove a1a8')
+
+    def test_parse_move(self):
+        self.assertEqual(parse_move('e7e8q'), (4, 6, 4, 7, 'Q'))
+        self.assertEqual(parse_move('e1g1'), (4, 0, 6, 0, None))
+
+        for text in ('e7', 'e7e8k', 'i1a1', 'a0a1', 'e2e4 '):
+            self.assertRaises(ValueError, parse_move, text)
+
+    def test_think_time(self):
+        self.assertIsNone(get_think_time({}, Color.WHITE))
+        self.assertAlmostEqual(get_think_time({'movetime': 1000}, Color.BLACK), 0.95)
+        self.assertAlmostEqual(get_think_time({'wtime': 60000, 'btime': 1000, 'movestogo': 20}, Color.WHITE), 2.95)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+import unittest
+
+from ChessLogic.ChessPosition import ChessPosition
+from ChessLogic.MoveCache import MoveCache
+from ChessLogic.Perft import REFERENCE_POSITIONS
+
+
+class ZobristTest(unittest.TestCase):
+    def test_incremental_key(self):
+        """Key kept by make_move and unmake_move equals the key calculated from scratch and from FEN"""
+
+        generator = random.Random(3)
+
+        for name, fen, _ in REFERENCE_POSITIONS:
+            for _ in range(5):
+                with self.subTest(position=name):
+                    chess_position = ChessPosition.generate_from_fen(fen)
+                    keys = []
+
+                    for _ in range(60):
+                        legal_moves = sorted(chess_position.generate_legal_moves(),
+                                             key=lambda move: (move[:4], move[4] or ''))
+                        if not legal_moves:
+                            break
+
+                        keys.append(chess_position.zobrist_key)
+                        chess_position.make_move(*generator.choice(legal_moves))
+
+                        self.assertEqual(chess_position.zobrist_key, chess_position.calculate_zobrist_key())
+                        self.assertEqual(ChessPosition.generate_from_fen(chess_position.generate_fen()).zobrist_key,
+                                         chess_position.zobrist_key)
+
+                    while keys:
+                        chess_position.unmake_move()
+                        self.assertEqual(chess_position.zobrist_key, keys.pop())
+
+    def test_transposition(self):
+        """Different move orders reaching the same position give the same key"""
+
+        first = ChessPosition.generate_from_fen(REFERENCE_POSITIONS[0][1])
+        second = first.copy()
+
+        for move in [(6, 0, 5, 2, None), (6, 7, 5, 5, None), (1, 0, 2, 2, None), (1, 7, 2, 5, None)]:
+            first.make_move(*move)
+        for move in [(1, 0, 2, 2, None), (1, 7, 2, 5, None), (6, 0, 5, 2, None), (6, 7, 5, 5, None)]:
+            second.make_move(*move)
+
+        self.assertEqual(first.zobrist_key, second.zobrist_key)
+
+        # Side to move, castling and en passant are parts of the key
+        keys = {ChessPosition.generate_from_fen(fen).zobrist_key
+                for fen in ['rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1',
+                            'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1',
+                            'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 1',
+                            'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b Kkq - 0 1']}
+        self.assertEqual(len(keys), 4)
+
+
+class MoveCacheTest(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        move_cache = MoveCache(max_size=2)
+        move_cache.put(1, (), False)
+        move_cache.put(2, (), False)
+        move_cache.get(1)
+        move_cache.put(3, (), True)
+
+        self.assertIsNone(move_cache.peek(2))
+        self.assertEqual(move_cache.peek(3), ((), True))
+        self.assertEqual(len(move_cache), 2)
+
+        move_cache.resize(1)
+        self.assertEqual(len(move_cache), 1)
+
+    def test_cached_moves_are_the_same(self):
+        ChessPosition.move_cache.clear()
+
+        for _, fen, _ in REFERENCE_POSITIONS:
+            moves = ChessPosition.generate_from_fen(fen).generate_legal_moves()
+            self.assertEqual(ChessPosition.generate_from_fen(fen).generate_legal_moves(), moves)
+
+        self.assertGreaterEqual(ChessPosition.move_cache.hits, len(REFERENCE_POSITIONS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,7 @@
+import sys
+
+from ChessLogic.UCI import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())